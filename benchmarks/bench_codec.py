@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+"""
+Benchmark of the JSON codec, decoding a large dlg_list reply with each of
+the available backends, with and without OrderedDict objects; registered
+in the suite as codec/*, and runnable on its own for a side by side table
+"""
+
+import sys
+import json
+import time
+import argparse
+from opensips import codec
+from opensips.mi import jsonrpc_helper
+from common import benchmark, measure
+
+# dialogs in the reply decoded by the registered benchmarks (about 2MB)
+SUITE_DIALOGS = 3000
+
+
+def dlg_list_reply(dialogs: int) -> bytes:
+    """ Builds a dlg_list reply with the given number of dialogs """
+    dlgs = []
+    for i in range(dialogs):
+        dlgs.append({
+            "ID": str(1000000 + i),
+            "state": 4,
+            "user_flags": 0,
+            "timestart": 1700000000 + i,
+            "timeout": 1700003600 + i,
+            "callid": f"{i:08x}-4b2e-11ef-9a4b-0242ac120002@10.0.0.1",
+            "from_uri": f"sip:alice{i}@example.com",
+            "to_uri": f"sip:bob{i}@example.com",
+            "caller": {
+                "tag": f"{i:x}a9d3",
+                "contact": f"sip:alice{i}@10.0.0.1:5060",
+                "cseq": "1",
+                "route_set": "",
+                "bind_addr": "udp:10.0.0.10:5060",
+                "sdp": "v=0\r\no=- 0 0 IN IP4 10.0.0.1\r\ns=-\r\n",
+            },
+            "callee": {
+                "tag": f"{i:x}b7c1",
+                "contact": f"sip:bob{i}@10.0.0.2:5060",
+                "cseq": "1",
+                "route_set": "",
+                "bind_addr": "udp:10.0.0.10:5060",
+                "sdp": "v=0\r\no=- 0 0 IN IP4 10.0.0.2\r\ns=-\r\n",
+            },
+            "values": [{"name": "vars", "value": "x" * 32}],
+        })
+    reply = {"jsonrpc": "2.0", "id": "1", "result": {"Dialogs": dlgs}}
+    return json.dumps(reply).encode()
+
+
+def run(reply: bytes, rounds: int) -> float:
+    """ Returns the best time to decode the reply """
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        jsonrpc_helper.get_reply(reply)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def decode(backend: str, ordered: bool, duration: float) -> dict:
+    """ Measures the decoding of a reply with a backend; the codec
+        settings are restored afterwards """
+    reply = dlg_list_reply(SUITE_DIALOGS)
+    previous = (codec.BACKEND, codec.ORDERED)
+    codec.set_backend(backend)
+    codec.set_ordered(ordered)
+    try:
+        result = measure(lambda: jsonrpc_helper.get_reply(reply),
+                         duration, 1)
+    finally:
+        codec.set_backend(previous[0])
+        codec.set_ordered(previous[1])
+    result["mb_per_sec"] = result["calls_per_sec"] * len(reply) / 1048576
+    return result
+
+
+def register(backend: str, ordered: bool):
+    """ Registers the benchmark of a backend """
+    label = f"{backend}-ordered" if ordered else backend
+
+    @benchmark(f"codec/dlg_list-2MB/{label}")
+    def decode_reply(duration):
+        return decode(backend, ordered, duration)
+
+
+register("json", True)
+for _backend in codec.BACKENDS:
+    register(_backend, False)
+
+
+def main():
+    """ Runs the benchmark and prints the results """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-d', '--dialogs', type=int, default=20000,
+                        help='Number of dialogs in the reply')
+    parser.add_argument('-r', '--rounds', type=int, default=5,
+                        help='Number of rounds for each codec')
+    args = parser.parse_args()
+
+    reply = dlg_list_reply(args.dialogs)
+    print(f"dlg_list reply: {args.dialogs} dialogs, "
+          f"{len(reply) / 1048576:.1f} MB")
+
+    codec.set_ordered(True)
+    baseline = run(reply, args.rounds)
+    print(f"{'json (OrderedDict)':<20} {baseline * 1000:8.1f} ms")
+    codec.set_ordered(False)
+    for backend in codec.BACKENDS:
+        codec.set_backend(backend)
+        elapsed = run(reply, args.rounds)
+        print(f"{backend:<20} {elapsed * 1000:8.1f} ms "
+              f"{baseline / elapsed:6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
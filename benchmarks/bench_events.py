@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+"""
+Benchmarks of the event notifications: events per second handled through
+OpenSIPSEvent and AsyncOpenSIPSEvent, for small and large payloads; a child
+process sends the notifications for the duration of the benchmark
+"""
+
+import time
+import socket
+import asyncio
+import multiprocessing
+from opensips.mi import OpenSIPSMI
+from opensips.event import OpenSIPSEventHandler
+from common import benchmark
+from servers import StandInServers
+from bench_parse import notification
+
+PAYLOADS = {"small": 64, "large": 16384}
+BURST = 100
+IDLE = 0.5
+
+
+def send(transport: str, address, payload: int, duration: float, sent):
+    """ Sends notifications to the address for duration seconds """
+    burst = [notification(payload)] * BURST
+    count = 0
+    end = time.monotonic() + duration
+    if transport == "datagram":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        while time.monotonic() < end:
+            for data in burst:
+                sock.sendto(data, address)
+            count += BURST
+    else:
+        sock = socket.create_connection(address)
+        data = b"".join(burst)
+        while time.monotonic() < end:
+            sock.sendall(data)
+            count += BURST
+    sock.close()
+    sent.value = count
+
+
+class Counter():
+
+    """ Callback counting the notifications received """
+
+    def __init__(self):
+        self.count = 0
+        self.start = None
+        self.last = None
+
+    def __call__(self, event):
+        if event is None:
+            return
+        self.last = time.perf_counter()
+        self.count += 1
+
+    def results(self, sent: int) -> dict:
+        """ Returns the results, once all notifications were handled """
+        elapsed = (self.last - self.start) if self.count else float("nan")
+        return {
+            "events": self.count,
+            "sent": sent,
+            "events_per_sec": self.count / elapsed,
+            "loss_pct": 100 * (1 - self.count / sent) if sent else 0.0,
+        }
+
+
+def start_sender(event, counter, transport, payload, duration):
+    """ Starts the process sending notifications to an event's socket """
+    ctx = multiprocessing.get_context("fork")
+    sent = ctx.Value("q", 0)
+    address = (event.socket.ip, event.socket.port)
+    sender = ctx.Process(target=send, daemon=True,
+                         args=(transport, address, payload, duration, sent))
+    counter.start = time.perf_counter()
+    sender.start()
+    return sender, sent
+
+
+def run_sync(transport: str, payload: int, duration: float) -> dict:
+    """ Measures the notifications handled by an OpenSIPSEvent """
+    with StandInServers() as servers:
+        conn, kwargs = servers.connector_args("http")
+        mi = OpenSIPSMI(conn, **kwargs)
+        handler = OpenSIPSEventHandler(mi, transport, ip="127.0.0.1")
+        counter = Counter()
+        event = handler.subscribe("E_BENCH", counter)
+        sender, sent = start_sender(event, counter, transport, payload, duration)
+        sender.join()
+        count = -1
+        while count != counter.count:
+            count = counter.count
+            time.sleep(IDLE)
+        event.unsubscribe()
+        mi.close()
+        return counter.results(sent.value)
+
+
+async def run_async(transport: str, payload: int, duration: float) -> dict:
+    """ Measures the notifications handled by an AsyncOpenSIPSEvent """
+    with StandInServers() as servers:
+        conn, kwargs = servers.connector_args("http")
+        mi = OpenSIPSMI(conn, **kwargs)
+        handler = OpenSIPSEventHandler(mi, transport, ip="127.0.0.1")
+        counter = Counter()
+        event = handler.async_subscribe("E_BENCH", counter)
+        sender, sent = start_sender(event, counter, transport, payload, duration)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, sender.join)
+        count = -1
+        while count != counter.count:
+            count = counter.count
+            await asyncio.sleep(IDLE)
+        await event.unsubscribe()
+        mi.close()
+        return counter.results(sent.value)
+
+
+def register(transport: str, label: str, payload: int):
+    """ Registers the benchmarks of a transport and payload size """
+    @benchmark(f"events/{transport}/sync-{label}")
+    def sync(duration):
+        return run_sync(transport, payload, duration)
+
+    @benchmark(f"events/{transport}/async-{label}")
+    def async_(duration):
+        return asyncio.run(run_async(transport, payload, duration))
+
+
+for _transport in ("datagram", "stream"):
+    for _label, _payload in PAYLOADS.items():
+        register(_transport, _label, _payload)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
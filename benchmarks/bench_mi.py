@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+"""
+Benchmarks of the MI transports: calls per second and latency of a simple
+command, against the stand-in servers
+"""
+
+from opensips.mi import OpenSIPSMI
+from common import benchmark, measure
+from servers import StandInServers
+
+TRANSPORTS = ("http", "datagram", "fifo", "fifo-persistent")
+
+
+def run(transport: str, duration: float, cmd: str, params=None) -> dict:
+    """ Measures a command over a transport """
+    with StandInServers() as servers:
+        conn, kwargs = servers.connector_args(transport)
+        mi = OpenSIPSMI(conn, **kwargs)
+        try:
+            return measure(lambda: mi.execute(cmd, params), duration)
+        finally:
+            mi.close()
+
+
+def register(transport: str):
+    """ Registers the benchmarks of a transport """
+    @benchmark(f"mi/{transport}/uptime")
+    def uptime(duration):
+        return run(transport, duration, "uptime")
+
+    @benchmark(f"mi/{transport}/dlg_list-100")
+    def dlg_list(duration):
+        return run(transport, duration, "dlg_list", {"counter": 100})
+
+
+for _transport in TRANSPORTS:
+    register(_transport)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+"""
+Benchmarks of the JSON parsing: multi-megabyte dlg_list replies, decoded
+at once or incrementally, and event notifications
+"""
+
+import json
+from opensips.mi import jsonrpc_helper
+from opensips.mi.json_stream import JsonPathParser
+from opensips.event.json_helper import JsonBuffer
+from common import benchmark, measure
+from bench_codec import dlg_list_reply
+
+SIZES = {"2MB": 3000, "12MB": 20000}
+CHUNK_SIZE = 65536
+
+
+def with_throughput(result: dict, size: int) -> dict:
+    """ Adds the MB/s parsed to the results """
+    result["mb_per_sec"] = result["calls_per_sec"] * size / 1048576
+    return result
+
+
+def stream(reply: bytes) -> int:
+    """ Parses a reply the way execute_stream does """
+    parser = JsonPathParser("Dialogs.item")
+    count = 0
+    for pos in range(0, len(reply), CHUNK_SIZE):
+        count += len(parser.feed(reply[pos:pos + CHUNK_SIZE]))
+    parser.close()
+    return count
+
+
+def register(label: str, dialogs: int):
+    """ Registers the benchmarks of a reply size """
+    @benchmark(f"parse/dlg_list-{label}/get_reply")
+    def get_reply(duration):
+        reply = dlg_list_reply(dialogs)
+        return with_throughput(
+            measure(lambda: jsonrpc_helper.get_reply(reply), duration, 1),
+            len(reply))
+
+    @benchmark(f"parse/dlg_list-{label}/stream")
+    def parse_stream(duration):
+        reply = dlg_list_reply(dialogs)
+        return with_throughput(
+            measure(lambda: stream(reply), duration, 1), len(reply))
+
+
+for _label, _dialogs in SIZES.items():
+    register(_label, _dialogs)
+
+
+def notification(size: int) -> bytes:
+    """ Builds an event notification of roughly size bytes """
+    return json.dumps({"jsonrpc": "2.0", "method": "E_BENCH",
+                       "params": {"data": "x" * size}}).encode()
+
+
+@benchmark("parse/event-small")
+def event_small(duration):
+    """ Parses a small notification, as the event handlers do """
+    data = notification(64)
+    buf = JsonBuffer()
+    return measure(lambda: buf.parse(data) or buf.pop(), duration)
+
+
+@benchmark("parse/event-large")
+def event_large(duration):
+    """ Parses a large (16KB) notification """
+    data = notification(16384)
+    buf = JsonBuffer()
+    return measure(lambda: buf.parse(data) or buf.pop(), duration)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+"""
+Helpers shared by the benchmarks: the benchmark registry and the timing
+of a callable for a fixed duration
+"""
+
+import time
+from opensips.histogram import Histogram
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """ Registers a benchmark; the function receives the duration of the
+        measurement, in seconds, and returns a dict of results """
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def measure(func, duration: float, warmup: int = 10) -> dict:
+    """ Calls func repeatedly for duration seconds and returns the number
+        of calls per second and the p50/p99 latencies, in microseconds """
+    for _ in range(warmup):
+        func()
+    histogram = Histogram()
+    clock = time.perf_counter_ns
+    start = clock()
+    end = start + int(duration * 1e9)
+    now = start
+    while now < end:
+        func()
+        after = clock()
+        histogram.record(after - now)
+        now = after
+    p50, p99 = histogram.percentiles((50, 99))
+    return {
+        "calls": histogram.count,
+        "calls_per_sec": histogram.count / ((now - start) / 1e9),
+        "p50_us": p50 / 1000,
+        "p99_us": p99 / 1000,
+    }
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
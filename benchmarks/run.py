@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+"""
+Runs the benchmarks against local stand-in servers; results can be stored
+as a baseline and compared with a previous run
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+# run the benchmarks against the package in this tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from opensips import codec  # noqa: E402
+from common import BENCHMARKS  # noqa: E402
+import bench_mi  # noqa: E402,F401 pylint: disable=unused-import
+import bench_parse  # noqa: E402,F401 pylint: disable=unused-import
+import bench_events  # noqa: E402,F401 pylint: disable=unused-import
+import bench_codec  # noqa: E402,F401 pylint: disable=unused-import
+
+COLUMNS = ("calls_per_sec", "events_per_sec", "mb_per_sec",
+           "p50_us", "p99_us", "loss_pct")
+
+
+def machine() -> dict:
+    """ Describes the machine the benchmarks run on """
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.machine(),
+        "cpus": os.cpu_count(),
+        "json": codec.BACKEND,
+        "date": time.strftime("%Y-%m-%d"),
+    }
+
+
+def format_results(name: str, result: dict) -> str:
+    """ Formats the results of a benchmark as a line """
+    cells = []
+    for column in COLUMNS:
+        if column in result:
+            cells.append(f"{column}={result[column]:.1f}")
+    return f"{name:<40} " + " ".join(cells)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """ Returns the metrics that regressed by more than threshold percent
+        from the baseline; rates should not drop and latencies should not
+        grow """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, value in result.items():
+            if metric not in base or not base[metric]:
+                continue
+            change = 100 * (value - base[metric]) / base[metric]
+            if metric.endswith("_per_sec"):
+                change = -change
+            elif not metric.endswith("_us"):
+                continue
+            if change > threshold:
+                regressions.append(f"{name} {metric}: {base[metric]:.1f} -> "
+                                   f"{value:.1f} ({change:+.0f}% worse)")
+    return regressions
+
+
+def main():
+    """ Runs the selected benchmarks """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-k', '--filter', action='append', default=[],
+                        help='Only run the benchmarks containing this '
+                        'string (can be used multiple times)')
+    parser.add_argument('-d', '--duration', type=float, default=2.0,
+                        help='Duration of each benchmark, in seconds')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='List the benchmarks and exit')
+    parser.add_argument('--save', metavar='FILE',
+                        help='Store the results in FILE')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='Compare the results with a stored baseline')
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help='Regression threshold, in percents, used '
+                        'by --compare')
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS
+             if not args.filter or any(f in name for f in args.filter)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = {}
+    for name in names:
+        results[name] = BENCHMARKS[name](args.duration)
+        print(format_results(name, results[name]), flush=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine(), "results": results}, f,
+                      indent=4, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(regressions))
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+"""
+Stand-in OpenSIPS MI servers for the benchmarks; they run in a separate
+process, so that they do not compete with the measured code for the GIL
+"""
+
+import os
+import json
+import socket
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+def answer(request):
+    """ Builds the reply of a JSONRPC request (or batch) """
+    if isinstance(request, list):
+        return [answer(r) for r in request]
+    method = request.get("method")
+    params = request.get("params")
+    if method == "event_subscribe":
+        result = "OK"
+    elif method == "dlg_list":
+        count = params.get("counter", 10) if isinstance(params, dict) else 10
+        result = {"Dialogs": [{"ID": str(i), "state": 4,
+                               "callid": f"{i:08x}@bench"}
+                              for i in range(count)]}
+    else:
+        result = {"Server": "OpenSIPS (bench)", "method": method}
+    return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+
+def reply_bytes(data: bytes) -> bytes:
+    """ Returns the serialized reply of a serialized request """
+    return json.dumps(answer(json.loads(data))).encode()
+
+
+class HTTPHandler(BaseHTTPRequestHandler):
+
+    """ MI over HTTP, with keep-alive connections """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """ Answers an MI request """
+        length = int(self.headers.get("Content-Length", 0))
+        body = reply_bytes(self.rfile.read(length))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """ HTTP server with a thread per connection """
+    daemon_threads = True
+
+
+def serve_http(sock):
+    """ Serves MI over HTTP on a listening socket """
+    server = ThreadingHTTPServer(sock.getsockname(), HTTPHandler,
+                                 bind_and_activate=False)
+    server.socket = sock
+    server.serve_forever()
+
+
+def serve_datagram(sock):
+    """ Serves MI over UDP """
+    while True:
+        data, peer = sock.recvfrom(65535)
+        sock.sendto(reply_bytes(data), peer)
+
+
+def serve_fifo(fifo_file, reply_dir):
+    """ Serves MI over FIFO; handles both newline terminated commands and
+        commands written on their own """
+    decoder = json.JSONDecoder()
+    fd = os.open(fifo_file, os.O_RDWR)
+    buf = ""
+    while True:
+        buf += os.read(fd, 65536).decode()
+        while True:
+            buf = buf.lstrip()
+            if not buf.startswith(":"):
+                buf = ""
+                break
+            name, sep, rest = buf[1:].partition(":")
+            if not sep:
+                break
+            try:
+                request, end = decoder.raw_decode(rest)
+            except ValueError:
+                break
+            buf = rest[end:]
+            reply = json.dumps(answer(request)) + "\n"
+            reply_fd = os.open(os.path.join(reply_dir, name), os.O_WRONLY)
+            os.write(reply_fd, reply.encode())
+            os.close(reply_fd)
+
+
+def serve(http_sock, udp_sock, fifo_file, reply_dir):
+    """ Runs all the servers """
+    for target, args in ((serve_http, (http_sock,)),
+                         (serve_datagram, (udp_sock,))):
+        threading.Thread(target=target, args=args, daemon=True).start()
+    serve_fifo(fifo_file, reply_dir)
+
+
+class StandInServers():
+
+    """ Starts the stand-in MI servers (HTTP, UDP and FIFO) in a child
+        process; also used as a context manager """
+
+    def __init__(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="opensips-bench-")
+        self.fifo_file = os.path.join(self.tmpdir, "opensips_fifo")
+        self.reply_dir = self.tmpdir
+        os.mkfifo(self.fifo_file)
+
+        http_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        http_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        http_sock.bind(("127.0.0.1", 0))
+        http_sock.listen(128)
+        self.http_url = "http://127.0.0.1:{}/mi".format(
+            http_sock.getsockname()[1])
+
+        udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp_sock.bind(("127.0.0.1", 0))
+        self.datagram_address = udp_sock.getsockname()
+
+        # the sockets are inherited by the child process
+        ctx = multiprocessing.get_context("fork")
+        self.process = ctx.Process(target=serve, daemon=True,
+                                   args=(http_sock, udp_sock,
+                                         self.fifo_file, self.reply_dir))
+        self.process.start()
+        http_sock.close()
+        udp_sock.close()
+
+    def connector_args(self, transport: str) -> tuple:
+        """ Returns the arguments of an OpenSIPSMI for a transport """
+        if transport == "http":
+            return "http", {"url": self.http_url}
+        if transport == "datagram":
+            return "datagram", {"datagram_ip": self.datagram_address[0],
+                                "datagram_port": self.datagram_address[1]}
+        return "fifo", {"fifo_file": self.fifo_file,
+                        "fifo_file_fallback": self.fifo_file,
+                        "fifo_reply_dir": self.reply_dir,
+                        "fifo_persistent": transport == "fifo-persistent"}
+
+    def stop(self):
+        """ Stops the servers and removes their files """
+        self.process.terminate()
+        self.process.join()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
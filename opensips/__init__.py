@@ -19,6 +19,22 @@
 
 """ Main package of OpenSIPS """
 
-from .mi import OpenSIPSMI
-from .event import OpenSIPSEvent, AsyncOpenSIPSEvent
+from .lazy import lazy_exports
 from .version import __version__
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .mi import OpenSIPSMI, AsyncOpenSIPSMI
+    from .event import OpenSIPSEvent, AsyncOpenSIPSEvent
+
+_EXPORTS = {
+    'OpenSIPSMI': '.mi',
+    'AsyncOpenSIPSMI': '.mi',
+    'OpenSIPSEvent': '.event',
+    'AsyncOpenSIPSEvent': '.event',
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+"""
+On-disk cache of the commands and events of OpenSIPS nodes, used by the
+bash completion of the scripts; it only relies on modules that are loaded
+at startup anyway, so that completion does not pay for heavy imports
+"""
+
+import os
+import sys
+import time
+
+# seconds after which a catalog is refreshed in the background
+CATALOG_TTL = 60
+
+# the options of the scripts that identify the node
+NODE_OPTIONS = {
+    "-t": "type", "--type": "type",
+    "-i": "ip", "--ip": "ip",
+    "-p": "port", "--port": "port",
+    "-f": "fifo_file", "--fifo-file": "fifo_file",
+    "-ds": "datagram_socket", "--datagram-socket": "datagram_socket",
+    "--env-file": "env_file",
+}
+
+NODE_ENV = {
+    "type": "OPENSIPS_MI_TYPE",
+    "ip": "OPENSIPS_MI_IP",
+    "port": "OPENSIPS_MI_PORT",
+    "fifo_file": "OPENSIPS_MI_FIFO_FILE",
+}
+
+
+def catalog_dir() -> str:
+
+    """ Returns the directory where catalogs are stored """
+    path = os.getenv("OPENSIPS_CATALOG_DIR")
+    if path:
+        return path
+    cache = os.getenv("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "opensips")
+
+
+def get_options(argv: list) -> dict:
+
+    """ Returns the node options found in the command line """
+    options = {}
+    args = iter(argv)
+    for arg in args:
+        name, sep, value = arg.partition("=")
+        if name not in NODE_OPTIONS:
+            continue
+        if not sep:
+            value = next(args, None)
+        options[NODE_OPTIONS[name]] = value
+    return options
+
+
+def node_key(argv: list, defaults: dict) -> str:
+
+    """ Returns a key that identifies the node the command line talks to,
+        resolving the options as the scripts do """
+    options = get_options(argv)
+    node = {}
+    for name, default in defaults.items():
+        node[name] = options.get(name) or \
+            os.getenv(NODE_ENV.get(name, ""), "") or default
+    if node["type"] == "fifo":
+        address = node["fifo_file"]
+    elif node["type"] == "datagram" and options.get("datagram_socket"):
+        address = options["datagram_socket"]
+    else:
+        address = f"{node['ip']}:{node['port']}"
+    key = f"{node['type']}-{address}"
+    return "".join(c if c.isalnum() or c in ".-" else "_" for c in key)
+
+
+def catalog_path(key: str, kind: str) -> str:
+
+    """ Returns the file that holds a catalog """
+    return os.path.join(catalog_dir(), f"{key}.{kind}")
+
+
+def read_version(key: str):
+
+    """ Returns the last version of OpenSIPS seen on a node, or None if
+        it is not known """
+    try:
+        with open(catalog_path(key, "version"), encoding="utf-8") as version:
+            return version.read().rstrip("\n")
+    except OSError:
+        return None
+
+
+def read(key: str, kind: str):
+
+    """ Returns the names in a catalog and its age in seconds, or
+        (None, None) if there is no catalog, or if it was fetched from
+        another version of OpenSIPS than the last one seen on the node """
+    path = catalog_path(key, kind)
+    try:
+        with open(path, encoding="utf-8") as catalog:
+            lines = catalog.read().splitlines()
+        age = time.time() - os.stat(path).st_mtime
+    except OSError:
+        return None, None
+    # the first line holds the version of OpenSIPS
+    if not lines:
+        return None, None
+    version = read_version(key)
+    if version is not None and lines[0] != version:
+        return None, None
+    return lines[1:], age
+
+
+def store(path: str, lines: list):
+
+    """ Atomically replaces a file with lines """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as catalog:
+        catalog.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+
+def write(key: str, kind: str, names: list, version: str = ""):
+
+    """ Stores a catalog; a new version of OpenSIPS invalidates the
+        catalogs of the other kinds fetched from the node """
+    version = version.replace("\n", " ")
+    try:
+        if version and version != read_version(key):
+            store(catalog_path(key, "version"), [version])
+        store(catalog_path(key, kind), [version] + list(names))
+    except OSError:
+        # completion must work even without a writable cache
+        pass
+
+
+def refresh(module: str, argv: list):
+
+    """ Runs the completion of a script in a detached process, which
+        fetches the catalog from OpenSIPS and stores it """
+    # pylint: disable=import-outside-toplevel,consider-using-with
+    import subprocess
+    env = dict(os.environ, OPENSIPS_CATALOG_REFRESH="1")
+    try:
+        subprocess.Popen([sys.executable, "-m", module] + argv, env=env,
+                         stdin=subprocess.DEVNULL,
+                         stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+    except OSError:
+        pass
+
+
+def complete(module: str, kind: str, defaults: dict, argv=None) -> bool:
+
+    """ Prints the cached catalog, if the command line asks for the
+        completion of a catalog; refreshes it in the background when it
+        is old; returns False if the completion has to be done live """
+    argv = sys.argv[1:] if argv is None else argv
+    if os.getenv("OPENSIPS_CATALOG_REFRESH"):
+        return False
+    for flag in ("-bc", "--bash-complete"):
+        if flag in argv:
+            idx = argv.index(flag)
+            break
+    else:
+        return False
+    # only the catalog is cached, not the options of the scripts
+    value = argv[idx + 1] if idx + 1 < len(argv) else None
+    if value not in (None, kind):
+        return False
+    # pylint: disable=import-outside-toplevel
+    from .mi.__main__ import load_env_file
+    load_env_file(get_options(argv).get("env_file") or ".env")
+    key = node_key(argv, defaults)
+    names, age = read(key, kind)
+    if names is None:
+        return False
+    print(" ".join(names))
+    ttl = float(os.getenv("OPENSIPS_CATALOG_TTL") or CATALOG_TTL)
+    if age > ttl:
+        refresh(module, argv)
+    return True
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
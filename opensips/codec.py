@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+"""
+JSON codec shared by the MI and Event packages; uses orjson or ujson when
+installed, falling back to the standard json module otherwise
+"""
+
+import os
+import json
+import warnings
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+BACKENDS = {"json": json.loads}
+if ujson:
+    BACKENDS["ujson"] = ujson.loads
+if orjson:
+    # a compiled extension, whose members pylint cannot see
+    BACKENDS["orjson"] = orjson.loads  # pylint: disable=no-member
+
+_loads = json.loads
+BACKEND = "json"
+ORDERED = False
+DECODER = json.JSONDecoder()
+ORDERED_DECODER = json.JSONDecoder(object_pairs_hook=OrderedDict)
+
+
+def set_backend(name: str = None):
+
+    """ Selects the backend used to decode json (json, ujson or orjson);
+        by default, the fastest one installed """
+    global _loads, BACKEND  # pylint: disable=global-statement
+    if name is None:
+        name = next(b for b in ("orjson", "ujson", "json") if b in BACKENDS)
+    if name not in BACKENDS:
+        raise ValueError(f"json backend {name} is not available")
+    _loads = BACKENDS[name]
+    BACKEND = name
+
+
+def set_ordered(ordered: bool = True):
+
+    """ Makes objects decode as OrderedDict instead of dict, for code that
+        relies on the types returned by older versions """
+    global ORDERED  # pylint: disable=global-statement
+    ORDERED = ordered
+
+
+def loads(data):
+
+    """ Decodes a json document (str or bytes); raises ValueError """
+    if ORDERED:
+        return json.loads(data, object_pairs_hook=OrderedDict)
+    try:
+        return _loads(data)
+    except ValueError:
+        if _loads is json.loads:
+            raise
+    # the fast decoders are stricter than json (i.e. big integers or NaN),
+    # so let json decide whether the document is invalid
+    return json.loads(data)
+
+
+def dumps(obj) -> str:
+
+    """ Encodes an object as json """
+    return json.dumps(obj)
+
+
+def raw_decode(data: str, pos: int = 0):
+
+    """ Decodes the json value that starts at pos of a string; returns
+        the value and the position where it ends; raises ValueError """
+    if ORDERED:
+        return ORDERED_DECODER.raw_decode(data, pos)
+    return DECODER.raw_decode(data, pos)
+
+
+def set_env_backend():
+
+    """ Selects the backend named by the OPENSIPS_JSON_BACKEND environment
+        variable; an unavailable backend falls back to the default one,
+        rather than failing the import """
+    name = os.getenv("OPENSIPS_JSON_BACKEND") or None
+    try:
+        set_backend(name)
+    except ValueError:
+        warnings.warn(f"OPENSIPS_JSON_BACKEND: json backend {name} is not "
+                      "available, using the default one", RuntimeWarning)
+        set_backend()
+
+
+set_env_backend()
+set_ordered(os.getenv("OPENSIPS_JSON_ORDERED", "").lower()
+            in ("1", "yes", "true"))
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -19,15 +19,37 @@
 
 """ Event package of OpenSIPS """
 
-from .event import OpenSIPSEvent, OpenSIPSEventException
-from .handler import OpenSIPSEventHandler
-from .asyncevent import AsyncOpenSIPSEvent
+from ..lazy import lazy_exports
 
-__all__ = [
-    'OpenSIPSEvent',
-    'OpenSIPSEventException',
-    'OpenSIPSEventHandler',
-    'AsyncOpenSIPSEvent',
-]
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .event import OpenSIPSEvent, OpenSIPSEventException
+    from .handler import OpenSIPSEventHandler
+    from .asyncevent import AsyncOpenSIPSEvent
+    from .batch import OpenSIPSBatchEvent
+    from .eventstream import OpenSIPSEventStream
+    from .workers import OpenSIPSEventWorkers
+    from .reactor import EventReactor
+    from .dispatcher import EventDispatcher
+    from .metrics import EventMetrics
+    from .shared import OpenSIPSSharedEvent
+
+_EXPORTS = {
+    'OpenSIPSEvent': '.event',
+    'OpenSIPSEventException': '.event',
+    'OpenSIPSEventHandler': '.handler',
+    'AsyncOpenSIPSEvent': '.asyncevent',
+    'OpenSIPSBatchEvent': '.batch',
+    'OpenSIPSEventStream': '.eventstream',
+    'OpenSIPSEventWorkers': '.workers',
+    'EventReactor': '.reactor',
+    'EventDispatcher': '.dispatcher',
+    'EventMetrics': '.metrics',
+    'OpenSIPSSharedEvent': '.shared',
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -20,13 +20,18 @@
 """ OpenSIPS Event script """
 
 import sys
-import json
 import time
 import signal
-import argparse
 import os
-from opensips.mi import OpenSIPSMI
-from opensips.event import OpenSIPSEventHandler, OpenSIPSEventException
+from opensips import catalog
+
+# the node used when no options are given; see main()
+NODE_DEFAULTS = {
+    'type': 'datagram',
+    'ip': '127.0.0.1',
+    'port': 8080,
+    'fifo_file': '/tmp/opensips_fifo',
+}
 
 
 def load_env_file(env_file_path):
@@ -39,73 +44,97 @@ def load_env_file(env_file_path):
             key, value = line.strip().split('=', 1)
             os.environ[key] = value
 
-parser = argparse.ArgumentParser()
-
-parser.add_argument('--env-file',
-                    type=str,
-                    default='.env',
-                    help='Load environment variables from file')
-
-communication = parser.add_argument_group('communication')
-
-communication.add_argument('-t', '--type',
-                           type=str,
-                           choices=['fifo', 'http', 'datagram'],
-                           help='OpenSIPS MI Communication Type')
-communication.add_argument('-i', '--ip',
-                           type=str,
-                           help='OpenSIPS MI IP Address')
-communication.add_argument('-p', '--port',
-                           type=int,
-                           help='OpenSIPS MI Port')
-communication.add_argument('-f', '--fifo-file',
-                           metavar='FIFO_FILE',
-                           type=str,
-                           help='OpenSIPS MI FIFO File')
-communication.add_argument('-fb', '--fifo-fallback',
-                           metavar='FIFO_FALLBACK_FILE',
-                           type=str,
-                           help='OpenSIPS MI Fallback FIFO File')
-communication.add_argument('-fd', '--fifo-reply-dir',
-                           metavar='FIFO_DIR',
-                           type=str,
-                           help='OpenSIPS MI FIFO Reply Directory')
-
-parser.add_argument('-bc', '--bash-complete',
-                    type=str,
-                    nargs='?',
-                    const='events',
-                    help='Provide options for bash completion')
-
-event = parser.add_argument_group('event')
-
-event.add_argument('event',
-                   type=str,
-                   nargs='?',
-                   help='OpenSIPS Event Name')
-
-event.add_argument('-T', '--transport',
-                   type=str,
-                   choices=['datagram', 'stream'],
-                   help='OpenSIPS Event Transport',
-                   default='datagram')
-event.add_argument('-li', '--listen-ip',
-                   type=str,
-                   help='OpenSIPS Event Listen IP Address',
-                   default='0.0.0.0')
-event.add_argument('-lp', '--listen-port',
-                   type=int,
-                   help='OpenSIPS Event Listen Port',
-                   default=0)
-event.add_argument('-e', '--expire',
-                   type=int,
-                   help='OpenSIPS Event Expire Time',
-                   default=None)
+def create_parser():
+    """ Builds the parser of the command line """
+    # pylint: disable=import-outside-toplevel
+    import argparse
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--env-file',
+                        type=str,
+                        default='.env',
+                        help='Load environment variables from file')
+
+    communication = parser.add_argument_group('communication')
+
+    communication.add_argument('-t', '--type',
+                               type=str,
+                               choices=['fifo', 'http', 'datagram'],
+                               help='OpenSIPS MI Communication Type')
+    communication.add_argument('-i', '--ip',
+                               type=str,
+                               help='OpenSIPS MI IP Address')
+    communication.add_argument('-p', '--port',
+                               type=int,
+                               help='OpenSIPS MI Port')
+    communication.add_argument('-f', '--fifo-file',
+                               metavar='FIFO_FILE',
+                               type=str,
+                               help='OpenSIPS MI FIFO File')
+    communication.add_argument('-fb', '--fifo-fallback',
+                               metavar='FIFO_FALLBACK_FILE',
+                               type=str,
+                               help='OpenSIPS MI Fallback FIFO File')
+    communication.add_argument('-fd', '--fifo-reply-dir',
+                               metavar='FIFO_DIR',
+                               type=str,
+                               help='OpenSIPS MI FIFO Reply Directory')
+
+    parser.add_argument('-bc', '--bash-complete',
+                        type=str,
+                        nargs='?',
+                        const='events',
+                        help='Provide options for bash completion')
+
+    event = parser.add_argument_group('event')
+
+    event.add_argument('event',
+                       type=str,
+                       nargs='?',
+                       help='OpenSIPS Event Name')
+
+    event.add_argument('-T', '--transport',
+                       type=str,
+                       choices=['datagram', 'stream'],
+                       help='OpenSIPS Event Transport',
+                       default='datagram')
+    event.add_argument('-li', '--listen-ip',
+                       type=str,
+                       help='OpenSIPS Event Listen IP Address',
+                       default='0.0.0.0')
+    event.add_argument('-lp', '--listen-port',
+                       type=int,
+                       help='OpenSIPS Event Listen Port',
+                       default=0)
+    event.add_argument('-e', '--expire',
+                       type=int,
+                       help='OpenSIPS Event Expire Time',
+                       default=None)
+    event.add_argument('-w', '--workers',
+                       type=int,
+                       help='Number of processes handling the events',
+                       default=None)
+    event.add_argument('--reuse-port',
+                       action='store_true',
+                       help='Bind a socket for each worker using SO_REUSEPORT')
+    return parser
 
 
 def main():
     """ Main function of the opensips-event script """
 
+    # completing events is served from the catalog, without loading
+    # the heavier modules or waiting for OpenSIPS
+    if catalog.complete('opensips.event', 'events', NODE_DEFAULTS):
+        sys.exit(0)
+
+    # pylint: disable=import-outside-toplevel
+    import json
+    from opensips.mi import OpenSIPSMI, OpenSIPSMIException
+    from opensips.event import OpenSIPSEventHandler, OpenSIPSEventException
+
+    parser = create_parser()
     args = parser.parse_args()
 
     load_env_file(args.env_file)
@@ -167,6 +196,12 @@ def main():
             events = response.get("Events", [])
             event_names = [event["name"] for event in events]
             print(' '.join(event_names))
+            try:
+                version = mi.execute('version', []).get('Server', '')
+            except OpenSIPSMIException:
+                version = ''
+            catalog.write(catalog.node_key(sys.argv[1:], NODE_DEFAULTS),
+                          'events', event_names, version)
             sys.exit(0)
         except Exception as e:
             options = []
@@ -180,9 +215,15 @@ def main():
         print(f'ERROR: unknown type: {args.type}')
         sys.exit(1)
 
+    sock_args = {
+        'ip': args.listen_ip,
+        'port': args.listen_port,
+    }
+    if args.reuse_port:
+        sock_args['reuse_port'] = True
     hdl = OpenSIPSEventHandler(mi, args.transport,
-                               ip=args.listen_ip,
-                               port=args.listen_port)
+                               workers=args.workers,
+                               **sock_args)
 
     def event_handler(message):
         """ Event handler callback """
@@ -191,7 +232,8 @@ def main():
             sys.exit(1)
 
         try:
-            print(json.dumps(message, indent=4))
+            # workers share stdout, so write each event at once
+            print(json.dumps(message, indent=4), flush=True)
         except json.JSONDecodeError as e:
             print(f"ERROR: failed to decode JSON: {e}")
 
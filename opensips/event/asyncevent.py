@@ -23,18 +23,21 @@
 import asyncio
 from ..mi import OpenSIPSMIException
 from .json_helper import JsonBuffer, JsonBufferMaxAttempts
-from .event import OpenSIPSEventException
+from .event import OpenSIPSEventException, wrap_callback
 
 
 class AsyncOpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
 
     """ Asyncio implementation of the OpenSIPS Event """
 
-    def __init__(self, handler, name: str, callback, expire=None):
+    def __init__(self, handler, name: str, callback, expire=None,
+                 dispatcher=None):
         self._handler = handler
         self.name = name
-        self.callback = callback
-        self.buf = JsonBuffer()
+        self.metrics = handler.new_metrics()
+        self.callback = wrap_callback(callback, self.metrics, dispatcher,
+                                      blocking=False)
+        self.buf = JsonBuffer(metrics=self.metrics)
         if expire is not None:
             self.expire = expire
             self.reregister = False
@@ -45,10 +48,12 @@ class AsyncOpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
         try:
             self.socket = self._handler.__new_socket__()
             self.socket.create()
+            if self.metrics:
+                self.metrics.watch(self.socket)
             self._handler.events[self.name] = self
             self.resubscribe_task = asyncio.create_task(self.resubscribe())
             loop = asyncio.get_running_loop()
-            loop.add_reader(self.socket.sock.fileno(),
+            loop.add_reader(self.socket.fileno(),
                             self.handle, self.callback)
 
         except ValueError as e:
@@ -75,9 +80,8 @@ class AsyncOpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
         try:
             while True:
                 try:
-                    self._handler.__mi_subscribe__(self.name,
-                                                   self.socket.sock_name,
-                                                   self.expire)
+                    await self._handler.__async_mi_subscribe__(
+                            self.name, self.socket.sock_name, self.expire)
                 except OpenSIPSEventException:
                     return
                 except OpenSIPSMIException:
@@ -89,9 +93,16 @@ class AsyncOpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
             pass
 
     def unsubscribe(self):
-        """ Unsubscribes the event """
+        """ Unsubscribes the event; the MI command is run outside of the
+            loop, by the returned task, that can be awaited for it to
+            complete (or to get its errors) """
+        return asyncio.create_task(self.async_unsubscribe())
+
+    async def async_unsubscribe(self):
+        """ Unsubscribes the event, without blocking the loop """
         try:
-            self._handler.__mi_unsubscribe__(self.name, self.socket.sock_name)
+            await self._handler.__async_mi_unsubscribe__(
+                    self.name, self.socket.sock_name)
             self.stop()
             del self._handler.events[self.name]
         except OpenSIPSEventException as e:
@@ -102,6 +113,6 @@ class AsyncOpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
     def stop(self):
         """ Stops the current event processing """
         loop = asyncio.get_running_loop()
-        loop.remove_reader(self.socket.sock.fileno())
+        loop.remove_reader(self.socket.fileno())
         self.resubscribe_task.cancel()
         self.socket.destroy()
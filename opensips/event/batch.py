@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Module that implements batched delivery of OpenSIPS Events """
+
+import select
+import time
+from .event import OpenSIPSEvent
+from .json_helper import JsonBufferMaxAttempts
+
+
+class OpenSIPSBatchEvent(OpenSIPSEvent):
+
+    """ OpenSIPS Event whose callback receives lists of events, flushed
+        when max_batch events are gathered, or max_latency_ms after the
+        first event of the batch was received """
+
+    def __init__(self, handler, name: str, callback, max_batch: int = 100,
+                 max_latency_ms: int = 100, expire=None, dispatcher=None):
+        # pylint: disable=too-many-arguments
+        if max_batch < 1:
+            raise ValueError("max_batch must be positive")
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000
+        self.batch = []
+        self.batch_start = None
+        self.flush_timer = None
+        super().__init__(handler, name, callback, expire, dispatcher)
+
+    def collect(self, chunks):
+        """ Parses all the chunks read and adds the events to the current
+            batch; returns False if no more events can be parsed """
+        try:
+            for data in chunks:
+                self.buf.push(data)
+                j = self.buf.pop()
+                while j:
+                    self.batch.append(j)
+                    j = self.buf.pop()
+        except JsonBufferMaxAttempts:
+            return False
+        if self.batch and self.batch_start is None:
+            self.batch_start = time.monotonic()
+        return True
+
+    def flush(self, callback, full_only=False):
+        """ Runs the callback with the events gathered so far,
+            in chunks of at most max_batch events """
+        while len(self.batch) >= self.max_batch:
+            events = self.batch[:self.max_batch]
+            del self.batch[:self.max_batch]
+            callback(events)
+        if self.batch and not full_only:
+            events = self.batch
+            self.batch = []
+            callback(events)
+        if not self.batch:
+            self.batch_start = None
+
+    def handle(self, callback):
+        """ Handles the event callbacks """
+        while not self.thread_stop.is_set():
+            if not self.check_subscription():
+                self.flush(callback)
+                callback(None)
+                break
+
+            timeout = 0.1
+            if self.batch_start is not None:
+                timeout = max(0, min(timeout, self.batch_start +
+                                     self.max_latency - time.monotonic()))
+            if select.select([self.socket], [], [], timeout)[0]:
+                if not self.collect(self.socket.read_many(self.max_batch)):
+                    self.flush(callback)
+                    callback(None)
+                    return
+                self.flush(callback, full_only=True)
+            if self.batch_start is not None and \
+                    time.monotonic() - self.batch_start >= self.max_latency:
+                self.flush(callback)
+
+    def on_readable(self):
+        if not self.socket.sock:
+            return
+        if not self.collect(self.socket.read_many(self.max_batch)):
+            self.reactor.remove_reader(self.socket)
+            self.cancel_flush()
+            self.flush(self.callback)
+            self.callback(None)
+            return
+        self.flush(self.callback, full_only=True)
+        if not self.batch:
+            self.cancel_flush()
+        elif not self.flush_timer:
+            delay = self.batch_start + self.max_latency - time.monotonic()
+            self.flush_timer = self.reactor.call_later(max(delay, 0),
+                                                       self.on_flush)
+
+    def on_flush(self):
+        """ Called by the reactor when the current batch is due """
+        self.flush_timer = None
+        self.flush(self.callback)
+
+    def cancel_flush(self):
+        """ Cancels the reactor timer of the current batch """
+        if self.flush_timer:
+            self.reactor.cancel(self.flush_timer)
+            self.flush_timer = None
+
+    def on_timer(self):
+        # events received before an expiration must not be lost; on a
+        # resubscription, this only delivers the current batch earlier
+        self.cancel_flush()
+        self.flush(self.callback)
+        super().on_timer()
+
+    def stop(self):
+        if self.reactor:
+            self.cancel_flush()
+        super().stop()
+        self.flush(self.callback)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
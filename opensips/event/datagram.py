@@ -31,6 +31,7 @@ class Datagram(GenericSocket):
         self.ip = None
         self.port = None
         self.sock = None
+        self.reuse_port = bool(kwargs.get("reuse_port", False))
 
         if "unix_path" in kwargs:
             self.sock_name = kwargs["unix_path"]
@@ -41,6 +42,9 @@ class Datagram(GenericSocket):
     def create(self):
         if self.ip is not None:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self.reuse_port:
+                self.sock.setsockopt(socket.SOL_SOCKET,
+                                     socket.SO_REUSEPORT, 1)
             self.sock.bind((self.ip, self.port))
             self.ip, self.port = self.sock.getsockname()
             if self.ip == "0.0.0.0":
@@ -48,6 +52,8 @@ class Datagram(GenericSocket):
                 self.ip = socket.gethostbyname(hostname)
             self.sock_name = f"udp:{self.ip}:{self.port}"
         else:
+            if self.reuse_port:
+                raise ValueError("reuse_port requires an UDP socket")
             self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
             self.sock.bind(self.sock_name)
         # we are waiting blocking, so we don't have to change this
@@ -60,6 +66,24 @@ class Datagram(GenericSocket):
         except socket.timeout:
             return None
 
+    def read_many(self, limit: int):
+        # there is no recvmmsg() in Python, but non-blocking reads until
+        # the queue is empty get the same batching effect; a socket with a
+        # timeout waits for data even with MSG_DONTWAIT, so the timeout is
+        # dropped while draining
+        chunks = []
+        timeout = self.sock.gettimeout()
+        self.sock.settimeout(0)
+        try:
+            while len(chunks) < limit:
+                try:
+                    chunks.append(self.sock.recv(65535))
+                except (BlockingIOError, InterruptedError):
+                    break
+        finally:
+            self.sock.settimeout(timeout)
+        return chunks
+
     def destroy(self):
         if not self.sock:
             return
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Dispatches event callbacks to a pool of workers """
+
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+class EventDispatcher():
+
+    """ Runs the callbacks of events on a pool of thread (or process)
+        workers, through a bounded queue, so that slow callbacks do not
+        stop the reading of the events """
+
+    OVERFLOW_POLICIES = ("block", "drop-oldest", "drop-newest")
+
+    def __init__(self, workers=1, queue_size=1000, overflow="block",
+                 executor="thread"):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy {overflow}")
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Invalid executor {executor}")
+        if workers < 1 or queue_size < 1:
+            raise ValueError("Invalid number of workers or queue size")
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.stopping = False
+        self.queued = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+
+        # callbacks (and events) must be picklable to run in processes
+        if executor == "process":
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.pool = None
+        self.workers = [threading.Thread(target=self.work, daemon=True,
+                                         name="opensips-event-worker")
+                        for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def dispatch(self, callback, event, force=False):
+        """ Queues the callback of an event; returns False if the event
+            was dropped; forced events are always queued """
+        with self.lock:
+            if self.stopping:
+                return False
+            while not force and len(self.queue) >= self.queue_size:
+                if self.overflow == "drop-newest":
+                    self.dropped += 1
+                    return False
+                if self.overflow == "drop-oldest":
+                    self.drop_oldest()
+                    break
+                self.not_full.wait()
+            self.queue.append((callback, event))
+            self.queued += 1
+            self.not_empty.notify()
+        return True
+
+    def drop_oldest(self):
+        """ Drops the oldest queued event; the end of subscription markers
+            (None) are kept; must be called with the lock held """
+        for idx, (_, event) in enumerate(self.queue):
+            if event is not None:
+                del self.queue[idx]
+                self.dropped += 1
+                return
+
+    def wrap(self, callback, blocking=True, timer=None):
+        """ Returns a callback that dispatches the events to callback;
+            blocking is False when the events are read by a thread that
+            must never wait for the workers (i.e. an asyncio loop or a
+            reactor), which rules out the "block" overflow policy; timer
+            wraps the callback run by the worker threads, so that it can
+            be measured even when it runs in another process """
+        if not blocking and self.overflow == "block":
+            raise ValueError("The block overflow policy would stall the "
+                             "reader of the events")
+        if self.pool:
+            callback = self.remote(callback)
+        if timer:
+            callback = timer(callback)
+
+        def dispatched(event):
+            # errors (None) are never dropped
+            self.dispatch(callback, event, event is None)
+        return dispatched
+
+    def remote(self, callback):
+        """ Returns a callback that runs callback in the process pool and
+            waits for it to complete """
+        pool = self.pool
+
+        def submitted(event):
+            return pool.submit(callback, event).result()
+        return submitted
+
+    def work(self):
+        """ Worker loop, running the queued callbacks """
+        while True:
+            with self.lock:
+                while not self.queue and not self.stopping:
+                    self.not_empty.wait()
+                if not self.queue:
+                    return
+                callback, event = self.queue.popleft()
+                self.not_full.notify()
+            failed = False
+            try:
+                callback(event)
+            except Exception:  # pylint: disable=broad-exception-caught
+                failed = True
+                traceback.print_exc()
+            with self.lock:
+                self.processed += 1
+                if failed:
+                    self.failed += 1
+
+    def stats(self):
+        """ Returns the counters of the dispatcher """
+        with self.lock:
+            return {
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "processed": self.processed,
+                "failed": self.failed,
+                "pending": len(self.queue),
+            }
+
+    def close(self, wait=True):
+        """ Stops the workers, after the queued events are processed """
+        with self.lock:
+            self.stopping = True
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+        if wait:
+            for worker in self.workers:
+                worker.join()
+        if self.pool:
+            self.pool.shutdown(wait=wait)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
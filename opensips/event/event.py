@@ -29,18 +29,36 @@ class OpenSIPSEventException(Exception):
     """ Exceptions generated by OpenSIPS Events """
 
 
+def wrap_callback(callback, metrics=None, dispatcher=None, blocking=True):
+    """ Returns the callback to run for each event: timed in metrics, if
+        enabled, and dispatched to the workers of dispatcher, if any, in
+        which case the workers do the timing """
+    timer = metrics.wrap if metrics else None
+    if dispatcher:
+        return dispatcher.wrap(callback, blocking=blocking, timer=timer)
+    if timer:
+        return timer(callback)
+    return callback
+
+
 class OpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
 
     """ Implementation of the OpenSIPS Event """
 
-    def __init__(self, handler, name: str, callback, expire=None):
+    def __init__(self, handler, name: str, callback, expire=None,
+                 dispatcher=None):
         self._handler = handler
         self.name = name
+        self.metrics = handler.new_metrics()
+        callback = wrap_callback(callback, self.metrics, dispatcher,
+                                 blocking=not handler.reactor)
         self.callback = callback
         self.thread = None
+        self.reactor = handler.reactor
+        self.timer = None
         self.thread_stop = Event()
         self.thread_stop.clear()
-        self.buf = JsonBuffer()
+        self.buf = JsonBuffer(metrics=self.metrics)
         if expire is not None:
             self.expire = expire
             self.reregister = False
@@ -53,10 +71,16 @@ class OpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
             self._handler.__mi_subscribe__(self.name,
                                            self.socket.create(),
                                            self.expire)
+            if self.metrics:
+                self.metrics.watch(self.socket)
             self.last_subscription = time.time()
             self._handler.events[self.name] = self
-            self.thread = Thread(target=self.handle, args=(callback,))
-            self.thread.start()
+            if self.reactor:
+                self.reactor.add_reader(self.socket, self.on_readable)
+                self.schedule()
+            else:
+                self.thread = Thread(target=self.handle, args=(callback,))
+                self.thread.start()
         except OpenSIPSEventException as e:
             raise e
         except OpenSIPSMIException as e:
@@ -64,18 +88,24 @@ class OpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
         except ValueError as e:
             raise OpenSIPSEventException("Invalid arguments") from e
 
+    def check_subscription(self):
+        """ Resubscribes for the event, if needed; returns False
+            if the subscription has expired """
+        if self.reregister and \
+                time.time() - self.last_subscription > self.expire - 60:
+            try:
+                self.resubscribe()
+            except Exception:  # pylint: disable=broad-exception-caught
+                return False
+        elif not self.reregister and \
+                time.time() - self.last_subscription > self.expire:
+            return False
+        return True
+
     def handle(self, callback):
         """ Handles the event callbacks """
         while not self.thread_stop.is_set():
-            if self.reregister and \
-                    time.time() - self.last_subscription > self.expire - 60:
-                try:
-                    self.resubscribe()
-                except Exception:  # pylint: disable=broad-exception-caught
-                    callback(None)
-                    break
-            elif not self.reregister and \
-                    time.time() - self.last_subscription > self.expire:
+            if not self.check_subscription():
                 callback(None)
                 break
 
@@ -83,15 +113,52 @@ class OpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
             if not data:
                 continue
 
-            try:
-                self.buf.push(data)
+            if not self.process(data, callback):
+                return
+
+    def process(self, data, callback):
+        """ Runs the callback for each event found in data; returns False
+            if no more events can be parsed """
+        try:
+            self.buf.push(data)
+            j = self.buf.pop()
+            while j:
+                callback(j)
                 j = self.buf.pop()
-                while j:
-                    callback(j)
-                    j = self.buf.pop()
-            except JsonBufferMaxAttempts:
-                callback(None)
+        except JsonBufferMaxAttempts:
+            callback(None)
+            return False
+        return True
+
+    def on_readable(self):
+        """ Called by the reactor when the socket has data """
+        if not self.socket.sock:
+            return
+        data = self.socket.read()
+        if data and not self.process(data, self.callback):
+            self.reactor.remove_reader(self.socket)
+
+    def schedule(self):
+        """ Arms the reactor timer for the next resubscription,
+            or for the expiration of the subscription """
+        if self.reregister:
+            delay = self.last_subscription + self.expire - 60 - time.time()
+        else:
+            delay = self.last_subscription + self.expire - time.time()
+        self.timer = self.reactor.call_later(max(delay, 0), self.on_timer)
+
+    def on_timer(self):
+        """ Called by the reactor to resubscribe or expire the event """
+        self.timer = None
+        if self.reregister:
+            try:
+                self.resubscribe()
+                self.schedule()
                 return
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass
+        self.reactor.remove_reader(self.socket)
+        self.callback(None)
 
     def resubscribe(self):
         """ Resubscribes for the event """
@@ -118,8 +185,14 @@ class OpenSIPSEvent():  # pylint: disable=too-many-instance-attributes
 
     def stop(self):
         """ Stops the current event processing """
-        self.thread_stop.set()
-        self.thread.join()
+        if self.reactor:
+            self.reactor.remove_reader(self.socket)
+            if self.timer:
+                self.reactor.cancel(self.timer)
+                self.timer = None
+        else:
+            self.thread_stop.set()
+            self.thread.join()
         self.socket.destroy()
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
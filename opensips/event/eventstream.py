@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Module that implements an asynchronous iterator over OpenSIPS Events """
+
+import asyncio
+from ..mi import OpenSIPSMIException
+from .asyncevent import AsyncOpenSIPSEvent
+from .event import OpenSIPSEventException
+from .json_helper import JsonBuffer, JsonBufferMaxAttempts
+
+
+class OpenSIPSEventStream(AsyncOpenSIPSEvent):
+
+    """ Asynchronous iterator over the notifications of an OpenSIPS Event;
+        events are buffered in a bounded queue, and the socket is no
+        longer read while the queue is full """
+
+    def __init__(self, handler, name: str, expire=None,
+                 queue_size: int = 1000):
+        # pylint: disable=super-init-not-called
+        # the subscription is done lazily, from within the loop
+        if queue_size < 1:
+            raise ValueError("queue_size must be positive")
+        self._handler = handler
+        self.name = name
+        self.metrics = handler.new_metrics()
+        self.callback = self.put
+        if self.metrics:
+            self.callback = self.metrics.wrap(self.put)
+        self.buf = JsonBuffer(metrics=self.metrics)
+        self.socket = None
+        self.resubscribe_task = None
+        # created by start(), so that it belongs to the running loop
+        self.queue = None
+        self.queue_size = queue_size
+        self.reading = False
+        self.started = False
+        self.closed = False
+        if expire is not None:
+            self.expire = expire
+            self.reregister = False
+        else:
+            self.expire = 3600
+            self.reregister = True
+
+    async def start(self):
+        """ Subscribes for the event and starts reading notifications """
+        if self.started:
+            return
+        self.started = True
+        self.queue = asyncio.Queue()
+        try:
+            self.socket = self._handler.__new_socket__()
+            self.socket.create()
+            if self.metrics:
+                self.metrics.watch(self.socket)
+        except ValueError as e:
+            raise OpenSIPSEventException("Invalid arguments") from e
+        try:
+            await self._handler.__async_mi_subscribe__(
+                    self.name, self.socket.sock_name, self.expire)
+        except (OpenSIPSEventException, OpenSIPSMIException) as e:
+            self.closed = True
+            self.socket.destroy()
+            raise e
+        self._handler.events[self.name] = self
+        self.resubscribe_task = asyncio.create_task(self.renew())
+        self.resume()
+
+    async def renew(self):
+        """ Resubscribes for the event, or ends the stream on expiry """
+        try:
+            while self.reregister:
+                await asyncio.sleep(self.expire - 60)
+                try:
+                    await self._handler.__async_mi_subscribe__(
+                            self.name, self.socket.sock_name, self.expire)
+                except (OpenSIPSEventException, OpenSIPSMIException):
+                    break
+            else:
+                await asyncio.sleep(self.expire)
+            self.pause()
+            self.queue.put_nowait(None)
+        except asyncio.CancelledError:
+            pass
+
+    def pause(self):
+        """ Stops reading the socket """
+        if self.reading:
+            asyncio.get_running_loop().remove_reader(self.socket.fileno())
+            self.reading = False
+
+    def resume(self):
+        """ Starts reading the socket again """
+        if not self.reading and not self.closed:
+            asyncio.get_running_loop().add_reader(self.socket.fileno(),
+                                                  self.handle, self.put)
+            self.reading = True
+
+    def put(self, event):
+        """ Queues a received event; None ends the stream """
+        if event is None:
+            self.pause()
+        self.queue.put_nowait(event)
+        if self.queue.qsize() >= self.queue_size:
+            self.pause()
+
+    def handle(self, callback):
+        # read as many notifications as there is room for in one go
+        room = self.queue_size - self.queue.qsize()
+        try:
+            for data in self.socket.read_many(max(room, 1)):
+                self.buf.push(data)
+                j = self.buf.pop()
+                while j:
+                    callback(j)
+                    j = self.buf.pop()
+        except JsonBufferMaxAttempts:
+            callback(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.started and not self.closed:
+            await self.start()
+        if self.closed and (self.queue is None or self.queue.empty()):
+            raise StopAsyncIteration
+        event = await self.queue.get()
+        if event is None:
+            await self.aclose()
+            raise StopAsyncIteration
+        if self.queue.qsize() < self.queue_size:
+            self.resume()
+        return event
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """ Unsubscribes from the event and ends the stream """
+        if self.closed or not self.started:
+            self.closed = True
+            return
+        self.closed = True
+        self.pause()
+        self.resubscribe_task.cancel()
+        if self._handler.events.get(self.name) is self:
+            del self._handler.events[self.name]
+        try:
+            await self._handler.__async_mi_unsubscribe__(
+                    self.name, self.socket.sock_name)
+        finally:
+            self.socket.destroy()
+            # wake up a consumer that might be waiting for events
+            self.queue.put_nowait(None)
+
+    def unsubscribe(self):
+        """ Unsubscribes the event """
+        self._handler.__mi_unsubscribe__(self.name, self.socket.sock_name)
+        self.stop()
+        del self._handler.events[self.name]
+
+    def stop(self):
+        """ Stops the current event processing """
+        self.closed = True
+        self.pause()
+        if self.resubscribe_task:
+            self.resubscribe_task.cancel()
+        if self.socket:
+            self.socket.destroy()
+        if self.queue is not None:
+            self.queue.put_nowait(None)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -26,6 +26,9 @@ class GenericSocket(ABC):
 
     """ Abstract class for a socket generic implementation """
 
+    # the OS socket, while created
+    sock = None
+
     @abstractmethod
     def __init__(self, **kwargs):
         pass
@@ -41,3 +44,20 @@ class GenericSocket(ABC):
     @abstractmethod
     def destroy(self):
         """ Destroys the socket """
+
+    def read_many(self, limit: int):
+        """ Reads the data available on the socket, without waiting
+            (for more than one read); returns a list of chunks """
+        data = self.read()
+        return [data] if data else []
+
+    def sockets(self) -> list:
+        """ Returns the OS sockets notifications are received on """
+        return [self.sock] if self.sock else []
+
+    def fileno(self):
+        """ Returns the descriptor that becomes readable when
+            there is data to read """
+        if not self.sock:
+            return -1
+        return self.sock.fileno()
@@ -20,18 +20,27 @@
 """ Module that implements an OpenSIPS Event Handler
     to manage events subscriptions """
 
+import asyncio
 from ..mi import OpenSIPSMI, OpenSIPSMIException
 from .event import OpenSIPSEvent, OpenSIPSEventException
 from .asyncevent import AsyncOpenSIPSEvent
+from .batch import OpenSIPSBatchEvent
+from .eventstream import OpenSIPSEventStream
+from .workers import OpenSIPSEventWorkers
+from .shared import OpenSIPSSharedSocket
 from .datagram import Datagram
 from .stream import Stream
+from .reactor import EventReactor
+from .metrics import EventMetrics
 
 
 class OpenSIPSEventHandler():
 
     """ Implementation of the OpenSIPS Event Handler"""
 
-    def __init__(self, mi: OpenSIPSMI = None, _type: str = None, **kwargs):
+    def __init__(self, mi: OpenSIPSMI = None, _type: str = None,
+                 reactor=False, workers=None, metrics=False,
+                 lag_field=None, shared=False, **kwargs):
         if mi:
             self.mi = mi
         else:
@@ -42,6 +51,52 @@ class OpenSIPSEventHandler():
             self._type = "datagram"
         self.kwargs = kwargs
         self.events = {}
+        # subscriptions are serviced by a single reactor thread, instead of
+        # a thread each; an EventReactor can be shared between handlers
+        if isinstance(reactor, EventReactor):
+            self.reactor = reactor
+        elif reactor:
+            self.reactor = EventReactor()
+        else:
+            self.reactor = None
+        # notifications are handled by forked processes sharing the socket
+        if workers and self.reactor:
+            raise ValueError("workers cannot be used with a reactor")
+        self.workers = workers
+        # all the events are received on a single socket
+        if shared and workers:
+            raise ValueError("workers cannot be used with a shared socket")
+        self.share_socket = shared
+        self.shared_socket = None
+        # the notifications of each subscription can be measured (opt-in)
+        self.metrics_enabled = metrics
+        self.lag_field = lag_field
+
+    def new_metrics(self):
+        """ Returns the metrics of a new subscription, if enabled """
+        if not self.metrics_enabled:
+            return None
+        return EventMetrics(self.lag_field)
+
+    def metrics(self) -> dict:
+        """ Returns the metrics of each subscription and, under "total",
+            the metrics of all the subscriptions together """
+        total = EventMetrics()
+        events = {}
+        for name, event in list(self.events.items()):
+            if getattr(event, "metrics", None):
+                events[name] = event.metrics.snapshot()
+                total.merge(event.metrics)
+        if self.shared_socket and self.shared_socket.metrics:
+            events["shared"] = self.shared_socket.metrics.snapshot()
+            total.merge(self.shared_socket.metrics)
+        if not events:
+            return {}
+        total = total.snapshot()
+        # subscriptions have different lifetimes, so add up their rates
+        for rate in ("events_per_sec", "recent_events_per_sec"):
+            total[rate] = sum(metrics[rate] for metrics in events.values())
+        return {"events": events, "total": total}
 
     def __new_socket__(self):
         if self._type == "datagram":
@@ -50,17 +105,45 @@ class OpenSIPSEventHandler():
             return Stream(**self.kwargs)
         raise ValueError("Invalid event type")
 
-    def subscribe(self, event_name: str, callback, expire=None):
+    def subscribe(self, event_name: str, callback, expire=None,
+                  dispatcher=None):
         """ Subscribes for a particular event """
-        return OpenSIPSEvent(self, event_name, callback, expire)
+        if self.share_socket:
+            if self.shared_socket is None:
+                self.shared_socket = OpenSIPSSharedSocket(self)
+            return self.shared_socket.subscribe(event_name, callback, expire,
+                                                dispatcher)
+        if self.workers:
+            if dispatcher:
+                raise OpenSIPSEventException(
+                        "A dispatcher cannot be used with workers")
+            return OpenSIPSEventWorkers(self, event_name, callback,
+                                        self.workers, expire)
+        return OpenSIPSEvent(self, event_name, callback, expire, dispatcher)
+
+    def subscribe_batch(self, event_name: str, callback, max_batch=100,
+                        max_latency_ms=100, expire=None, dispatcher=None):
+        """ Subscribes for a particular event, the callback receiving
+            lists of events """
+        # pylint: disable=too-many-arguments
+        return OpenSIPSBatchEvent(self, event_name, callback, max_batch,
+                                  max_latency_ms, expire, dispatcher)
 
-    def async_subscribe(self, event_name: str, callback, expire=None):
+    def async_subscribe(self, event_name: str, callback, expire=None,
+                        dispatcher=None):
         """ Subscribes asynchronously for a particular event """
-        return AsyncOpenSIPSEvent(self, event_name, callback, expire)
+        return AsyncOpenSIPSEvent(self, event_name, callback, expire,
+                                  dispatcher)
+
+    def events_stream(self, event_name: str, expire=None, queue_size=1000):
+        """ Returns an asynchronous iterator over the notifications of a
+            particular event; the subscription is done on first use """
+        return OpenSIPSEventStream(self, event_name, expire, queue_size)
 
     def unsubscribe(self, event_name: str):
-        """ Unsubscribes for a particular event """
-        self.events[event_name].unsubscribe()
+        """ Unsubscribes for a particular event; for asyncio events, returns
+            the task doing it """
+        return self.events[event_name].unsubscribe()
 
     def __mi_subscribe__(self, event_name: str, sock_name: str, expire):
         try:
@@ -72,6 +155,19 @@ class OpenSIPSEventHandler():
         except OpenSIPSMIException as e:
             raise e
 
+    async def __async_mi_subscribe__(self, event_name: str, sock_name: str,
+                                     expire):
+        # the MI connector is blocking, so run it outside of the loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.__mi_subscribe__,
+                                   event_name, sock_name, expire)
+
+    async def __async_mi_unsubscribe__(self, event_name: str,
+                                       sock_name: str):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.__mi_unsubscribe__,
+                                   event_name, sock_name)
+
     def __mi_unsubscribe__(self, event_name: str, sock_name: str):
         try:
             ret_val = self.mi.execute("event_subscribe",
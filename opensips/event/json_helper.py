@@ -19,51 +19,151 @@
 
 """ Helper to extract JSON from response """
 
-import json
-from collections import OrderedDict
+import re
+import time
+from itertools import islice
+from collections import deque
+from .. import codec
 
 
 class JsonBufferMaxAttempts(Exception):
     """ Raised when the max attempts is reached """
 
 
+class JsonSplitter:
+
+    """ Splits a stream of bytes into complete top-level JSON values,
+        keeping the scanning state between chunks """
+
+    # characters that change the structure, outside and inside strings
+    STRUCTURE = re.compile(rb'[][{}"]')
+    STRING = re.compile(rb'["\\]')
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.pos = 0
+        self.start = None
+        self.depth = 0
+        self.in_string = False
+
+    def idle(self):
+        """ Checks if there is no partial value buffered """
+        return self.start is None
+
+    def feed(self, data):
+        """ Adds data and returns the list of completed values """
+        values = []
+        buf = self.buf
+        buf += data
+        pos = self.pos
+        end = len(buf)
+        while pos < end:
+            if self.in_string:
+                match = self.STRING.search(buf, pos)
+                if not match:
+                    pos = end
+                    break
+                if buf[match.start()] == 0x5c:  # backslash
+                    if match.end() == end:
+                        # the escaped character is in the next chunk
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                self.in_string = False
+                continue
+            match = self.STRUCTURE.search(buf, pos)
+            if not match:
+                pos = end
+                break
+            char = buf[match.start()]
+            pos = match.end()
+            if char == 0x22:  # quote
+                # anything outside a value is garbage, strings included
+                self.in_string = self.depth > 0
+            elif char in (0x7b, 0x5b):  # { [
+                if self.depth == 0:
+                    self.start = match.start()
+                self.depth += 1
+            elif self.depth > 0:  # } ]
+                self.depth -= 1
+                if self.depth == 0:
+                    values.append(bytes(buf[self.start:pos]))
+                    self.start = None
+
+        # drop everything that was consumed
+        consumed = pos if self.start is None else self.start
+        del buf[:consumed]
+        self.pos = pos - consumed
+        if self.start is not None:
+            self.start = 0
+        return values
+
+
 class JsonBuffer:
 
     """ Class that parses and handles partial Json Data """
-    def __init__(self, max_retries=10):
-        self.queue = []
+    def __init__(self, max_retries=10, metrics=None):
+        self.queue = deque()
         self.retries = 0
         self.max_retries = max_retries
-        self.buf = ""
+        self.splitter = JsonSplitter()
+        self.failures = 0
+        self.metrics = metrics
 
     def push(self, data):
         """ Pushes data into JsonBuffer """
-        self.buf += data.decode("utf-8")
 
         # try to parse the json
-        self.parse()
+        if self.metrics is None:
+            self.parse(data)
+        else:
+            self.measure(data)
         if not self.queue:
             self.retries += 1
 
         if self.retries > self.max_retries:
+            if self.metrics is not None:
+                self.metrics.buffer_reset()
             raise JsonBufferMaxAttempts()
 
+    def measure(self, data):
+        """ Parses data and accounts it in the metrics """
+        queued = len(self.queue)
+        failures = self.failures
+        start = time.perf_counter_ns()
+        self.parse(data)
+        elapsed = time.perf_counter_ns() - start
+        self.metrics.parsed(len(data), list(islice(self.queue, queued, None)),
+                            elapsed, self.failures - failures)
+
     def pop(self):
         """ Retrieves a json from the buffer """
-        if len(self.queue) == 0:
+        if not self.queue:
             return None
         self.retries = 0
-        return self.queue.pop(0)
+        return self.queue.popleft()
 
-    def parse(self):
-        """ Parses the current json buffer """
-        while len(self.buf) > 0:
+    def parse(self, data):
+        """ Parses the complete json objects out of data """
+        if self.splitter.idle() and data.rstrip().endswith(b"}"):
+            # most of the time a chunk (i.e. a datagram) holds exactly one
+            # object, that can be decoded without scanning it first
             try:
-                json_decoder = json.JSONDecoder(object_pairs_hook=OrderedDict)
-                json_obj, idx = json_decoder.raw_decode(self.buf)
-                self.queue.append(json_obj)
-                self.buf = self.buf[idx:]
-            except json.JSONDecodeError:
-                break
+                self.queue.append(self.decode(data))
+                return
+            except ValueError:
+                pass
+        for value in self.splitter.feed(data):
+            try:
+                self.queue.append(self.decode(value))
+            except ValueError:
+                self.failures += 1
+
+    @staticmethod
+    def decode(data):
+        """ Decodes a complete json value """
+        return codec.loads(data)
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
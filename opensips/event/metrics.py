@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Metrics of the event notifications received """
+
+import os
+import time
+import array
+import socket
+import threading
+
+try:
+    import fcntl
+    import termios
+except ImportError:
+    fcntl = None
+
+from ..histogram import Histogram
+
+# files listing the inet sockets of the kernel, with their receive queues
+PROC_NET = ("/proc/net/udp", "/proc/net/udp6",
+            "/proc/net/tcp", "/proc/net/tcp6")
+
+INET_FAMILIES = (socket.AF_INET, socket.AF_INET6)
+
+
+def pending_bytes(sock):
+    """ Returns the bytes that can be read from a socket (FIONREAD), or None
+        if they cannot be queried; for datagram sockets, this is only the
+        size of the next datagram """
+    if fcntl is None:
+        return None
+    try:
+        size = array.array("i", [0])
+        fcntl.ioctl(sock.fileno(), termios.FIONREAD, size)
+        return size[0]
+    except (OSError, ValueError):
+        return None
+
+
+def proc_net_depth(inodes):
+    """ Returns the sum of the receive queues of the inet sockets with the
+        given inodes, as listed in /proc/net, or None if not found """
+    depth = None
+    for path in PROC_NET:
+        try:
+            with open(path, encoding="ascii") as proc:
+                next(proc)
+                for line in proc:
+                    fields = line.split()
+                    if len(fields) > 9 and fields[9] in inodes:
+                        # tx_queue:rx_queue, in hex
+                        rx_queue = int(fields[4].split(":")[1], 16)
+                        depth = (depth or 0) + rx_queue
+        except OSError:
+            continue
+    return depth
+
+
+def queue_depth(sockets):
+    """ Returns the number of bytes waiting in the kernel receive queues
+        of the sockets, or None if this is not known; inet sockets are
+        looked up in /proc/net (i.e. only on Linux), all others are
+        queried with FIONREAD """
+    inodes = set()
+    depth = None
+    for sock in sockets:
+        try:
+            if sock.family in INET_FAMILIES:
+                inodes.add(str(os.fstat(sock.fileno()).st_ino))
+                continue
+        except (OSError, ValueError):
+            continue
+        pending = pending_bytes(sock)
+        if pending is not None:
+            depth = (depth or 0) + pending
+    if inodes:
+        inet_depth = proc_net_depth(inodes)
+        if inet_depth is not None:
+            depth = (depth or 0) + inet_depth
+    return depth
+
+
+class EventMetrics():
+
+    """ Metrics of the notifications of a subscription: the reads, bytes
+        and events received, the parse failures, the buffer resets and
+        histograms of the parse and callback times; when the events carry
+        a timestamp (seconds since the epoch) in the lag_field parameter,
+        the lag between the event and its arrival is also measured """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, lag_field: str = None, precision: int = 7):
+        self.lag_field = lag_field
+        self.precision = precision
+        self.lock = threading.Lock()
+        self.sockets = []
+        self.created = time.time()
+        self.last_snapshot = (time.monotonic(), 0)
+        self.reset()
+
+    def reset(self):
+        """ Drops all the metrics """
+        self.reads = 0
+        self.bytes = 0
+        self.events = 0
+        self.parse_failures = 0
+        self.resets = 0
+        self.last_arrival = None
+        self.parse_time = Histogram(self.precision)
+        self.callback_time = Histogram(self.precision)
+        self.lag = Histogram(self.precision)
+
+    def watch(self, sock):
+        """ Adds a socket whose kernel receive queue is reported """
+        self.sockets.append(sock)
+
+    def parsed(self, size: int, events, elapsed: int, failures: int):
+        """ Accounts a read of size bytes, parsed in elapsed nanoseconds
+            into events """
+        now = time.time()
+        with self.lock:
+            self.reads += 1
+            self.bytes += size
+            self.parse_time.record(elapsed)
+            self.parse_failures += failures
+            if not events:
+                return
+            self.events += len(events)
+            self.last_arrival = now
+            if self.lag_field:
+                for event in events:
+                    self.record_lag(event, now)
+
+    def record_lag(self, event, now: float):
+        """ Records the lag of an event, in microseconds """
+        try:
+            sent = float(event["params"][self.lag_field])
+        except (KeyError, TypeError, ValueError):
+            return
+        self.lag.record(max(int((now - sent) * 1e6), 0))
+
+    def buffer_reset(self):
+        """ Accounts a buffer reset, after too many failed parses """
+        with self.lock:
+            self.resets += 1
+
+    def wrap(self, callback):
+        """ Returns a callback that measures the time spent in callback """
+        clock = time.perf_counter_ns
+
+        def timed(event):
+            start = clock()
+            try:
+                return callback(event)
+            finally:
+                elapsed = clock() - start
+                with self.lock:
+                    self.callback_time.record(elapsed)
+        return timed
+
+    def merge(self, other):
+        """ Adds the metrics of another subscription """
+        with other.lock:
+            self.reads += other.reads
+            self.bytes += other.bytes
+            self.events += other.events
+            self.parse_failures += other.parse_failures
+            self.resets += other.resets
+            if other.last_arrival and \
+                    (not self.last_arrival or
+                     other.last_arrival > self.last_arrival):
+                self.last_arrival = other.last_arrival
+            self.parse_time.merge(other.parse_time)
+            self.callback_time.merge(other.callback_time)
+            self.lag.merge(other.lag)
+            self.sockets.extend(other.sockets)
+            self.created = min(self.created, other.created)
+
+    def snapshot(self) -> dict:
+        """ Returns the metrics; events_per_sec is the rate since the
+            subscription, recent_events_per_sec the rate since the previous
+            snapshot; times are in microseconds and lags in milliseconds """
+        now = time.monotonic()
+        with self.lock:
+            last_time, last_events = self.last_snapshot
+            self.last_snapshot = (now, self.events)
+            uptime = time.time() - self.created
+            metrics = {
+                "reads": self.reads,
+                "bytes": self.bytes,
+                "events": self.events,
+                "parse_failures": self.parse_failures,
+                "resets": self.resets,
+                "events_per_sec": self.events / uptime if uptime else 0.0,
+                "recent_events_per_sec": (self.events - last_events) /
+                (now - last_time) if now > last_time else 0.0,
+                "last_arrival": self.last_arrival,
+                "parse_us": self.parse_time.summary(1000),
+                "callback_us": self.callback_time.summary(1000),
+                "lag_ms": self.lag.summary(1000),
+            }
+            sockets = [sock for generic in self.sockets
+                       for sock in generic.sockets()]
+        metrics["queue_bytes"] = queue_depth(sockets)
+        return metrics
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
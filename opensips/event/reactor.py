@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Reactor that services many event subscriptions from a single thread """
+
+import heapq
+import socket
+import selectors
+import threading
+import itertools
+import traceback
+from time import monotonic
+
+
+class EventReactor():
+
+    """ Selector based loop that dispatches the readable sockets and the
+        timers of all the subscriptions registered with it """
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.timers = []
+        self.seq = itertools.count()
+        self.readers = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.wakeup_recv, self.wakeup_send = socket.socketpair()
+        self.wakeup_recv.setblocking(False)
+        self.wakeup_send.setblocking(False)
+        self.selector.register(self.wakeup_recv, selectors.EVENT_READ, None)
+
+    def add_reader(self, fileobj, callback):
+        """ Runs callback whenever fileobj becomes readable """
+        with self.lock:
+            self.selector.register(fileobj, selectors.EVENT_READ, callback)
+            self.readers += 1
+            self.start()
+
+    def remove_reader(self, fileobj):
+        """ Stops watching fileobj """
+        with self.lock:
+            try:
+                self.selector.unregister(fileobj)
+                self.readers -= 1
+            except (KeyError, ValueError):
+                pass
+            self.wakeup()
+
+    def call_later(self, delay, callback):
+        """ Runs callback after delay seconds; returns the timer """
+        timer = [monotonic() + delay, next(self.seq), callback]
+        with self.lock:
+            heapq.heappush(self.timers, timer)
+            self.start()
+        return timer
+
+    def cancel(self, timer):
+        """ Cancels a timer returned by call_later """
+        with self.lock:
+            # cancelled timers are dropped when they expire
+            timer[2] = None
+            self.wakeup()
+
+    def start(self):
+        """ Starts the reactor thread, if not already running;
+            must be called with the lock held """
+        if self.thread:
+            self.wakeup()
+            return
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       name="opensips-event-reactor")
+        self.thread.start()
+
+    def wakeup(self):
+        """ Interrupts the select so that changes are picked up """
+        try:
+            self.wakeup_send.send(b"\0")
+        except BlockingIOError:
+            pass
+
+    def next_timeout(self):
+        """ Returns the time until the next timer, or None if none;
+            stops the reactor if there is nothing left to wait for;
+            must be called with the lock held """
+        while self.timers and self.timers[0][2] is None:
+            heapq.heappop(self.timers)
+        if self.timers:
+            return max(self.timers[0][0] - monotonic(), 0)
+        if not self.readers:
+            self.thread = None
+            return -1
+        return None
+
+    def run(self):
+        """ The reactor loop """
+        while True:
+            with self.lock:
+                timeout = self.next_timeout()
+            if timeout is not None and timeout < 0:
+                return
+            for key, _ in self.selector.select(timeout):
+                if key.data is None:
+                    try:
+                        while self.wakeup_recv.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                self.dispatch(key.data)
+
+            now = monotonic()
+            while True:
+                with self.lock:
+                    if not self.timers or self.timers[0][0] > now:
+                        break
+                    callback = heapq.heappop(self.timers)[2]
+                if callback:
+                    self.dispatch(callback)
+
+    @staticmethod
+    def dispatch(callback):
+        """ Runs a callback, without letting it break the loop """
+        try:
+            callback()
+        except Exception:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Module that implements many OpenSIPS Events sharing a single socket """
+
+import time
+from threading import Thread, Event
+from .event import OpenSIPSEvent, OpenSIPSEventException, wrap_callback
+from .json_helper import JsonBuffer, JsonBufferMaxAttempts
+
+
+class OpenSIPSSharedSocket(OpenSIPSEvent):
+
+    """ Socket (and reader) shared by all the events of a handler; the
+        notifications are routed to the callbacks of their event by a
+        table indexed by the event name (the "method" of the notification) """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, handler):
+        # pylint: disable=super-init-not-called
+        self._handler = handler
+        self.name = None
+        self.metrics = handler.new_metrics()
+        self.callback = self.dispatch
+        self.thread = None
+        self.reactor = handler.reactor
+        self.timer = None
+        self.thread_stop = Event()
+        self.buf = JsonBuffer(metrics=self.metrics)
+        # event name -> tuple of callbacks; replaced, not changed in place,
+        # so that it can be read by the reader without locking
+        self.routes = {}
+        self.subscriptions = {}
+        self.next_check = 0
+
+        try:
+            self.socket = self._handler.__new_socket__()
+            self.socket.create()
+        except ValueError as e:
+            raise OpenSIPSEventException("Invalid arguments") from e
+        if self.metrics:
+            self.metrics.watch(self.socket)
+        if self.reactor:
+            self.reactor.add_reader(self.socket, self.on_readable)
+        else:
+            self.thread = Thread(target=self.handle, args=(self.dispatch,))
+            self.thread.start()
+
+    def subscribe(self, name: str, callback, expire=None, dispatcher=None):
+        """ Adds a callback for an event; the event is subscribed for on
+            the shared socket only when its first callback is added """
+        event = self.subscriptions.get(name)
+        if event is not None:
+            event.add(callback, dispatcher)
+            return event
+        event = OpenSIPSSharedEvent(self, name, expire)
+        try:
+            # the route is installed first, so that the notifications
+            # sent right after the subscription are not lost
+            event.add(callback, dispatcher)
+            event.register()
+        except Exception:
+            # the socket is closed if this was its first event
+            self.drop(event)
+            raise
+        self.subscriptions[name] = event
+        return event
+
+    def dispatch(self, event):
+        """ Runs the callbacks of the event of a notification; None is
+            passed to all the callbacks """
+        if event is None:
+            for subscription in list(self.subscriptions.values()):
+                subscription.notify(None)
+            return
+        if not isinstance(event, dict):
+            return
+        for callback in self.routes.get(event.get("method"), ()):
+            callback(event)
+
+    def process(self, data, callback):
+        """ Runs the callback for each event found in data; the reader is
+            shared by all the events, so data that cannot be parsed is
+            dropped and reading goes on """
+        try:
+            self.buf.push(data)
+            j = self.buf.pop()
+            while j:
+                callback(j)
+                j = self.buf.pop()
+        except JsonBufferMaxAttempts:
+            self.buf = JsonBuffer(metrics=self.metrics)
+        return True
+
+    def check_subscription(self):
+        """ Renews (or expires) the subscriptions that are due; they are
+            checked at most once a second """
+        now = time.time()
+        if now >= self.next_check:
+            self.next_check = now + 1
+            for event in list(self.subscriptions.values()):
+                if not event.check_subscription():
+                    event.expired()
+        return True
+
+    def drop(self, event, close=True):
+        """ Removes the routes of an event; the socket is closed when
+            there are no events left, unless close is False """
+        self.subscriptions.pop(event.name, None)
+        self.routes.pop(event.name, None)
+        if close and not self.subscriptions:
+            self.stop()
+
+    def stop(self):
+        """ Stops reading the notifications and closes the socket """
+        super().stop()
+        self.socket.destroy()
+        if self._handler.shared_socket is self:
+            self._handler.shared_socket = None
+
+
+class OpenSIPSSharedEvent(OpenSIPSEvent):
+
+    """ OpenSIPS Event received on the handler's shared socket; it can
+        have any number of callbacks """
+
+    def __init__(self, shared, name: str, expire=None):
+        # pylint: disable=super-init-not-called
+        self._handler = shared._handler
+        self.shared = shared
+        self.name = name
+        self.socket = shared.socket
+        self.reactor = shared.reactor
+        self.timer = None
+        self.metrics = None
+        self.callbacks = []
+        self.handlers = []
+        if expire is not None:
+            self.expire = expire
+            self.reregister = False
+        else:
+            self.expire = 3600
+            self.reregister = True
+        self.last_subscription = None
+
+    def register(self):
+        """ Subscribes for the event on the shared socket """
+        self._handler.__mi_subscribe__(self.name, self.socket.sock_name,
+                                       self.expire)
+        self.last_subscription = time.time()
+        self._handler.events[self.name] = self
+        if self.reactor:
+            self.schedule()
+
+    def add(self, callback, dispatcher=None):
+        """ Adds a callback for the event """
+        wrapped = wrap_callback(callback, self.shared.metrics, dispatcher,
+                                blocking=not self.shared.reactor)
+        self.handlers.append(callback)
+        self.callbacks.append(wrapped)
+        self.shared.routes[self.name] = tuple(self.callbacks)
+
+    def remove(self, callback):
+        """ Removes a callback of the event; the event is unsubscribed
+            when its last callback is removed """
+        index = self.handlers.index(callback)
+        del self.handlers[index]
+        del self.callbacks[index]
+        if self.callbacks:
+            self.shared.routes[self.name] = tuple(self.callbacks)
+        else:
+            self.unsubscribe()
+
+    def notify(self, event):
+        """ Runs all the callbacks of the event """
+        for callback in self.callbacks:
+            callback(event)
+
+    def on_timer(self):
+        """ Called by the reactor to resubscribe or expire the event """
+        self.timer = None
+        if self.reregister:
+            try:
+                self.resubscribe()
+                self.schedule()
+                return
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass
+        self.expired()
+
+    def expired(self):
+        """ Drops the event, once its subscription expired """
+        self.shared.drop(self, close=False)
+        if self._handler.events.get(self.name) is self:
+            del self._handler.events[self.name]
+        self.notify(None)
+
+    def stop(self):
+        """ Stops routing the notifications of the event """
+        if self.timer:
+            self.reactor.cancel(self.timer)
+            self.timer = None
+        self.shared.drop(self)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
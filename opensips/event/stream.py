@@ -20,18 +20,23 @@
 """ Implements TCP/Stream Connection """
 
 import socket
+import selectors
 from .generic_socket import GenericSocket
+from .json_helper import JsonSplitter
 
 
 class Stream(GenericSocket):
 
-    """ TCP/Stream implementation of a socket """
+    """ TCP/Stream implementation of a socket; connections are kept open
+        and the events of each connection are framed separately """
 
     def __init__(self, **kwargs):
         self.ip = kwargs.get("ip", "0.0.0.0")
         self.port = int(kwargs.get("port", 0))
+        self.backlog = int(kwargs.get("backlog", socket.SOMAXCONN))
         self.sock = None
         self.sock_name = None
+        self.selector = None
 
     def create(self):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -40,19 +45,87 @@ class Stream(GenericSocket):
         if self.ip == "0.0.0.0":
             hostname = socket.gethostname()
             self.ip = socket.gethostbyname(hostname)
-        self.sock_name = f"udp:{self.ip}:{self.port}"
-        self.sock.settimeout(0.1)
-        self.sock.listen(1)
+        self.sock_name = f"tcp:{self.ip}:{self.port}"
+        self.sock.setblocking(False)
+        self.sock.listen(self.backlog)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ, None)
         return self.sock_name
 
+    def accept(self):
+        """ Accepts all the pending connections """
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            conn.setblocking(False)
+            self.selector.register(conn, selectors.EVENT_READ,
+                                   JsonSplitter())
+
+    def drain(self, conn, splitter):
+        """ Reads all the available data of a connection and returns the
+            complete events received """
+        events = []
+        while True:
+            try:
+                data = conn.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return events
+            except OSError:
+                data = None
+            if not data:
+                # peer is gone - a partial event is lost anyway
+                self.selector.unregister(conn)
+                conn.close()
+                return events
+            events.extend(splitter.feed(data))
+
     def read(self):
-        try:
-            conn, _ = self.sock.accept()
-            with conn:
-                return conn.recv(65536)
-        except socket.timeout:
+        return self.poll(0.1)
+
+    def poll(self, timeout: float):
+        """ Waits up to timeout seconds for events and returns them,
+            joined, or None if there are none """
+        events = []
+        for key, _ in self.selector.select(timeout):
+            if key.data is None:
+                self.accept()
+            else:
+                events.extend(self.drain(key.fileobj, key.data))
+        if not events:
             return None
+        return b"".join(events)
+
+    def read_many(self, limit: int):
+        # only the connections that are already readable are drained
+        data = self.poll(0)
+        return [data] if data else []
+
+    def sockets(self):
+        if not self.sock:
+            return []
+        return [key.fileobj for key in list(self.selector.get_map().values())]
+
+    def fileno(self):
+        # the selector's own descriptor (epoll/kqueue) is readable whenever
+        # any of the connections is; otherwise, only new connections
+        # can be watched from the outside
+        if not self.sock:
+            return -1
+        if hasattr(self.selector, "fileno"):
+            return self.selector.fileno()
+        return self.sock.fileno()
 
     def destroy(self):
+        if not self.sock:
+            return
+        for key in list(self.selector.get_map().values()):
+            if key.data is not None:
+                key.fileobj.close()
+        self.selector.close()
+        self.selector = None
         self.sock.close()
         self.sock = None
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
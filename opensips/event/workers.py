@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Module that implements OpenSIPS Events processed by worker processes """
+
+import multiprocessing
+import signal
+import socket
+import threading
+import time
+from ..mi import OpenSIPSMIException
+from .datagram import Datagram
+from .event import OpenSIPSEvent, OpenSIPSEventException
+from .json_helper import JsonBuffer, JsonBufferMaxAttempts
+
+
+class OpenSIPSEventWorkers(OpenSIPSEvent):
+
+    """ OpenSIPS Event whose notifications are parsed and handled by a
+        number of forked worker processes; the subscription is done (and
+        renewed) once, by the parent process """
+
+    def __init__(self, handler, name: str, callback, workers: int,
+                 expire=None):
+        # pylint: disable=super-init-not-called
+        self._handler = handler
+        self.name = name
+        self.callback = callback
+        self.reactor = None
+        self.timer = None
+        self.thread = None
+        self.thread_stop = threading.Event()
+        self.buf = None
+        # notifications are parsed by the workers, so they are not measured
+        self.metrics = None
+        self.workers = workers
+        self.processes = []
+        self.ctx = multiprocessing.get_context("fork")
+        self.workers_stop = self.ctx.Event()
+        if expire is not None:
+            self.expire = expire
+            self.reregister = False
+        else:
+            self.expire = 3600
+            self.reregister = True
+
+        try:
+            if workers < 1:
+                raise ValueError("workers must be positive")
+            self.socket = self._handler.__new_socket__()
+            if not isinstance(self.socket, Datagram):
+                raise OpenSIPSEventException(
+                        "Worker processes require a datagram socket")
+            self.socket.create()
+            self.start_workers()
+            self._handler.__mi_subscribe__(self.name,
+                                           self.socket.sock_name,
+                                           self.expire)
+            self.last_subscription = time.time()
+            self._handler.events[self.name] = self
+            self.thread = threading.Thread(target=self.handle,
+                                           args=(callback,))
+            self.thread.start()
+        except (OpenSIPSEventException, OpenSIPSMIException) as e:
+            self.stop()
+            raise e
+        except ValueError as e:
+            self.stop()
+            raise OpenSIPSEventException("Invalid arguments") from e
+
+    def start_workers(self):
+        """ Forks the worker processes """
+        ready = self.ctx.Semaphore(0)
+        for _ in range(self.workers):
+            proc = self.ctx.Process(target=self.work, args=(ready,),
+                                    daemon=True)
+            proc.start()
+            self.processes.append(proc)
+        for _ in range(self.workers):
+            if not ready.acquire(timeout=5):
+                raise OpenSIPSEventException("Failed to start workers")
+        if self.socket.reuse_port:
+            # the workers have their own sockets bound now, so the
+            # parent's socket must not get any of the notifications
+            self.socket.sock.close()
+
+    def work(self, ready):
+        """ Main loop of a worker process """
+        # the parent is in charge of stopping the workers
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        if self.socket.reuse_port:
+            address = self.socket.sock.getsockname()
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind(address)
+            sock.settimeout(0.1)
+            self.socket.sock.close()
+            self.socket.sock = sock
+        ready.release()
+
+        buf = JsonBuffer()
+        while not self.workers_stop.is_set():
+            data = self.socket.read()
+            if not data:
+                continue
+            try:
+                buf.push(data)
+                j = buf.pop()
+                while j:
+                    self.callback(j)
+                    j = buf.pop()
+            except JsonBufferMaxAttempts:
+                # drop the unparsable data, but keep on serving
+                buf = JsonBuffer()
+
+    def handle(self, callback):
+        """ Keeps the subscription alive while the workers run """
+        while not self.thread_stop.wait(1):
+            if not self.check_subscription():
+                callback(None)
+                break
+            if not any(proc.is_alive() for proc in self.processes):
+                callback(None)
+                break
+
+    def stop(self):
+        """ Stops the workers and closes the socket """
+        self.thread_stop.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.workers_stop.set()
+        for proc in self.processes:
+            proc.join(1)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+        self.processes = []
+        if getattr(self, "socket", None):
+            self.socket.destroy()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
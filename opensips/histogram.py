@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Latency histogram with a bounded relative error (HDR histogram style) """
+
+from array import array
+
+
+class Histogram():
+
+    """ Counts non-negative integer values (i.e. nanoseconds) in log-linear
+        buckets: values below 2^precision are counted exactly, larger ones
+        with a relative error below 2^(1 - precision); recording a value
+        is O(1) and the memory used only grows with the magnitude of the
+        largest value. Not thread-safe: use one histogram per thread and
+        merge them """
+
+    def __init__(self, precision: int = 8):
+        if precision < 2:
+            raise ValueError("Invalid precision")
+        self.precision = precision
+        self.sub_buckets = 1 << precision
+        self.half = self.sub_buckets >> 1
+        self.counts = array("q", [0]) * self.sub_buckets
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def index(self, value: int) -> int:
+        """ Returns the bucket of a value """
+        if value < self.sub_buckets:
+            return value
+        shift = value.bit_length() - self.precision
+        return self.sub_buckets + (shift - 1) * self.half + \
+            (value >> shift) - self.half
+
+    def value_at(self, index: int) -> int:
+        """ Returns the highest value counted in a bucket """
+        if index < self.sub_buckets:
+            return index
+        shift = (index - self.sub_buckets) // self.half + 1
+        mantissa = (index - self.sub_buckets) % self.half + self.half
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int, count: int = 1):
+        """ Records a value, count times """
+        value = int(value)
+        if value < self.sub_buckets:
+            if value < 0:
+                raise ValueError("Cannot record negative values")
+            index = value
+        else:
+            # same as self.index(), inlined as this is the hot path
+            shift = value.bit_length() - self.precision
+            index = self.sub_buckets + (shift - 1) * self.half + \
+                (value >> shift) - self.half
+            if index >= len(self.counts):
+                self.counts.extend(array("q", [0]) *
+                                   (index + self.half - len(self.counts)))
+        self.counts[index] += count
+        self.count += count
+        self.total += value * count
+        if self.max is None:
+            self.min = self.max = value
+        elif value > self.max:
+            self.max = value
+        elif value < self.min:
+            self.min = value
+
+    def merge(self, other):
+        """ Adds the values of another histogram, of the same precision """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge histograms of different precision")
+        if len(other.counts) > len(self.counts):
+            self.counts.extend(array("q", [0]) *
+                               (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def reset(self):
+        """ Drops all the recorded values """
+        self.counts = array("q", [0]) * self.sub_buckets
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def mean(self) -> float:
+        """ Returns the mean of the recorded values """
+        return self.total / self.count if self.count else float("nan")
+
+    def percentiles(self, pcts) -> list:
+        """ Returns the values at the given percentiles, in a single pass
+            over the buckets """
+        if not self.count:
+            return [float("nan")] * len(pcts)
+        order = sorted(range(len(pcts)), key=lambda i: pcts[i])
+        values = [None] * len(pcts)
+        seen = 0
+        pos = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while pos < len(order) and \
+                    seen >= pcts[order[pos]] * self.count / 100:
+                values[order[pos]] = min(max(self.value_at(index), self.min),
+                                         self.max)
+                pos += 1
+            if pos == len(order):
+                break
+        for i in order[pos:]:
+            values[i] = self.max
+        return values
+
+    def percentile(self, pct: float) -> int:
+        """ Returns the value at a percentile (0 to 100) """
+        return self.percentiles([pct])[0]
+
+    def summary(self, scale: float = 1.0) -> dict:
+        """ Returns the count, mean, p50, p90, p99 and max of the values,
+            divided by scale; empty if no values were recorded """
+        if not self.count:
+            return {}
+        p50, p90, p99 = self.percentiles((50, 90, 99))
+        return {
+            "count": self.count,
+            "mean": self.mean() / scale,
+            "p50": p50 / scale,
+            "p90": p90 / scale,
+            "p99": p99 / scale,
+            "max": self.max / scale,
+        }
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Lazy exports of the objects of a package """
+
+import sys
+import importlib
+
+
+def lazy_exports(package: str, exports: dict):
+    """ Returns the module __getattr__ and __dir__ functions (PEP 562) of
+        a package whose objects, listed in exports (name -> module), are
+        imported on first use, so that importing the package (i.e. for
+        bash completion) does not load all of its modules; static analysis
+        tools cannot follow them, so the package also imports the objects
+        under "if TYPE_CHECKING:", with a TYPE_CHECKING = False constant
+        of its own, as importing typing would slow completion down """
+
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(
+                    f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(exports[name], package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -20,11 +20,36 @@
 
 """ OpenSIPS MI package """
 
-from .connector import OpenSIPSMI, OpenSIPSMIException
+from ..lazy import lazy_exports
 
-__all__ = [
-    'OpenSIPSMI',
-    'OpenSIPSMIException',
-]
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .connector import OpenSIPSMI, OpenSIPSMIException
+    from .asyncconnector import AsyncOpenSIPSMI
+    from .pool import MIPool
+    from .cluster import OpenSIPSMICluster
+    from .iterators import iter_dialogs, iter_contacts
+    from .cache import MICache
+    from .stats import StatsPoller
+    from .bench import MIBench
+    from .metrics import MIMetrics
+
+_EXPORTS = {
+    'OpenSIPSMI': '.connector',
+    'OpenSIPSMIException': '.connector',
+    'AsyncOpenSIPSMI': '.asyncconnector',
+    'MIPool': '.pool',
+    'OpenSIPSMICluster': '.cluster',
+    'iter_dialogs': '.iterators',
+    'iter_contacts': '.iterators',
+    'MICache': '.cache',
+    'StatsPoller': '.stats',
+    'MIBench': '.bench',
+    'MIMetrics': '.metrics',
+}
+
+__all__ = list(_EXPORTS)
+
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
 
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
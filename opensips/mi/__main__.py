@@ -20,10 +20,16 @@
 """ Script to run OpenSIPS MI commands """
 
 import sys
-import json
 import os
-import argparse
-from opensips.mi import OpenSIPSMI, OpenSIPSMIException
+from opensips import catalog
+
+# the node used when no options are given; see main()
+NODE_DEFAULTS = {
+    'type': 'fifo',
+    'ip': '127.0.0.1',
+    'port': 8080,
+    'fifo_file': '/var/run/opensips/opensips_fifo',
+}
 
 
 def load_env_file(env_file_path):
@@ -36,81 +42,224 @@ def load_env_file(env_file_path):
             key, value = line.strip().split('=', 1)
             os.environ[key] = value
 
-parser = argparse.ArgumentParser()
+def create_parser():
+    """ Builds the parser of the command line """
+    # pylint: disable=import-outside-toplevel
+    import argparse
 
-parser.add_argument('--env-file',
-                    type=str,
-                    default='.env',
-                    help='Load environment variables from file')
+    parser = argparse.ArgumentParser()
 
-communication = parser.add_argument_group('communication')
+    parser.add_argument('--env-file',
+                        type=str,
+                        default='.env',
+                        help='Load environment variables from file')
 
-communication.add_argument('-t', '--type',
-                           type=str,
-                           choices=['fifo', 'http', 'datagram'],
-                           help='OpenSIPS MI Communication Type')
-communication.add_argument('-i', '--ip',
-                           type=str,
-                           help='OpenSIPS MI IP Address')
-communication.add_argument('-p', '--port',
-                           type=int,
-                           help='OpenSIPS MI Port')
-communication.add_argument('-f', '--fifo-file',
-                           metavar='FIFO_FILE',
-                           type=str,
-                           help='OpenSIPS MI FIFO File')
-communication.add_argument('-fb', '--fifo-fallback',
-                           metavar='FIFO_FALLBACK_FILE',
-                           type=str,
-                           help='OpenSIPS MI Fallback FIFO File')
-communication.add_argument('-fd', '--fifo-reply-dir',
-                           metavar='FIFO_DIR',
-                           type=str,
-                           help='OpenSIPS MI FIFO Reply Directory')
-communication.add_argument('-ds', '--datagram-socket',
-                           metavar='SOCK',
-                           type=str,
-                           help='OpenSIPS Unix Datagram Socket')
-communication.add_argument('-dt', '--datagram-timeout',
-                           type=int,
-                           help='OpenSIPS Datagram Socket Timeout')
-communication.add_argument('-db', '--datagram-buffer-size',
+    communication = parser.add_argument_group('communication')
+
+    communication.add_argument('-t', '--type',
+                               type=str,
+                               choices=['fifo', 'http', 'datagram'],
+                               help='OpenSIPS MI Communication Type')
+    communication.add_argument('-i', '--ip',
+                               type=str,
+                               help='OpenSIPS MI IP Address')
+    communication.add_argument('-p', '--port',
+                               type=int,
+                               help='OpenSIPS MI Port')
+    communication.add_argument('-f', '--fifo-file',
+                               metavar='FIFO_FILE',
+                               type=str,
+                               help='OpenSIPS MI FIFO File')
+    communication.add_argument('-fb', '--fifo-fallback',
+                               metavar='FIFO_FALLBACK_FILE',
+                               type=str,
+                               help='OpenSIPS MI Fallback FIFO File')
+    communication.add_argument('-fd', '--fifo-reply-dir',
+                               metavar='FIFO_DIR',
+                               type=str,
+                               help='OpenSIPS MI FIFO Reply Directory')
+    communication.add_argument('-ds', '--datagram-socket',
+                               metavar='SOCK',
+                               type=str,
+                               help='OpenSIPS Unix Datagram Socket')
+    communication.add_argument('-dt', '--datagram-timeout',
+                               type=int,
+                               help='OpenSIPS Datagram Socket Timeout')
+    communication.add_argument('-db', '--datagram-buffer-size',
+                               type=int,
+                               help='OpenSIPS Datagram Socket Buffer Size')
+
+    group = parser.add_mutually_exclusive_group(required=True)
+
+    group.add_argument('-s', '--stats',
+                       nargs='+',
+                       default=[],
+                       help='statistics')
+
+    group.add_argument('command',
+                       nargs='?',
+                       type=str,
+                       help='command')
+
+    group.add_argument('-bc', '--bash-complete',
+                        type=str,
+                        nargs='?',
+                        const='commands',
+                        help='Provide options for bash completion')
+
+    parser.add_argument('-w', '--watch',
+                        metavar='INTERVAL',
+                        type=float,
+                        nargs='?',
+                        const=1.0,
+                        help='poll the statistics every INTERVAL seconds')
+
+    benchmark = parser.add_argument_group(
+        'bench', 'options of the bench command, which fires the command '
+        'given as its first parameter')
+
+    benchmark.add_argument('--duration',
+                           type=float,
+                           default=10.0,
+                           help='duration of the benchmark, in seconds')
+    benchmark.add_argument('--concurrency',
                            type=int,
-                           help='OpenSIPS Datagram Socket Buffer Size')
+                           default=1,
+                           help='number of connections (and of commands '
+                           'in flight, unless --rate is used)')
+    benchmark.add_argument('--rate',
+                           type=float,
+                           help='send this many commands per second, '
+                           'whether the previous ones completed or not '
+                           '(open loop)')
+
+    group = parser.add_mutually_exclusive_group(required=False)
 
-group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('-j', '--json',
+                       type=str,
+                       help='json',
+                       required=False)
 
-group.add_argument('-s', '--stats',
-                   nargs='+',
-                   default=[],
-                   help='statistics')
+    group.add_argument('parameters',
+                       nargs='*',
+                       default=[],
+                       help='cmd args')
+    return parser
+
+
+def format_value(value):
+    """ Formats the value of a statistic """
+    if value != value:  # NaN
+        return '-'
+    if value.is_integer():
+        return str(int(value))
+    return f'{value:.2f}'
+
+
+def watch(mi, statistics, interval):
+    """ Prints the statistics and their rates every interval seconds """
+    # pylint: disable=import-outside-toplevel
+    import time
+    from opensips.mi.stats import StatsPoller
+
+    def show(poller):
+        values = poller.latest()
+        rates = poller.rates()
+        print(time.strftime('%Y-%m-%d %H:%M:%S'))
+        for name in sorted(values):
+            rate = rates.get(name)
+            if rate is None or rate != rate:
+                rate = ''
+            else:
+                rate = format_value(rate) + '/s'
+            print(f'{name:<40} {format_value(values[name]):>16} {rate:>14}')
+        print(flush=True)
+
+    poller = StatsPoller(mi, statistics, interval, on_sample=show)
+    poller.start()
+    try:
+        while True:
+            time.sleep(interval)
+            if poller.last_error:
+                print('ERROR: ', poller.last_error, flush=True)
+                poller.last_error = None
+    except KeyboardInterrupt:
+        poller.stop()
+
+
+def connector_args(args):
+    """ Returns the type and the arguments of the MI connector """
+    if args.type == 'fifo':
+        return 'fifo', {
+            'fifo_file': args.fifo_file,
+            'fifo_file_fallback': args.fifo_fallback,
+            'fifo_reply_dir': args.fifo_reply_dir,
+        }
+    if args.type == 'http':
+        return 'http', {'url': f'http://{args.ip}:{args.port}/mi'}
+    if args.type == 'datagram':
+        if args.datagram_socket:
+            address = {'datagram_unix_socket': args.datagram_socket}
+        else:
+            address = {'datagram_ip': args.ip, 'datagram_port': args.port}
+        return 'datagram', dict(address,
+                                datagram_timeout=args.datagram_timeout,
+                                datagram_buffer_size=args.datagram_buffer_size)
+    return None
 
-group.add_argument('command',
-                   nargs='?',
-                   type=str,
-                   help='command')
 
-group.add_argument('-bc', '--bash-complete',
-                    type=str,
-                    nargs='?',
-                    const='commands',
-                    help='Provide options for bash completion')
+def print_report(report):
+    """ Prints the report of a benchmark """
+    print(f"command:      {report['command']}")
+    print(f"duration:     {report['duration']:.2f}s")
+    if report['target_rate']:
+        print(f"target rate:  {report['target_rate']:g}/s")
+    print(f"sent:         {report['sent']}")
+    print(f"completed:    {report['completed']}")
+    print(f"throughput:   {report['throughput']:.1f}/s")
+    errors = report['errors']
+    print(f"errors:       {sum(errors.values())}")
+    for name, count in sorted(errors.items()):
+        print(f"  {name:<24}{count:>10}")
+    print('latency (ms):')
+    for name, value in report['latency_ms'].items():
+        print(f"  {name:<10}{value:>12.3f}")
 
-group = parser.add_mutually_exclusive_group(required=False)
 
-group.add_argument('-j', '--json',
-                   type=str,
-                   help='json',
-                   required=False)
+def bench(conn_args, args):
+    """ Fires a command at OpenSIPS and reports the latencies """
+    # pylint: disable=import-outside-toplevel
+    from opensips.mi import MIPool, MIBench
 
-group.add_argument('parameters',
-                   nargs='*',
-                   default=[],
-                   help='cmd args')
+    if not args.parameters:
+        print('ERROR: bench requires the command to run!')
+        sys.exit(1)
+    if args.rate is not None and args.rate <= 0 or args.concurrency < 1 \
+            or args.duration <= 0:
+        print('ERROR: invalid --rate, --concurrency or --duration!')
+        sys.exit(1)
+    cmd, params = args.parameters[0], args.parameters[1:]
+    with MIPool(conn_args[0], size=args.concurrency, **conn_args[1]) as pool:
+        runner = MIBench(pool, cmd, params)
+        try:
+            report = runner.run(args.duration, args.concurrency, args.rate)
+        except KeyboardInterrupt:
+            sys.exit(1)
+    print_report(report)
 
 
 def main():
     """ Main function of the opensips-mi script """
+    # completing commands is served from the catalog, without loading
+    # the heavier modules or waiting for OpenSIPS
+    if catalog.complete('opensips.mi', 'commands', NODE_DEFAULTS):
+        sys.exit(0)
+
+    # pylint: disable=import-outside-toplevel
+    import json
+    from opensips.mi import OpenSIPSMI, OpenSIPSMIException
+
+    parser = create_parser()
     args = parser.parse_args()
 
     load_env_file(args.env_file)
@@ -128,32 +277,12 @@ def main():
     if not args.fifo_reply_dir:
         args.fifo_reply_dir = os.getenv('OPENSIPS_MI_FIFO_REPLY_DIR', '/tmp/')
 
-    if args.type == 'fifo':
-        fifo_args = {
-            'fifo_file': args.fifo_file,
-            'fifo_file_fallback': args.fifo_fallback,
-            'fifo_reply_dir': args.fifo_reply_dir,
-        }
-        mi = OpenSIPSMI('fifo', **fifo_args)
-    elif args.type == 'http':
-        mi = OpenSIPSMI('http', url=f'http://{args.ip}:{args.port}/mi')
-    elif args.type == 'datagram':
-        if args.datagram_socket:
-            mi = OpenSIPSMI('datagram',
-                            datagram_unix_socket=args.datagram_socket,
-                            datagram_timeout=args.datagram_timeout,
-                            datagram_buffer_size=args.datagram_buffer_size)
-        else:
-            mi = OpenSIPSMI('datagram',
-                            datagram_ip=args.ip,
-                            datagram_port=args.port,
-                            datagram_timeout=args.datagram_timeout,
-                            datagram_buffer_size=args.datagram_buffer_size)
-    else:
+    conn_args = connector_args(args)
+    if conn_args is None:
         if not args.bash_complete:
             print(f'Unknown type: {args.type}')
         sys.exit(1)
-
+    mi = OpenSIPSMI(conn_args[0], **conn_args[1])
 
     if args.bash_complete is not None:
         if args.bash_complete not in ['params', 'commands']:
@@ -178,6 +307,12 @@ def main():
         try:
             response = mi.execute('which', [])
             print(" ".join(response))
+            try:
+                version = mi.execute('version', []).get('Server', '')
+            except OpenSIPSMIException:
+                version = ''
+            catalog.write(catalog.node_key(sys.argv[1:], NODE_DEFAULTS),
+                          'commands', response, version)
             sys.exit(0)
         except Exception as e:
             options = []
@@ -187,6 +322,10 @@ def main():
             print(' '.join(options))
             sys.exit(0)
 
+    if args.command == 'bench':
+        bench(conn_args, args)
+        sys.exit(0)
+
     if args.stats:
         args.command = 'get_statistics'
 
@@ -195,7 +334,14 @@ def main():
             sys.exit(1)
 
         args.parameters = {'statistics': args.stats}
+
+        if args.watch:
+            watch(mi, args.stats, args.watch)
+            sys.exit(0)
     else:
+        if args.watch:
+            print('ERROR: -w/--watch can only be used with -s/--stats!')
+            sys.exit(1)
         if args.json:
             try:
                 args.parameters = json.loads(args.json)
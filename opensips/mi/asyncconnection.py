@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+""" Abstract implementation of an asyncio MI connection """
+
+from abc import ABC, abstractmethod
+from . import jsonrpc_helper
+
+
+class AsyncConnection(ABC):
+
+    """ Abstract asyncio MI Connection """
+
+    @abstractmethod
+    def __init__(self, **kwargs):
+        pass
+
+    # maximum size of a batch payload; None if the transport has no limit
+    max_batch_size = None
+
+    @abstractmethod
+    async def execute_raw(self, jsoncmd: str, cmd_id: str):
+        """ Sends a serialized command (or batch) and returns
+            the decoded reply """
+
+    async def execute(self, method: str, params: dict):
+        """ Executes an MI Command """
+        cmd_id = jsonrpc_helper.next_id()
+        jsoncmd = jsonrpc_helper.get_command(method, params, cmd_id)
+        reply = await self.execute_raw(jsoncmd, cmd_id)
+        return jsonrpc_helper.get_result(reply)
+
+    async def execute_batch(self, commands: list):
+        """ Executes a list of (method, params) MI Commands in batches """
+        results = []
+        for ids, jsoncmd in jsonrpc_helper.get_batch_commands(
+                commands, self.max_batch_size):
+            reply = await self.execute_raw(jsoncmd, ids[0])
+            results.extend(jsonrpc_helper.get_batch_results(ids, reply))
+        return results
+
+    @abstractmethod
+    async def valid(self):
+        """ Checks if an MI connection is valid """
+
+    async def close(self):
+        """ Releases the resources held by the connection """
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Connector implementation for OpenSIPS MI with asyncio """
+
+from .asyncfifo import AsyncFIFO
+from .asyncdatagram import AsyncDatagram
+from .asynchttp import AsyncHTTP
+from .connector import OpenSIPSMIException
+from .jsonrpc_helper import JSONRPCError, JSONRPCException
+
+
+class AsyncOpenSIPSMI():
+    """ OpenSIPS MI Implementation with asyncio """
+    def __init__(self, conn="fifo", **kwargs):
+        if conn == "fifo":
+            if "fifo_file" not in kwargs:
+                kwargs["fifo_file"] = "/var/run/opensips/opensips_fifo"
+            if "fifo_file_fallback" not in kwargs:
+                kwargs["fifo_file_fallback"] = "/tmp/opensips_fifo"
+            if "fifo_reply_dir" not in kwargs:
+                kwargs["fifo_reply_dir"] = "/tmp"
+            self.conn = AsyncFIFO(**kwargs)
+        elif conn == "datagram":
+            self.conn = AsyncDatagram(**kwargs)
+        elif conn == "http":
+            self.conn = AsyncHTTP(**kwargs)
+        else:
+            raise ValueError("Invalid connector type")
+
+        self.validated = None
+
+    async def execute(self, cmd, params=None):
+        """ Executes a command with the requested parameters """
+        try:
+            ret_val = await self.conn.execute(cmd, params if params else [])
+        except JSONRPCError as e:
+            raise OpenSIPSMIException(f"Error executing command: {e}") from e
+        except JSONRPCException as e:
+            raise OpenSIPSMIException(f"Error with connection: {e}. "
+                                      "Is OpenSIPS running?") from e
+        return ret_val
+
+    async def execute_batch(self, commands):
+        """ Executes a list of (cmd, params) commands using JSON-RPC batches;
+            returns the result of each command, in order - the failed
+            commands are returned as OpenSIPSMIException objects """
+        commands = [(cmd[0], cmd[1] if len(cmd) > 1 and cmd[1] else [])
+                    for cmd in commands]
+        try:
+            ret_val = await self.conn.execute_batch(commands)
+        except JSONRPCError as e:
+            raise OpenSIPSMIException(f"Error executing batch: {e}") from e
+        except JSONRPCException as e:
+            raise OpenSIPSMIException(f"Error with connection: {e}. "
+                                      "Is OpenSIPS running?") from e
+        return [OpenSIPSMIException(f"Error executing command: {r}")
+                if isinstance(r, JSONRPCError) else r for r in ret_val]
+
+    async def valid(self):
+        """ Checks if the connector is valid """
+        if self.validated is not None:
+            return self.validated
+        self.validated = await self.conn.valid()
+        return self.validated
+
+    async def close(self):
+        """ Closes the connector and releases its resources """
+        await self.conn.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" MI Datagram implementation with asyncio """
+
+import os
+import socket
+import asyncio
+from tempfile import NamedTemporaryFile
+from .asyncconnection import AsyncConnection
+from . import jsonrpc_helper
+
+
+class DatagramProtocol(asyncio.DatagramProtocol):
+
+    """ Forwards the received replies to the owning connection """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def datagram_received(self, data, addr):
+        self.conn.reply_received(data)
+
+    def error_received(self, exc):
+        self.conn.fail(exc)
+
+    def connection_lost(self, exc):
+        self.conn.fail(exc or ConnectionError("socket closed"))
+        self.conn.transport = None
+
+
+class AsyncDatagram(AsyncConnection):
+
+    """ MI Datagram connection multiplexed over a single socket """
+
+    def __init__(self, **kwargs):
+        if "datagram_unix_socket" in kwargs:
+            self.address = kwargs["datagram_unix_socket"]
+            self.family = socket.AF_UNIX
+            with NamedTemporaryFile(prefix="opensips_mi_reply_", dir="/tmp") as nt:
+                self.recv_sock = nt.name
+        elif "datagram_ip" in kwargs and "datagram_port" in kwargs:
+            self.address = (kwargs["datagram_ip"], int(kwargs["datagram_port"]))
+            self.family = socket.AF_INET
+            self.recv_sock = None
+        else:
+            raise ValueError("Either datagram_unix_socket or both datagram_ip and datagram_port are required for Datagram")
+
+        self.timeout = float(kwargs.get("datagram_timeout") or 0.1)
+        # batches, as well as their replies, must fit in a single datagram
+        self.max_batch_size = int(kwargs.get("datagram_batch_size") or
+                                  int(kwargs.get("datagram_buffer_size") or
+                                      32768) // 2)
+        self.transport = None
+        self.lock = None
+        self.pending = {}
+
+    async def connect(self):
+        """ Creates the socket shared by all the commands """
+        loop = asyncio.get_running_loop()
+        local_addr = None
+        if self.recv_sock:
+            if os.path.exists(self.recv_sock):
+                os.unlink(self.recv_sock)
+            local_addr = self.recv_sock
+        self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: DatagramProtocol(self),
+                local_addr=local_addr,
+                remote_addr=self.address,
+                family=self.family)
+
+    def reply_received(self, data):
+        """ Wakes up the command waiting for the received reply """
+        try:
+            reply = jsonrpc_helper.decode_reply(data)
+        except jsonrpc_helper.JSONRPCException:
+            return
+        # batches are registered by one of their ids
+        for cmd_id in jsonrpc_helper.get_reply_ids(reply):
+            future = self.pending.get(cmd_id)
+            if future:
+                if not future.done():
+                    future.set_result(reply)
+                break
+
+    def fail(self, exc):
+        """ Fails all the commands waiting for a reply """
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def execute_raw(self, jsoncmd: str, cmd_id: str):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending[cmd_id] = future
+        try:
+            if not self.transport:
+                if not self.lock:
+                    self.lock = asyncio.Lock()
+                async with self.lock:
+                    if not self.transport:
+                        await self.connect()
+            self.transport.sendto(jsoncmd.encode())
+            reply = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as e:
+            raise jsonrpc_helper.JSONRPCException("timed out") from e
+        except Exception as e:
+            raise jsonrpc_helper.JSONRPCException(e)
+        finally:
+            del self.pending[cmd_id]
+
+        return reply
+
+    async def valid(self):
+        return (True, None)
+
+    async def close(self):
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+        if self.recv_sock and os.path.exists(self.recv_sock):
+            os.unlink(self.recv_sock)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" MI FIFO implementation with asyncio """
+
+import os
+import asyncio
+
+from .asyncconnection import AsyncConnection
+from .fifo import FIFO
+from . import jsonrpc_helper
+
+
+class AsyncFIFO(AsyncConnection):
+
+    """ MI FIFO Connection driven by the asyncio loop """
+
+    REPLY_FIFO_FILE_TEMPLATE = "opensips_fifo_reply_{}_a{}"
+
+    def __init__(self, **kwargs):
+        # reuse the synchronous implementation for the file checks
+        self.fifo = FIFO(**kwargs)
+        self.fifo_reply_dir = self.fifo.fifo_reply_dir
+        timeout = kwargs.get("fifo_timeout")
+        self.timeout = float(timeout) if timeout else None
+
+    async def write(self, data):
+        """ Writes the command in the OpenSIPS FIFO without blocking """
+        loop = asyncio.get_running_loop()
+        fd = os.open(self.fifo.fifo_file, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            while data:
+                try:
+                    written = os.write(fd, data)
+                    data = data[written:]
+                except BlockingIOError:
+                    writable = loop.create_future()
+                    loop.add_writer(fd, writable.set_result, None)
+                    try:
+                        await writable
+                    finally:
+                        loop.remove_writer(fd)
+        finally:
+            os.close(fd)
+
+    async def execute_raw(self, jsoncmd: str, cmd_id: str):
+        valid, msg = self.fifo.valid(blocking=False)
+        if not valid:
+            raise jsonrpc_helper.JSONRPCException(msg)
+
+        reply_format = self.REPLY_FIFO_FILE_TEMPLATE
+        reply_fifo_file_name = reply_format.format(os.getpid(),
+                                                   jsonrpc_helper.next_id())
+        reply_fifo_file_path = os.path.join(self.fifo_reply_dir,
+                                            reply_fifo_file_name)
+        try:
+            if os.path.exists(reply_fifo_file_path):
+                os.unlink(reply_fifo_file_path)
+            os.mkfifo(reply_fifo_file_path)
+            os.chmod(reply_fifo_file_path, 0o666)
+        except OSError as e:
+            msg = "Could not create reply FIFO file " + \
+                    f"{reply_fifo_file_path}: {e}"
+            raise jsonrpc_helper.JSONRPCException(msg)
+
+        loop = asyncio.get_running_loop()
+        transport = None
+        try:
+            # open the reply FIFO before sending the command, so that
+            # OpenSIPS finds a reader when it writes the reply
+            fd = os.open(reply_fifo_file_path, os.O_RDONLY | os.O_NONBLOCK)
+            reader = asyncio.StreamReader(limit=2 ** 30)
+            transport, _ = await loop.connect_read_pipe(
+                    lambda: asyncio.StreamReaderProtocol(reader),
+                    os.fdopen(fd, "rb", buffering=0))
+
+            fifocmd = f":{reply_fifo_file_name}:{jsoncmd}"
+            try:
+                await self.write(fifocmd.encode())
+            except OSError as e:
+                msg = f"Could not access FIFO file {self.fifo.fifo_file}: {e}"
+                raise jsonrpc_helper.JSONRPCException(msg)
+
+            reply = await asyncio.wait_for(reader.readline(), self.timeout)
+        except asyncio.TimeoutError as e:
+            raise jsonrpc_helper.JSONRPCException("timed out") from e
+        finally:
+            if transport:
+                transport.close()
+            os.unlink(reply_fifo_file_path)
+
+        return jsonrpc_helper.decode_reply(reply.decode())
+
+    async def valid(self):
+        return self.fifo.valid(blocking=False)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" HTTP implementation of MI with asyncio """
+
+import ssl
+import time
+import asyncio
+import urllib.parse
+from .asyncconnection import AsyncConnection
+from . import jsonrpc_helper
+
+
+class AsyncHTTP(AsyncConnection):
+
+    """ HTTP/1.1 keep-alive communication over asyncio streams """
+
+    # errors that a reused keep-alive connection raises when the server
+    # closed it meanwhile; the request is retried on a fresh connection
+    STALE_ERRORS = (ConnectionResetError,
+                    BrokenPipeError,
+                    asyncio.IncompleteReadError)
+
+    def __init__(self, **kwargs):
+        if "url" not in kwargs:
+            raise ValueError("url is required for HTTP connector")
+
+        self.url = kwargs["url"]
+        url_parsed = urllib.parse.urlparse(self.url)
+        self.host = url_parsed.hostname
+        if url_parsed.port:
+            self.port = url_parsed.port
+        elif url_parsed.scheme == "https":
+            self.port = 443
+        else:
+            self.port = 80
+        self.path = url_parsed.path or "/"
+        if url_parsed.query:
+            self.path += "?" + url_parsed.query
+
+        if url_parsed.scheme == "https":
+            # pylint: disable=protected-access
+            self.ssl_ctx = ssl._create_unverified_context()
+        else:
+            self.ssl_ctx = None
+
+        timeout = kwargs.get("http_timeout")
+        self.timeout = float(timeout) if timeout else None
+        self.size = int(kwargs.get("http_pool_size") or 4)
+        self.idle_timeout = float(kwargs.get("http_idle_timeout") or 30)
+        self.slots = None
+        self.idle = []
+
+    async def checkout(self):
+        """ Returns an idle connection, or a new one if none is usable """
+        now = time.monotonic()
+        while self.idle:
+            reader, writer, last_used = self.idle.pop()
+            if now - last_used < self.idle_timeout and \
+                    not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.open_connection(self.host, self.port,
+                                                       ssl=self.ssl_ctx)
+        return reader, writer, False
+
+    async def request(self, body):
+        """ Runs a POST request and returns the status, reason and body """
+        reader, writer, reused = await self.checkout()
+        try:
+            try:
+                status, reason, data, keep = \
+                        await self.roundtrip(reader, writer, body)
+            except self.STALE_ERRORS:
+                if not reused:
+                    raise
+                writer.close()
+                reader, writer = await asyncio.open_connection(
+                        self.host, self.port, ssl=self.ssl_ctx)
+                status, reason, data, keep = \
+                        await self.roundtrip(reader, writer, body)
+        except BaseException:
+            writer.close()
+            raise
+        if keep:
+            self.idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+        return status, reason, data
+
+    async def roundtrip(self, reader, writer, body):
+        """ Sends a request on a connection and reads its response """
+        head = (f"POST {self.path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+        line = await reader.readline()
+        if not line:
+            raise ConnectionResetError("connection closed by server")
+        version, status, reason = (line.decode("latin-1").rstrip("\r\n")
+                                   .split(" ", 2) + [""])[:3]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n"):
+                break
+            if not line:
+                raise asyncio.IncompleteReadError(b"", None)
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep = version != "HTTP/1.0" and \
+            headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await reader.read()
+            keep = False
+        return int(status), reason, data, keep
+
+    async def execute_raw(self, jsoncmd: str, cmd_id: str):
+        if not self.slots:
+            self.slots = asyncio.Semaphore(self.size)
+        try:
+            async with self.slots:
+                status, reason, reply = await asyncio.wait_for(
+                        self.request(jsoncmd.encode()), self.timeout)
+        except asyncio.TimeoutError as e:
+            raise jsonrpc_helper.JSONRPCException("timed out") from e
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            raise jsonrpc_helper.JSONRPCException(str(e))
+        if status >= 400:
+            raise jsonrpc_helper.JSONRPCException(
+                f"HTTP Error {status}: {reason}")
+        return jsonrpc_helper.decode_reply(reply.decode())
+
+    async def valid(self):
+        try:
+            _, writer = await asyncio.open_connection(self.host, self.port)
+            writer.close()
+            return (True, None)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            msg = f"Could not connect to {self.url} ({e})"
+            return (False, [msg, "Is OpenSIPS running?"])
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for _, writer, _ in idle:
+            writer.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Load generator for OpenSIPS MI commands """
+
+import time
+import threading
+from functools import partial
+from collections import Counter
+from concurrent.futures import wait
+from ..histogram import Histogram
+
+
+def error_type(exc) -> str:
+    """ Returns the name of the error that caused an exception """
+    return type(exc.__cause__ or exc).__name__
+
+
+class MIBench():
+
+    """ Executes a command over an MIPool for a given duration, either
+        as fast as possible by a number of workers (closed loop) or at a
+        fixed rate (open loop); in open loop mode latencies are measured
+        from the time each command was due, so a slow server is not hidden
+        by the commands that could not be sent (coordinated omission) """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, pool, cmd, params=None):
+        self.pool = pool
+        self.cmd = cmd
+        self.params = params
+        self.histogram = Histogram()
+        self.errors = Counter()
+        self.completed = 0
+        self.sent = 0
+        self.elapsed = 0.0
+        self.rate = None
+        self.lock = threading.Lock()
+        self.accounted = threading.Condition(self.lock)
+
+    def run(self, duration: float, concurrency: int = None,
+            rate: float = None) -> dict:
+        """ Runs the benchmark and returns its report """
+        if rate:
+            self.run_open(duration, rate)
+        else:
+            self.run_closed(duration, concurrency or self.pool.size)
+        return self.report()
+
+    def worker(self, end: int):
+        """ Executes the command back to back, until end """
+        histogram = Histogram()
+        errors = Counter()
+        clock = time.perf_counter_ns
+        with self.pool.connector() as mi:
+            start = clock()
+            while start < end:
+                try:
+                    mi.execute(self.cmd, self.params)
+                    now = clock()
+                    histogram.record(now - start)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    now = clock()
+                    errors[error_type(e)] += 1
+                start = now
+        with self.lock:
+            self.histogram.merge(histogram)
+            self.errors.update(errors)
+            self.completed += histogram.count
+            self.sent += histogram.count + sum(errors.values())
+
+    def run_closed(self, duration: float, concurrency: int):
+        """ Runs concurrency workers for duration seconds """
+        start = time.perf_counter_ns()
+        end = start + int(duration * 1e9)
+        threads = [threading.Thread(target=self.worker, args=(end,))
+                   for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = (time.perf_counter_ns() - start) / 1e9
+
+    def done(self, due: int, future):
+        """ Accounts a command sent in open loop mode """
+        latency = time.perf_counter_ns() - due
+        exc = future.exception()
+        with self.lock:
+            if exc:
+                self.errors[error_type(exc)] += 1
+            else:
+                self.histogram.record(latency)
+                self.completed += 1
+            self.accounted.notify_all()
+
+    def run_open(self, duration: float, rate: float):
+        """ Sends rate commands per second for duration seconds, whether
+            the previous ones completed or not """
+        self.rate = rate
+        interval = 1e9 / rate
+        futures = []
+        start = time.perf_counter_ns()
+        for i in range(int(duration * rate)):
+            due = start + int(i * interval)
+            delay = due - time.perf_counter_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            future = self.pool.submit(self.cmd, self.params)
+            future.add_done_callback(partial(self.done, due))
+            futures.append(future)
+        wait(futures)
+        self.elapsed = (time.perf_counter_ns() - start) / 1e9
+        # done callbacks run after the waiters of a future are woken up
+        with self.lock:
+            self.sent = len(futures)
+            while self.completed + sum(self.errors.values()) < self.sent:
+                self.accounted.wait()
+
+    def report(self) -> dict:
+        """ Returns the throughput, the errors and the latency percentiles
+            (in milliseconds) of the last run """
+        pcts = (50, 90, 99, 99.9)
+        values = self.histogram.percentiles(pcts)
+        latency = {f"p{pct:g}": value / 1e6 for pct, value in zip(pcts, values)}
+        latency["mean"] = self.histogram.mean() / 1e6
+        if self.histogram.count:
+            latency["min"] = self.histogram.min / 1e6
+            latency["max"] = self.histogram.max / 1e6
+        return {
+            "command": self.cmd,
+            "duration": self.elapsed,
+            "target_rate": self.rate,
+            "sent": self.sent,
+            "completed": self.completed,
+            "errors": dict(self.errors),
+            "throughput": self.completed / self.elapsed
+                          if self.elapsed else 0.0,
+            "latency_ms": latency,
+        }
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+""" Result cache for read-only MI commands """
+
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class MICache():
+
+    """ Caches the results of read-only MI commands for a per-command TTL,
+        keeping at most max_size results; concurrent identical calls share
+        a single request, and executing any other command of a module
+        drops the cached results of that module """
+
+    # commands whose result does not depend on the state they change
+    DEFAULT_TTLS = {
+        "which": 300,
+        "events_list": 300,
+        "version": 300,
+        "uptime": 1,
+        "list_tcp_conns": 2,
+        "ds_list": 5,
+        "dr_gw_status": 5,
+        "dr_carrier_status": 5,
+    }
+
+    # commands that set the status of an entity when given one besides its
+    # id; the positional form of a read with a partition ([partition, id])
+    # cannot be told apart from a write ([id, status]), so it is not cached
+    STATUS_COMMANDS = ("dr_gw_status", "dr_carrier_status")
+
+    def __init__(self, ttls=None, max_size=1024, default_ttl=None):
+        if max_size < 1:
+            raise ValueError("Invalid cache size")
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def module(cmd: str) -> str:
+        """ Returns the module prefix of a command (i.e. "ds_") """
+        idx = cmd.find("_")
+        return cmd[:idx + 1] if idx > 0 else cmd
+
+    @staticmethod
+    def key(cmd: str, params) -> tuple:
+        """ Returns the cache key of a command """
+        return cmd, json.dumps(params, sort_keys=True)
+
+    def ttl(self, cmd: str, params):
+        """ Returns the TTL of a command, or None if it is not cached """
+        ttl = self.ttls.get(cmd, self.default_ttl)
+        if not ttl:
+            return None
+        # setting a status is not a read-only call
+        if isinstance(params, dict) and "status" in params:
+            return None
+        if cmd in self.STATUS_COMMANDS and \
+                isinstance(params, (list, tuple)) and len(params) > 1:
+            return None
+        return ttl
+
+    def execute(self, cmd: str, params, fetch):
+        """ Returns the cached result of a command, or runs fetch(cmd,
+            params) to get it """
+        ttl = self.ttl(cmd, params)
+        if ttl is None:
+            try:
+                return fetch(cmd, params)
+            finally:
+                self.invalidate(self.module(cmd))
+        key = self.key(cmd, params)
+        owner = False
+        generation = None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            future = self.inflight.get(key)
+            if future:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                future = Future()
+                self.inflight[key] = future
+                generation = self.generation
+                owner = True
+        if not owner:
+            return copy.deepcopy(future.result())
+        try:
+            result = fetch(cmd, params)
+        except BaseException as e:
+            with self.lock:
+                del self.inflight[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self.inflight[key]
+            # results fetched while something was invalidated might be
+            # stale, so they are only returned, not cached
+            if generation == self.generation:
+                self.entries[key] = (time.monotonic() + ttl, result)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        future.set_result(result)
+        return copy.deepcopy(result)
+
+    def executed(self, cmd: str, params):
+        """ Notifies the cache that a command was executed bypassing it;
+            drops the results of its module if it is not read-only """
+        if self.ttl(cmd, params) is None:
+            self.invalidate(self.module(cmd))
+
+    def invalidate(self, prefix: str = None):
+        """ Drops the cached results of the commands starting with prefix,
+            or all of them """
+        with self.lock:
+            self.generation += 1
+            if prefix is None:
+                self.entries.clear()
+                return
+            for key in [k for k in self.entries if k[0].startswith(prefix)]:
+                del self.entries[key]
+
+    def stats(self) -> dict:
+        """ Returns the cache statistics """
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Runs MI commands on multiple OpenSIPS nodes in parallel """
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from .connector import OpenSIPSMI, OpenSIPSMIException
+
+
+def merge_sum(results: dict):
+    """ Merges the dict results of all nodes (e.g. statistics) by summing
+        the numeric values; the nodes that failed are skipped """
+    merged = {}
+    for result in results.values():
+        if not isinstance(result, dict):
+            continue
+        for key, value in result.items():
+            if key not in merged:
+                merged[key] = value
+            elif isinstance(value, (int, float)) and \
+                    isinstance(merged[key], (int, float)):
+                merged[key] += value
+    return merged
+
+
+class OpenSIPSMICluster():
+
+    """ MI client for a set of OpenSIPS nodes """
+
+    MERGERS = {
+        "sum": merge_sum,
+    }
+
+    def __init__(self, nodes, timeout=None, max_workers=None):
+        """ nodes is either a dict of name: spec, or a list of specs; a
+            spec is an OpenSIPSMI object or a dict with the "conn" type
+            (and an optional "name") and the connector parameters """
+        if isinstance(nodes, dict):
+            nodes = list(nodes.items())
+        else:
+            nodes = [(None, spec) for spec in nodes]
+
+        self.nodes = {}
+        for idx, (name, spec) in enumerate(nodes):
+            if not isinstance(spec, OpenSIPSMI):
+                spec = dict(spec)
+                if name is None:
+                    name = spec.pop("name", None)
+                else:
+                    spec.pop("name", None)
+                spec = OpenSIPSMI(spec.pop("conn", "fifo"), **spec)
+            if name is None:
+                name = f"node{idx}"
+            if name in self.nodes:
+                raise ValueError(f"Duplicate node name {name}")
+            self.nodes[name] = spec
+        if not self.nodes:
+            raise ValueError("No nodes specified")
+
+        self.timeout = timeout
+        # connectors are not thread safe, a slow command must finish
+        # before the next one runs on the same node
+        self.locks = {name: threading.Lock() for name in self.nodes}
+        self.lock = threading.Lock()
+        # nodes still running a command that timed out
+        self.busy = set()
+        self.executor = ThreadPoolExecutor(
+                max_workers=max_workers or len(self.nodes),
+                thread_name_prefix="opensips-mi-cluster")
+
+    def execute_node(self, name, cmd, params=None, deadline=None):
+        """ Executes a command on a single node; waits for the node to
+            finish its previous command at most until deadline """
+        timeout = -1
+        if deadline is not None:
+            timeout = max(deadline - time.monotonic(), 0)
+        if not self.locks[name].acquire(timeout=timeout):
+            raise OpenSIPSMIException(f"Timeout waiting for {name}")
+        try:
+            return self.nodes[name].execute(cmd, params)
+        finally:
+            self.locks[name].release()
+
+    def mark_busy(self, name, future):
+        """ Marks a node as busy until its timed out command completes """
+        with self.lock:
+            self.busy.add(name)
+
+        def done(_):
+            with self.lock:
+                self.busy.discard(name)
+        future.add_done_callback(done)
+
+    def execute(self, cmd, params=None, timeout=None, merge=None):
+        """ Executes a command on all the nodes in parallel; returns a dict
+            with the result of each node, or the OpenSIPSMIException
+            explaining why it failed; if merge (a callable or "sum") is
+            specified, the merged results are returned instead """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = None
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+
+        results = {}
+        futures = {}
+        with self.lock:
+            busy = set(self.busy)
+        for name in self.nodes:
+            if name in busy:
+                # do not tie up a worker behind a hung node
+                results[name] = OpenSIPSMIException(
+                    f"{name} is still running a previous command")
+                continue
+            futures[name] = self.executor.submit(self.execute_node, name,
+                                                 cmd, params, deadline)
+        wait(futures.values(), timeout)
+
+        for name, future in futures.items():
+            if not future.done():
+                if not future.cancel():
+                    self.mark_busy(name, future)
+                results[name] = OpenSIPSMIException(
+                    f"Timeout executing command on {name}")
+            elif future.exception():
+                exc = future.exception()
+                if not isinstance(exc, OpenSIPSMIException):
+                    exc = OpenSIPSMIException(str(exc))
+                results[name] = exc
+            else:
+                results[name] = future.result()
+
+        results = {name: results[name] for name in self.nodes}
+        if merge is None:
+            return results
+        if not callable(merge):
+            merge = self.MERGERS[merge]
+        return merge(results)
+
+    def close(self):
+        """ Closes the connectors of all the nodes """
+        self.executor.shutdown(wait=True)
+        for mi in self.nodes.values():
+            mi.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
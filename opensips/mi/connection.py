@@ -20,7 +20,36 @@
 
 """ Abstract implementation of an MI connection """
 
+import time
 from abc import ABC, abstractmethod
+from .. import codec
+from . import jsonrpc_helper
+from .json_stream import JsonPathParser
+
+
+class ReplyStats():
+
+    """ Size and decoding time (in nanoseconds) of the reply of a recorded
+        command, filled in by the transport that decodes it """
+
+    __slots__ = ("size", "decoding")
+
+    def __init__(self):
+        self.size = None
+        self.decoding = 0
+
+    def set(self, size: int, decoding: int):
+        """ Stores the stats of the reply """
+        self.size = size
+        self.decoding = decoding
+
+
+def decode_measured(reply):
+    """ Decodes a reply; returns it along with its size and the time
+        spent decoding it """
+    start = time.perf_counter_ns()
+    decoded = jsonrpc_helper.decode_reply(reply)
+    return decoded, len(reply), time.perf_counter_ns() - start
 
 
 class Connection(ABC):
@@ -31,12 +60,99 @@ class Connection(ABC):
     def __init__(self, **kwargs):
         pass
 
+    # maximum size of a batch payload; None if the transport has no limit
+    max_batch_size = None
+
+    # metrics recorder of the commands executed; None when disabled
+    recorder = None
+
     @abstractmethod
+    def execute_raw(self, jsoncmd: str, cmd_id: str, stats=None):
+        """ Sends a serialized command (or batch) and returns the decoded
+            reply; the size and the decoding time of the reply are stored
+            in stats (a ReplyStats object), if given """
+
+    @staticmethod
+    def decode_reply(reply, stats=None):
+        """ Decodes a reply received by the transport """
+        if stats is None:
+            return jsonrpc_helper.decode_reply(reply)
+        decoded, size, decoding = decode_measured(reply)
+        stats.set(size, decoding)
+        return decoded
+
     def execute(self, method: str, params: dict):
         """ Executes an MI Command """
+        if self.recorder is not None:
+            return self.execute_recorded(method, params)
+        cmd_id = jsonrpc_helper.next_id()
+        jsoncmd = jsonrpc_helper.get_command(method, params, cmd_id)
+        return jsonrpc_helper.get_result(self.execute_raw(jsoncmd, cmd_id))
+
+    def execute_recorded(self, method: str, params: dict):
+        """ Executes an MI Command and passes the time spent in each phase
+            (in nanoseconds), the size of the reply and the error raised,
+            if any, to the recorder """
+        clock = time.perf_counter_ns
+        phases = {}
+        stats = ReplyStats()
+        error = None
+        start = clock()
+        try:
+            cmd_id = jsonrpc_helper.next_id()
+            jsoncmd = jsonrpc_helper.get_command(method, params, cmd_id)
+            sent = clock()
+            phases["get_command"] = sent - start
+            reply = self.execute_raw(jsoncmd, cmd_id, stats)
+            received = clock()
+            # decoding is part of get_reply, even if done by the transport
+            phases["transport"] = received - sent - stats.decoding
+            try:
+                return jsonrpc_helper.get_result(reply)
+            finally:
+                phases["get_reply"] = clock() - received + stats.decoding
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.recorder.record(method, phases, clock() - start,
+                                 stats.size, error)
+
+    def execute_batch(self, commands: list):
+        """ Executes a list of (method, params) MI Commands in batches """
+        results = []
+        for ids, jsoncmd in jsonrpc_helper.get_batch_commands(
+                commands, self.max_batch_size):
+            reply = self.execute_raw(jsoncmd, ids[0])
+            results.extend(jsonrpc_helper.get_batch_results(ids, reply))
+        return results
+
+    def execute_chunks(self, jsoncmd: str, cmd_id: str):
+        """ Sends a serialized command and yields its raw reply in chunks,
+            as they are received; by default, the reply is received
+            whole, by execute_raw """
+        yield codec.dumps(self.execute_raw(jsoncmd, cmd_id))
+
+    def execute_stream(self, method: str, params: dict, path: str = None):
+        """ Executes an MI Command and yields the values found at path
+            in its result, while the reply is being received """
+        cmd_id = jsonrpc_helper.next_id()
+        jsoncmd = jsonrpc_helper.get_command(method, params, cmd_id)
+        parser = JsonPathParser(path)
+        chunks = self.execute_chunks(jsoncmd, cmd_id)
+        try:
+            for chunk in chunks:
+                yield from parser.feed(chunk)
+        finally:
+            # releases the transport when the caller stops early
+            chunks.close()
+        parser.close()
 
     @abstractmethod
     def valid(self):
         """ Checks if an MI connection is valid """
 
+    def close(self):
+        """ Releases the resources held by the connection """
+
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -23,6 +23,7 @@ from .fifo import FIFO
 from .datagram import Datagram
 from .http import HTTP
 from .jsonrpc_helper import JSONRPCError, JSONRPCException
+from .cache import MICache
 
 
 class OpenSIPSMIException(Exception):
@@ -32,6 +33,14 @@ class OpenSIPSMIException(Exception):
 class OpenSIPSMI():
     """ OpenSIPS MI Implementation """
     def __init__(self, conn="fifo", **kwargs):
+        # results of read-only commands can be cached (opt-in)
+        cache = kwargs.pop("cache", None)
+        if cache is True:
+            cache = MICache()
+        self.cache = cache or None
+        # commands can be instrumented by a metrics recorder (opt-in)
+        recorder = kwargs.pop("recorder", None)
+
         if conn == "fifo":
             if "fifo_file" not in kwargs:
                 kwargs["fifo_file"] = "/var/run/opensips/opensips_fifo"
@@ -48,11 +57,25 @@ class OpenSIPSMI():
             raise ValueError("Invalid connector type")
 
         self.validated = None
+        self.set_recorder(recorder)
+
+    def set_recorder(self, recorder):
+        """ Sets the recorder of the metrics of the commands executed: an
+            object with a record(method, phases, total, size, error) method,
+            such as MIMetrics; None disables the recording """
+        self.conn.recorder = recorder
 
     def execute(self, cmd, params=None):
         """ Executes a command with the requested parameters """
+        params = params if params else []
+        if self.cache:
+            return self.cache.execute(cmd, params, self.execute_direct)
+        return self.execute_direct(cmd, params)
+
+    def execute_direct(self, cmd, params):
+        """ Executes a command, bypassing the cache """
         try:
-            ret_val = self.conn.execute(cmd, params if params else [])
+            ret_val = self.conn.execute(cmd, params)
         except JSONRPCError as e:
             raise OpenSIPSMIException(f"Error executing command: {e}") from e
         except JSONRPCException as e:
@@ -60,6 +83,40 @@ class OpenSIPSMI():
                                       "Is OpenSIPS running?") from e
         return ret_val
 
+    def execute_batch(self, commands):
+        """ Executes a list of (cmd, params) commands using JSON-RPC batches;
+            returns the result of each command, in order - the failed
+            commands are returned as OpenSIPSMIException objects """
+        commands = [(cmd[0], cmd[1] if len(cmd) > 1 and cmd[1] else [])
+                    for cmd in commands]
+        try:
+            ret_val = self.conn.execute_batch(commands)
+        except JSONRPCError as e:
+            raise OpenSIPSMIException(f"Error executing batch: {e}") from e
+        except JSONRPCException as e:
+            raise OpenSIPSMIException(f"Error with connection: {e}. "
+                                      "Is OpenSIPS running?") from e
+        finally:
+            if self.cache:
+                for cmd, params in commands:
+                    self.cache.executed(cmd, params)
+        return [OpenSIPSMIException(f"Error executing command: {r}")
+                if isinstance(r, JSONRPCError) else r for r in ret_val]
+
+    def execute_stream(self, cmd, params=None, path=None):
+        """ Executes a command and yields, one by one, the values found at
+            path (i.e. "Domains.item.AORs.item") in its result, as the
+            reply is received; the whole result is yielded if no path
+            is given """
+        try:
+            yield from self.conn.execute_stream(cmd, params if params else [],
+                                                path)
+        except JSONRPCError as e:
+            raise OpenSIPSMIException(f"Error executing command: {e}") from e
+        except JSONRPCException as e:
+            raise OpenSIPSMIException(f"Error with connection: {e}. "
+                                      "Is OpenSIPS running?") from e
+
     def valid(self):
         """ Checks if the connector is valid """
         if self.validated is not None:
@@ -67,4 +124,8 @@ class OpenSIPSMI():
         self.validated = self.conn.valid()
         return self.validated
 
+    def close(self):
+        """ Closes the connector and releases its resources """
+        self.conn.close()
+
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
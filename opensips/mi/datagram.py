@@ -21,10 +21,110 @@
 
 import socket
 import os
+import threading
 from tempfile import NamedTemporaryFile
-from .connection import Connection
+from .connection import Connection, decode_measured
 from . import jsonrpc_helper
 
+
+class DatagramChannel():
+
+    """ Long-lived datagram socket shared by concurrent commands;
+        replies are matched to the waiting commands by their id """
+
+    def __init__(self, family, address, recv_sock, recv_size):
+        self.recv_sock = recv_sock
+        self.recv_size = recv_size
+        self.pid = os.getpid()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.closed = False
+
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            if self.recv_sock:
+                if os.path.exists(self.recv_sock):
+                    os.unlink(self.recv_sock)
+                self.sock.bind(self.recv_sock)
+            self.sock.connect(address)
+        except OSError:
+            self.sock.close()
+            raise
+        # only used to periodically check if the channel was closed
+        self.sock.settimeout(1)
+        self.reader = threading.Thread(target=self.read, daemon=True)
+        self.reader.start()
+
+    def execute(self, jsoncmd: str, cmd_id: str, timeout: float,
+                stats=None):
+        """ Sends a command and waits for its decoded reply; as replies
+            are decoded by the reader, their size and decoding time are
+            passed along with them """
+        slot = [threading.Event(), None, None, 0]
+        with self.lock:
+            self.pending[cmd_id] = slot
+        try:
+            self.sock.send(jsoncmd.encode())
+            if not slot[0].wait(timeout):
+                raise socket.timeout("timed out")
+        finally:
+            with self.lock:
+                del self.pending[cmd_id]
+        _, reply, size, decoding = slot
+        if isinstance(reply, Exception):
+            raise reply
+        if stats is not None:
+            stats.set(size, decoding)
+        return reply
+
+    def read(self):
+        """ Reads the replies and wakes up their commands """
+        while not self.closed:
+            try:
+                data = self.sock.recv(self.recv_size)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if self.closed:
+                    break
+                # e.g. ICMP port unreachable - fail everything in flight
+                self.wake_all(e)
+                continue
+            try:
+                reply, size, decoding = decode_measured(data)
+            except jsonrpc_helper.JSONRPCException:
+                continue
+            # batches are registered by one of their ids
+            with self.lock:
+                for cmd_id in jsonrpc_helper.get_reply_ids(reply):
+                    slot = self.pending.get(cmd_id)
+                    if slot:
+                        slot[1:] = reply, size, decoding
+                        slot[0].set()
+                        break
+
+    def wake_all(self, exc):
+        """ Fails all the commands waiting for a reply """
+        with self.lock:
+            slots = list(self.pending.values())
+        for slot in slots:
+            slot[1] = exc
+            slot[0].set()
+
+    def close(self):
+        """ Closes the socket and stops the reader """
+        self.closed = True
+        self.sock.close()
+        if self.recv_sock and os.path.exists(self.recv_sock):
+            os.unlink(self.recv_sock)
+
+    def abandon(self):
+        """ Closes the copy of the socket inherited by a child process,
+            leaving the reply socket of the parent in place """
+        self.closed = True
+        self.sock.close()
+
+
 class Datagram(Connection):
     """ MI Datagram connection """
 
@@ -33,37 +133,81 @@ class Datagram(Connection):
             self.address = kwargs["datagram_unix_socket"]
             self.family = socket.AF_UNIX
             with NamedTemporaryFile(prefix="opensips_mi_reply_", dir="/tmp") as nt:
-                self.recv_sock = nt.name
+                self.recv_base = nt.name
+            self.recv_sock = self.reply_path()
         elif "datagram_ip" in kwargs and "datagram_port" in kwargs:
             self.address = (kwargs["datagram_ip"], int(kwargs["datagram_port"]))
             self.family = socket.AF_INET
+            self.recv_base = None
             self.recv_sock = None
         else:
             raise ValueError("Either datagram_unix_socket or both datagram_ip and datagram_port are required for Datagram")
 
         self.timeout = float(kwargs.get("datagram_timeout") or 0.1)
         self.recv_size = int(kwargs.get("datagram_buffer_size") or 32768)
+        # batches, as well as their replies, must fit in a single datagram
+        self.max_batch_size = int(kwargs.get("datagram_batch_size") or
+                                  self.recv_size // 2)
+        self.persistent = bool(kwargs.get("datagram_persistent"))
+        self.channel = None
+        self.lock = threading.Lock()
 
-    def execute(self, method: str, params: dict):
-        jsoncmd = jsonrpc_helper.get_command(method, params)
+    def reply_path(self):
+        """ Returns the path of the UNIX reply socket of the current
+            process, so that forked processes do not take over the reply
+            socket of their parent """
+        if not self.recv_base:
+            return None
+        return f"{self.recv_base}.{os.getpid()}"
 
+    def get_channel(self):
+        """ Returns the persistent channel, creating it if needed """
+        with self.lock:
+            if self.channel and self.channel.pid != os.getpid():
+                # inherited from the parent process, along with its socket
+                self.channel.abandon()
+                self.channel = None
+            if not self.channel:
+                self.recv_sock = self.reply_path()
+                self.channel = DatagramChannel(self.family, self.address,
+                                               self.recv_sock, self.recv_size)
+            return self.channel
+
+    def execute_raw(self, jsoncmd: str, cmd_id: str, stats=None):
+        if self.persistent:
+            try:
+                return self.get_channel().execute(jsoncmd, cmd_id,
+                                                  self.timeout, stats)
+            except Exception as e:
+                raise jsonrpc_helper.JSONRPCException(e)
+
+        recv_sock = self.reply_path()
         udp_socket = socket.socket(self.family, socket.SOCK_DGRAM)
         try:
-            if self.recv_sock:
-                udp_socket.bind(self.recv_sock)
+            if recv_sock:
+                udp_socket.bind(recv_sock)
             udp_socket.sendto(jsoncmd.encode(), self.address)
             udp_socket.settimeout(self.timeout)
             reply = udp_socket.recv(self.recv_size)
         except Exception as e:
             raise jsonrpc_helper.JSONRPCException(e)
         finally:
-            if self.recv_sock:
-                os.unlink(self.recv_sock)
+            if recv_sock and os.path.exists(recv_sock):
+                os.unlink(recv_sock)
             udp_socket.close()
 
-        return jsonrpc_helper.get_reply(reply)
+        return self.decode_reply(reply, stats)
 
     def valid(self):
         return (True, None)
 
+    def close(self):
+        with self.lock:
+            if self.channel:
+                if self.channel.pid != os.getpid():
+                    self.channel.abandon()
+                else:
+                    self.channel.close()
+                self.channel = None
+
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
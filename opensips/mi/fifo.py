@@ -23,16 +23,59 @@ import os
 import sys
 import time
 import errno
+import select
+import threading
 
 from .connection import Connection
 from . import jsonrpc_helper
 
 
+class ReplyFIFO():
+
+    """ Reply FIFO that is reused for all the commands of a thread """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.pid = os.getpid()
+        self.thread = threading.current_thread()
+        self.buf = b""
+        if os.path.exists(path):
+            os.unlink(path)
+        os.mkfifo(path)
+        os.chmod(path, 0o666)
+        # opened for writing as well, so that we never read EOF when
+        # OpenSIPS closes the FIFO after each reply
+        self.fd = os.open(path, os.O_RDWR)
+
+    def readline(self, timeout=None):
+        """ Reads a newline terminated reply """
+        while True:
+            idx = self.buf.find(b"\n")
+            if idx >= 0:
+                line = self.buf[:idx + 1]
+                self.buf = self.buf[idx + 1:]
+                return line
+            if timeout is not None:
+                ready, _, _ = select.select([self.fd], [], [], timeout)
+                if not ready:
+                    raise TimeoutError("timed out")
+            self.buf += os.read(self.fd, 65536)
+
+    def close(self):
+        """ Closes and removes the reply FIFO """
+        os.close(self.fd)
+        self.fd = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
 class FIFO(Connection):
 
     """ MI FIFO Connection """
 
     REPLY_FIFO_FILE_TEMPLATE = "opensips_fifo_reply_{}_{}"
+    CHUNK_SIZE = 65536
 
     def __init__(self, **kwargs):
         if "fifo_file" not in kwargs:
@@ -45,17 +88,89 @@ class FIFO(Connection):
         self.fifo_file = kwargs["fifo_file"]
         self.fifo_file_fallback = kwargs["fifo_file_fallback"]
         self.fifo_reply_dir = kwargs["fifo_reply_dir"]
+        timeout = kwargs.get("fifo_timeout")
+        self.timeout = float(timeout) if timeout else None
 
-    def execute(self, method: str, params: dict):
-        # check if the environment is valid
-        valid, msg = self.valid()
-        if not valid:
+        self.persistent = bool(kwargs.get("fifo_persistent"))
+        self.fifo_fd = None
+        self.local = threading.local()
+        self.replies = []
+        self.lock = threading.Lock()
+
+    def get_reply_fifo(self):
+        """ Returns the reply FIFO of the current thread """
+        reply_fifo = getattr(self.local, "reply_fifo", None)
+        if reply_fifo and reply_fifo.fd is not None and \
+                reply_fifo.pid == os.getpid():
+            return reply_fifo
+        reply_fifo_file_name = self.REPLY_FIFO_FILE_TEMPLATE.format(
+                os.getpid(), "t" + jsonrpc_helper.next_id())
+        reply_fifo_file_path = os.path.join(self.fifo_reply_dir,
+                                            reply_fifo_file_name)
+        try:
+            reply_fifo = ReplyFIFO(reply_fifo_file_path)
+        except OSError as e:
+            msg = "Could not create reply FIFO file " + \
+                    f"{reply_fifo_file_path}: {e}"
             raise jsonrpc_helper.JSONRPCException(msg)
-        jsoncmd = jsonrpc_helper.get_command(method, params)
+        with self.lock:
+            # drop the reply FIFOs of the threads that are gone
+            stale = [r for r in self.replies if not r.thread.is_alive()]
+            self.replies = [r for r in self.replies if r.thread.is_alive()]
+            self.replies.append(reply_fifo)
+        for old_fifo in stale:
+            if old_fifo.pid == os.getpid():
+                old_fifo.close()
+        self.local.reply_fifo = reply_fifo
+        return reply_fifo
 
-        cur_time = str(time.time()).replace(".", "_")
+    def write(self, data: bytes):
+        """ Writes in the OpenSIPS FIFO, which is kept open """
+        with self.lock:
+            for retry in (True, False):
+                if self.fifo_fd is None:
+                    valid, msg = self.valid()
+                    if not valid:
+                        raise jsonrpc_helper.JSONRPCException(msg)
+                    self.fifo_fd = os.open(self.fifo_file, os.O_WRONLY)
+                try:
+                    while data:
+                        data = data[os.write(self.fifo_fd, data):]
+                    return
+                except OSError as e:
+                    # OpenSIPS might have been restarted - reopen the FIFO
+                    os.close(self.fifo_fd)
+                    self.fifo_fd = None
+                    if not retry or e.errno != errno.EPIPE:
+                        msg = f"Could not access FIFO file {self.fifo_file}: {e}"
+                        raise jsonrpc_helper.JSONRPCException(msg)
+
+    def execute_persistent(self, jsoncmd: str, cmd_id: str, stats=None):
+        """ Executes a command using the reply FIFO of the thread """
+        reply_fifo = self.get_reply_fifo()
+        self.write(f":{reply_fifo.name}:{jsoncmd}\n".encode())
+        timeout = self.timeout
+        if timeout:
+            deadline = time.monotonic() + timeout
+        while True:
+            try:
+                reply = reply_fifo.readline(timeout)
+            except TimeoutError as e:
+                raise jsonrpc_helper.JSONRPCException(e)
+            except KeyboardInterrupt:
+                sys.exit(-1)
+            reply = self.decode_reply(reply, stats)
+            # skip the late replies of the commands that timed out
+            if cmd_id in jsonrpc_helper.get_reply_ids(reply):
+                return reply
+            if timeout:
+                timeout = max(deadline - time.monotonic(), 0)
+
+    def new_reply_fifo(self, suffix: str):
+        """ Creates a reply FIFO for a single command;
+            returns its name and path """
         reply_format = self.REPLY_FIFO_FILE_TEMPLATE
-        reply_fifo_file_name = reply_format.format(os.getpid(), cur_time)
+        reply_fifo_file_name = reply_format.format(os.getpid(), suffix)
         reply_fifo_file_path = os.path.join(self.fifo_reply_dir,
                                             reply_fifo_file_name)
 
@@ -74,6 +189,49 @@ class FIFO(Connection):
             msg = "Could not create reply FIFO file " + \
                     f"{reply_fifo_file_path}: {e}"
             raise jsonrpc_helper.JSONRPCException(msg)
+        return reply_fifo_file_name, reply_fifo_file_path
+
+    def execute_chunks(self, jsoncmd: str, cmd_id: str):
+        # the reply is read up to EOF, so it always gets its own reply
+        # FIFO, even in persistent mode
+        if not self.persistent:
+            valid, msg = self.valid()
+            if not valid:
+                raise jsonrpc_helper.JSONRPCException(msg)
+        reply_fifo_file_name, reply_fifo_file_path = \
+            self.new_reply_fifo("s" + jsonrpc_helper.next_id())
+        try:
+            fifocmd = f":{reply_fifo_file_name}:{jsoncmd}\n".encode()
+            if self.persistent:
+                self.write(fifocmd)
+            else:
+                try:
+                    with open(self.fifo_file, "wb") as fifo:
+                        fifo.write(fifocmd)
+                except Exception as e:
+                    msg = f"Could not access FIFO file {self.fifo_file}: {e}"
+                    raise jsonrpc_helper.JSONRPCException(msg)
+            with open(reply_fifo_file_path, "rb", buffering=0) as reply_fifo:
+                while True:
+                    chunk = reply_fifo.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.unlink(reply_fifo_file_path)
+
+    def execute_raw(self, jsoncmd: str, cmd_id: str, stats=None):
+        if self.persistent:
+            return self.execute_persistent(jsoncmd, cmd_id, stats)
+
+        # check if the environment is valid
+        valid, msg = self.valid()
+        if not valid:
+            raise jsonrpc_helper.JSONRPCException(msg)
+
+        cur_time = str(time.time()).replace(".", "_")
+        reply_fifo_file_name, reply_fifo_file_path = \
+            self.new_reply_fifo(cur_time)
 
         if not os.path.exists(self.fifo_file):
             raise jsonrpc_helper.JSONRPCException(
@@ -97,9 +255,12 @@ class FIFO(Connection):
         finally:
             os.unlink(reply_fifo_file_path)
 
-        return jsonrpc_helper.get_reply(reply)
+        return self.decode_reply(reply, stats)
 
-    def valid(self):
+    def valid(self, blocking=True):
+        """ Checks that the OpenSIPS FIFO can be written; unless blocking,
+            it fails right away if no process reads it, instead of waiting
+            for one """
         opensips_fifo = self.fifo_file
         if not os.path.exists(opensips_fifo):
             opensips_fifo = self.fifo_file_fallback
@@ -108,11 +269,16 @@ class FIFO(Connection):
                 msg2 = f"nor does fallback file {self.fifo_file_fallback}"
                 return (False, [f"{msg1}, {msg2}", "Is OpenSIPS running?"])
         try:
-            with open(opensips_fifo, "w", encoding="utf-8"):
-                pass
+            if blocking:
+                with open(opensips_fifo, "w", encoding="utf-8"):
+                    pass
+            else:
+                os.close(os.open(opensips_fifo, os.O_WRONLY | os.O_NONBLOCK))
         except OSError as e:
             extra = []
-            if e.errno == errno.EACCES:
+            if e.errno == errno.ENXIO:
+                extra = ["Is OpenSIPS running?"]
+            elif e.errno == errno.EACCES:
                 sticky = self.get_sticky(os.path.dirname(opensips_fifo))
                 if sticky:
                     extra = [f"""starting with Linux kernel 4.19, processes
@@ -128,6 +294,16 @@ class FIFO(Connection):
         self.fifo_file = opensips_fifo
         return (True, None)
 
+    def close(self):
+        with self.lock:
+            if self.fifo_fd is not None:
+                os.close(self.fifo_fd)
+                self.fifo_fd = None
+            replies, self.replies = self.replies, []
+        for reply_fifo in replies:
+            if reply_fifo.pid == os.getpid():
+                reply_fifo.close()
+
     def get_sticky(self, path):
         """ returns whether a path has sitcky bit or not """
         if path == "/":
@@ -20,57 +20,199 @@
 """ HTTP implementation of MI """
 
 import ssl
+import time
 import socket
-import urllib.error
+import threading
+import http.client
 import urllib.parse
-import urllib.request
 from .connection import Connection
 from . import jsonrpc_helper
 
 
+class HTTPConnectionPool():
+
+    """ Bounded pool of persistent HTTP/1.1 connections """
+
+    # errors that a reused keep-alive connection raises when the server
+    # closed it meanwhile; the request is retried on a fresh connection
+    STALE_ERRORS = (http.client.RemoteDisconnected,
+                    http.client.BadStatusLine,
+                    ConnectionResetError,
+                    BrokenPipeError)
+
+    def __init__(self, host, port, ssl_ctx=None, size=4,
+                 idle_timeout=30, timeout=None):
+        self.host = host
+        self.port = port
+        self.ssl_ctx = ssl_ctx
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def new_connection(self):
+        """ Creates a new (not yet connected) HTTP connection """
+        if self.ssl_ctx:
+            return http.client.HTTPSConnection(self.host, self.port,
+                                               timeout=self.timeout,
+                                               context=self.ssl_ctx)
+        return http.client.HTTPConnection(self.host, self.port,
+                                          timeout=self.timeout)
+
+    def checkout(self):
+        """ Returns an idle connection, or a new one if none is usable """
+        self.slots.acquire()
+        now = time.monotonic()
+        with self.lock:
+            while self.idle:
+                conn, last_used = self.idle.pop()
+                if now - last_used < self.idle_timeout:
+                    return conn, True
+                conn.close()
+        return self.new_connection(), False
+
+    def checkin(self, conn, reuse=True):
+        """ Returns a connection to the pool """
+        try:
+            if reuse:
+                with self.lock:
+                    self.idle.append((conn, time.monotonic()))
+            else:
+                conn.close()
+        finally:
+            self.slots.release()
+
+    def open(self, path, body, headers):
+        """ Runs a POST request and returns the connection it was sent on,
+            checked out of the pool, and the response """
+        conn, reused = self.checkout()
+        try:
+            try:
+                rpl = self._request(conn, path, body, headers)
+            except self.STALE_ERRORS:
+                if not reused:
+                    raise
+                conn.close()
+                conn = self.new_connection()
+                rpl = self._request(conn, path, body, headers)
+        except BaseException:
+            self.checkin(conn, False)
+            raise
+        return conn, rpl
+
+    def request(self, path, body, headers):
+        """ Runs a POST request and returns the status, reason and body """
+        conn, rpl = self.open(path, body, headers)
+        try:
+            data = rpl.read()
+        except BaseException:
+            self.checkin(conn, False)
+            raise
+        self.checkin(conn, not rpl.will_close)
+        return rpl.status, rpl.reason, data
+
+    @staticmethod
+    def _request(conn, path, body, headers):
+        conn.request("POST", path, body, headers)
+        return conn.getresponse()
+
+    def close(self):
+        """ Closes all the idle connections """
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
 class HTTP(Connection):
 
     """ HTTP communication socket """
 
+    CHUNK_SIZE = 65536
+
     def __init__(self, **kwargs):
         if "url" not in kwargs:
             raise ValueError("url is required for HTTP connector")
 
         self.url = kwargs["url"]
+        url_parsed = urllib.parse.urlparse(self.url)
+        self.host = url_parsed.hostname
+        if url_parsed.port:
+            self.port = url_parsed.port
+        elif url_parsed.scheme == "https":
+            self.port = 443
+        else:
+            self.port = 80
+        self.path = url_parsed.path or "/"
+        if url_parsed.query:
+            self.path += "?" + url_parsed.query
 
-    def execute(self, method: str, params: dict):
-        jsoncmd = jsonrpc_helper.get_command(method, params)
-        headers = {
+        if url_parsed.scheme == "https":
+            # build the context only once, it is expensive
+            # pylint: disable=protected-access
+            ssl_ctx = ssl._create_unverified_context()
+        else:
+            ssl_ctx = None
+
+        timeout = kwargs.get("http_timeout")
+        self.pool = HTTPConnectionPool(
+            self.host, self.port, ssl_ctx,
+            size=int(kwargs.get("http_pool_size") or 4),
+            idle_timeout=float(kwargs.get("http_idle_timeout") or 30),
+            timeout=float(timeout) if timeout else None)
+        self.headers = {
             "Content-Type": "application/json"
         }
-        request = urllib.request.Request(self.url, jsoncmd.encode(), headers)
-        url_parsed = urllib.parse.urlparse(self.url)
+
+    def execute_raw(self, jsoncmd: str, cmd_id: str, stats=None):
         try:
-            if url_parsed.scheme == "https":
-                # pylint: disable=protected-access
-                ssl_ctx = ssl._create_unverified_context()
-            else:
-                ssl_ctx = None
-            with urllib.request.urlopen(request, context=ssl_ctx) as rpl:
-                reply = rpl.read().decode()
+            status, reason, reply = self.pool.request(self.path,
+                                                      jsoncmd.encode(),
+                                                      self.headers)
         except Exception as e:  # pylint: disable=broad-exception-caught
             raise jsonrpc_helper.JSONRPCException(str(e))
-        return jsonrpc_helper.get_reply(reply)
+        if status >= 400:
+            raise jsonrpc_helper.JSONRPCException(
+                f"HTTP Error {status}: {reason}")
+        return self.decode_reply(reply.decode(), stats)
+
+    def execute_chunks(self, jsoncmd: str, cmd_id: str):
+        try:
+            conn, rpl = self.pool.open(self.path, jsoncmd.encode(),
+                                       self.headers)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            raise jsonrpc_helper.JSONRPCException(str(e))
+        # the connection is only reused if the reply was read entirely
+        keep = False
+        try:
+            if rpl.status >= 400:
+                raise jsonrpc_helper.JSONRPCException(
+                    f"HTTP Error {rpl.status}: {rpl.reason}")
+            while True:
+                try:
+                    chunk = rpl.read(self.CHUNK_SIZE)
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    raise jsonrpc_helper.JSONRPCException(str(e))
+                if not chunk:
+                    break
+                yield chunk
+            keep = not rpl.will_close
+        finally:
+            self.pool.checkin(conn, keep)
 
     def valid(self):
         try:
-            url_parsed = urllib.parse.urlparse(self.url)
-            if not url_parsed.port:
-                if url_parsed.scheme == "http":
-                    url_parsed.port = 80
-                else:
-                    url_parsed.port = 443
             sock = socket.socket()
-            sock.connect((url_parsed.hostname, url_parsed.port))
+            sock.connect((self.host, self.port))
             sock.close()
             return (True, None)
         except Exception as e:  # pylint: disable=broad-exception-caught
             msg = f"Could not connect to {self.url} ({e})"
             return (False, [msg, "Is OpenSIPS running?"])
 
+    def close(self):
+        self.pool.close()
+
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Generators that iterate over the large lists kept by OpenSIPS """
+
+import queue
+import threading
+
+# marks the end of the values produced in the background
+_END = object()
+
+
+def prefetched(iterable, size: int = 1):
+
+    """ Iterates over iterable in a background thread, keeping up to size
+        values ready, so that producing the next value overlaps with
+        processing the current one """
+
+    values = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                values.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for value in iterable:
+                if not put((value, None)):
+                    return
+            put((_END, None))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            put((_END, e))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+    producer = threading.Thread(target=produce, daemon=True,
+                                name="opensips-prefetch")
+    producer.start()
+    try:
+        while True:
+            value, exc = values.get()
+            if value is _END:
+                if exc:
+                    raise exc
+                return
+            yield value
+    finally:
+        stop.set()
+
+
+def dialog_pages(mi, page_size: int = 1000):
+
+    """ Yields the dialogs of OpenSIPS in pages of page_size dialogs,
+        using the index and counter parameters of dlg_list """
+
+    index = 0
+    while True:
+        result = mi.execute("dlg_list", {"index": index,
+                                         "counter": page_size})
+        dialogs = result.get("Dialogs") or []
+        if dialogs:
+            yield dialogs
+        if len(dialogs) < page_size:
+            return
+        index += len(dialogs)
+
+
+def iter_dialogs(mi, page_size: int = 1000, prefetch: int = 1):
+
+    """ Yields all the dialogs of OpenSIPS, one by one, fetching up to
+        prefetch pages in the background while the current one is
+        processed """
+
+    if page_size < 1:
+        raise ValueError("page_size must be positive")
+    pages = dialog_pages(mi, page_size)
+    if prefetch:
+        pages = prefetched(pages, prefetch)
+    for page in pages:
+        yield from page
+
+
+def iter_contacts(mi, prefetch: int = 1000):
+
+    """ Yields an (AOR, contact) tuple for each contact registered in
+        OpenSIPS, parsing the ul_dump reply as it is received; up to
+        prefetch contacts are read in the background """
+
+    def contacts():
+        for aor in mi.execute_stream("ul_dump",
+                                     path="Domains.item.AORs.item"):
+            for contact in aor.get("Contacts") or []:
+                yield aor.get("AOR"), contact
+
+    if prefetch:
+        return prefetched(contacts(), prefetch)
+    return contacts()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
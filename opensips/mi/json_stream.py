@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+"""
+Incremental parser that extracts the values found at a given path of a
+JSONRPC reply, while the reply is still being received
+"""
+
+import re
+import codecs
+from .. import codec
+from .jsonrpc_helper import JSONRPCError, JSONRPCException
+
+# path component that matches each element of an array
+ITEM = "item"
+
+# parser states
+VALUE = 0           # expecting a value
+VALUE_OR_END = 1    # expecting the first value of an array, or its end
+KEY_OR_END = 2      # expecting the first key of an object, or its end
+KEY = 3             # expecting a key
+COLON = 4           # expecting the colon that follows a key
+NEXT_OR_END = 5     # expecting a comma or the end of the container
+SKIP = 6            # looking for the end of a value split between chunks
+DONE = 7            # the reply is complete
+
+
+class JsonPathParser():
+
+    """ Parses a JSONRPC reply chunk by chunk, returning the values found
+        at a dot separated path of the result (where "item" stands for
+        each element of an array) as soon as they are complete; only the
+        value being parsed is kept in memory """
+
+    # pylint: disable=too-many-instance-attributes
+
+    WHITESPACE = re.compile(r'[ \t\r\n]*')
+    STRUCTURE = re.compile(r'[][{}"]')
+    STRING = re.compile(r'["\\]')
+    SCALAR = re.compile(r'[^ \t\r\n,\]}]+')
+    KEY_STRING = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+    def __init__(self, path: str = None):
+        self.target = ["result"] + (path.split(".") if path else [])
+        self.error = None
+        self.result = False
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.state = VALUE
+        # the components of the path of the containers we are in
+        self.path = []
+        self.containers = []
+        # the value split between chunks: the chunks scanned so far are
+        # kept apart and joined once, when the value ends
+        self.start = None
+        self.pending = []
+        self.depth = 0
+        self.in_string = False
+        self.capture = None
+
+    def feed(self, data) -> list:
+        """ Adds a chunk of the reply and returns the completed values """
+        values = []
+        if isinstance(data, (bytes, bytearray)):
+            data = self.decoder.decode(data)
+        self.buf += data
+        while self.step(values):
+            pass
+        # drop everything that was consumed
+        consumed = self.pos if self.start is None else self.start
+        self.buf = self.buf[consumed:]
+        self.pos -= consumed
+        if self.start is not None:
+            self.start = 0
+        return values
+
+    def close(self):
+        """ Checks that the reply was complete and successful """
+        if self.error is not None:
+            error = self.error if isinstance(self.error, dict) else {}
+            raise JSONRPCError(error.get('code', 500),
+                               error.get('message'),
+                               error.get('data'))
+        if self.state != DONE:
+            raise JSONRPCException("incomplete reply")
+        if not self.result:
+            raise JSONRPCError(-32603, 'Internal error')
+
+    def step(self, values) -> bool:
+        """ Advances the parser; returns False if more data is needed """
+        # pylint: disable=too-many-return-statements
+        if self.state == SKIP:
+            return self.skip(values)
+        if self.state == DONE:
+            return False
+        self.pos = self.WHITESPACE.match(self.buf, self.pos).end()
+        if self.pos == len(self.buf):
+            return False
+        char = self.buf[self.pos]
+        if self.state in (VALUE_OR_END, KEY_OR_END, NEXT_OR_END) and \
+                char in "]}":
+            self.pos += 1
+            self.containers.pop()
+            self.path.pop()
+            self.end_value()
+            return True
+        if self.state == NEXT_OR_END:
+            if char != ",":
+                raise JSONRPCException("invalid json in reply")
+            self.pos += 1
+            self.state = KEY if self.containers[-1] == "{" else VALUE
+            return True
+        if self.state in (KEY_OR_END, KEY):
+            return self.key(char)
+        if self.state == COLON:
+            if char != ":":
+                raise JSONRPCException("invalid json in reply")
+            self.pos += 1
+            self.state = VALUE
+            return True
+        return self.value(char, values)
+
+    def key(self, char) -> bool:
+        """ Parses the key of an object """
+        if char != '"':
+            raise JSONRPCException("invalid json in reply")
+        match = self.KEY_STRING.match(self.buf, self.pos)
+        if not match:
+            # the key continues in the next chunk
+            return False
+        key = match.group(1)
+        self.path[-1] = codec.loads(match.group(0)) if "\\" in key else key
+        self.pos = match.end()
+        self.state = COLON
+        return True
+
+    def value(self, char, values) -> bool:
+        """ Parses a value, or looks inside it if it is on the path """
+        depth = len(self.path)
+        wanted = self.path == self.target[:depth]
+        if depth == 1 and self.path == ["error"]:
+            capture = "error"
+        elif wanted and depth == len(self.target):
+            capture = "value"
+        else:
+            capture = None
+        if depth == 1 and self.path[0] == "result":
+            self.result = True
+
+        if char in "{[" and wanted and capture is None:
+            # a container on the way to the path
+            self.pos += 1
+            self.containers.append(char)
+            if char == "{":
+                self.path.append(None)
+                self.state = KEY_OR_END
+            else:
+                self.path.append(ITEM)
+                self.state = VALUE_OR_END
+            return True
+
+        self.capture = capture
+        if char in '{["':
+            # most values are complete in the buffer and can be decoded
+            # at once; only the ones split between chunks are scanned
+            try:
+                value, self.pos = codec.raw_decode(self.buf, self.pos)
+            except ValueError:
+                self.start = self.pos
+                self.pos += 1
+                self.depth = 0 if char == '"' else 1
+                self.in_string = char == '"'
+                self.state = SKIP
+                return True
+            self.complete(values, value)
+            return True
+
+        match = self.SCALAR.match(self.buf, self.pos)
+        if not match:
+            raise JSONRPCException("invalid json in reply")
+        if match.end() == len(self.buf):
+            # the scalar might continue in the next chunk
+            return False
+        self.pos = match.end()
+        self.complete(values, codec.loads(match.group(0))
+                      if capture else None)
+        return True
+
+    def skip(self, values) -> bool:
+        """ Scans a value split between chunks, up to its end """
+        buf = self.buf
+        end = len(buf)
+        pos = self.pos
+        while pos < end:
+            if self.in_string:
+                match = self.STRING.search(buf, pos)
+                if not match:
+                    pos = end
+                    break
+                if buf[match.start()] == "\\":
+                    if match.end() == end:
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                self.in_string = False
+                if self.depth == 0:
+                    break
+                continue
+            match = self.STRUCTURE.search(buf, pos)
+            if not match:
+                pos = end
+                break
+            char = buf[match.start()]
+            pos = match.end()
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    break
+        if self.depth or self.in_string:
+            # keep the unscanned tail (i.e. a split escape) in the buffer
+            if self.capture:
+                self.pending.append(buf[self.start:pos])
+            self.buf = buf[pos:]
+            self.pos = 0
+            self.start = 0
+            return False
+        self.pos = pos
+        value = None
+        if self.capture:
+            self.pending.append(buf[self.start:pos])
+            try:
+                value = codec.loads("".join(self.pending))
+            except ValueError as e:
+                raise JSONRPCException("invalid json in reply") from e
+        self.pending = []
+        self.start = None
+        self.complete(values, value)
+        return True
+
+    def complete(self, values, value):
+        """ Handles the end of a value that is not looked into """
+        if self.capture == "error":
+            self.error = value
+        elif self.capture:
+            values.append(value)
+        self.capture = None
+        self.end_value()
+
+    def end_value(self):
+        """ Moves on after the end of a value """
+        if self.containers:
+            self.state = NEXT_OR_END
+        else:
+            self.state = DONE
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
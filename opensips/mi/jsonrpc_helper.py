@@ -22,14 +22,8 @@ This module contains helper functions to build and parse JSONRPC commands
 """
 
 import json
-from random import randint
-from collections import OrderedDict
-
-
-try:
-    from json.decoder import JSONDecodeError
-except ImportError:  # JSONDecodeError is not available in  python3.4
-    JSONDecodeError = ValueError
+import itertools
+from .. import codec
 
 
 class JSONRPCException(Exception):
@@ -54,32 +48,107 @@ class JSONRPCError(JSONRPCException):
         return f"{self.code}: {self.message}{data}"
 
 
-def get_command(method, params=None) -> str:
+COMMAND_IDS = itertools.count(1)
+
+
+def next_id() -> str:
+
+    """ Returns a command id that is unique within the process """
+    return str(next(COMMAND_IDS))
+
+
+def get_command(method, params=None, cmd_id=None) -> str:
 
     """ Builds a JSONRPC command and returns it """
 
     cmd = {
             'jsonrpc': '2.0',
-            'id': str(randint(0, 32767)),
+            'id': str(cmd_id) if cmd_id is not None else next_id(),
             'method': method,
             'params': params if params else {}
     }
     return json.dumps(cmd)
 
 
-def get_reply(cmd) -> OrderedDict:
+def get_batch_commands(commands, max_size=None):
+
+    """ Builds JSONRPC batches out of (method, params) pairs; yields the ids
+        and the payload of each batch, split so that a payload does not
+        exceed max_size bytes (unless it holds a single command) """
+
+    ids = []
+    cmds = []
+    size = 1
+    for method, params in commands:
+        cmd_id = next_id()
+        jsoncmd = get_command(method, params, cmd_id)
+        if max_size and cmds and size + len(jsoncmd) + 1 > max_size:
+            yield ids, "[" + ",".join(cmds) + "]"
+            ids = []
+            cmds = []
+            size = 1
+        ids.append(cmd_id)
+        cmds.append(jsoncmd)
+        size += len(jsoncmd) + 1
+    if cmds:
+        yield ids, "[" + ",".join(cmds) + "]"
 
-    """ Parses the reply and returns it as a OrderedDict """
+
+def decode_reply(cmd):
+
+    """ Decodes a JSONRPC reply, without interpreting it """
     try:
-        j = json.loads(cmd, object_pairs_hook=OrderedDict)
-        if isinstance(j.get('error'), dict):
-            raise JSONRPCError(j['error'].get('code', 500),
-                               j['error'].get('message'),
-                               j['error'].get('data'))
-        if 'result' not in j:
-            raise JSONRPCError(-32603, 'Internal error')
-        return j['result']
-    except JSONDecodeError as exc:
+        return codec.loads(cmd)
+    except ValueError as exc:
         raise JSONRPCException(f"could not decode json: '{cmd}'") from exc
 
+
+def get_reply_ids(j) -> list:
+
+    """ Returns the ids of a decoded reply (or batch reply) """
+    if isinstance(j, list):
+        return [str(r.get('id')) for r in j if isinstance(r, dict)]
+    if isinstance(j, dict):
+        return [str(j.get('id'))]
+    return []
+
+
+def get_result(j) -> dict:
+
+    """ Returns the result of a decoded reply, or raises its error """
+    if isinstance(j.get('error'), dict):
+        raise JSONRPCError(j['error'].get('code', 500),
+                           j['error'].get('message'),
+                           j['error'].get('data'))
+    if 'result' not in j:
+        raise JSONRPCError(-32603, 'Internal error')
+    return j['result']
+
+
+def get_batch_results(ids, j) -> list:
+
+    """ Demultiplexes a decoded batch reply by id; returns the results in
+        the order of the ids, with the failed ones as JSONRPCError """
+    if not isinstance(j, list):
+        # the whole batch was rejected
+        get_result(j)
+        raise JSONRPCError(-32603, 'Internal error')
+    replies = {str(r.get('id')): r for r in j if isinstance(r, dict)}
+    results = []
+    for cmd_id in ids:
+        try:
+            reply = replies.get(cmd_id)
+            if reply is None:
+                raise JSONRPCError(-32603, 'Missing reply')
+            results.append(get_result(reply))
+        except JSONRPCError as e:
+            results.append(e)
+    return results
+
+
+def get_reply(cmd) -> dict:
+
+    """ Parses the reply and returns its result """
+    return get_result(decode_reply(cmd))
+
 # vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Metrics recorder for the MI commands """
+
+import threading
+from collections import Counter
+from ..histogram import Histogram
+
+PHASES = ("get_command", "transport", "get_reply")
+
+
+class CommandMetrics():
+
+    """ Metrics of a single MI command """
+
+    def __init__(self, precision: int):
+        self.calls = 0
+        self.errors = Counter()
+        self.latency = Histogram(precision)
+        self.phases = {phase: Histogram(precision) for phase in PHASES}
+        self.reply_size = Histogram(precision)
+
+    def record(self, phases: dict, total: int, size, error):
+        """ Accounts an execution of the command """
+        self.calls += 1
+        self.latency.record(total)
+        for phase, elapsed in phases.items():
+            self.phases[phase].record(elapsed)
+        if size is not None:
+            self.reply_size.record(size)
+        if error is not None:
+            self.errors[type(error).__name__] += 1
+
+
+class MIMetrics():
+
+    """ Recorder keeping, for every MI command, the number of calls, the
+        errors by type and histograms of the latencies (total and for each
+        phase) and of the reply sizes; it can be shared by the connectors
+        of a pool """
+
+    def __init__(self, precision: int = 7):
+        self.precision = precision
+        self.lock = threading.Lock()
+        self.commands = {}
+
+    def record(self, method: str, phases: dict, total: int, size, error):
+        """ Called by the connector after each command, with the time
+            spent in each phase and in total (in nanoseconds), the size
+            of the reply (None if not known) and the exception raised """
+        # pylint: disable=too-many-arguments
+        with self.lock:
+            metrics = self.commands.get(method)
+            if metrics is None:
+                metrics = self.commands[method] = \
+                    CommandMetrics(self.precision)
+            metrics.record(phases, total, size, error)
+
+    def snapshot(self) -> dict:
+        """ Returns the metrics of each command; latencies are in
+            microseconds """
+        with self.lock:
+            return {method: {
+                "calls": metrics.calls,
+                "errors": dict(metrics.errors),
+                "latency_us": metrics.latency.summary(1000),
+                "phases_us": {phase: histogram.summary(1000)
+                              for phase, histogram in metrics.phases.items()
+                              if histogram.count},
+                "reply_size": metrics.reply_size.summary(),
+            } for method, metrics in self.commands.items()}
+
+    def reset(self):
+        """ Drops all the metrics """
+        with self.lock:
+            self.commands = {}
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Thread-safe pool of OpenSIPS MI connectors """
+
+import queue
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+from .connector import OpenSIPSMI, OpenSIPSMIException
+
+
+class MIPool():
+
+    """ Pool of MI connectors that can be used from multiple threads """
+
+    def __init__(self, conn="fifo", size=4, max_pending=None, **kwargs):
+        if size < 1:
+            raise ValueError("Invalid pool size")
+        self.size = size
+        self.max_pending = max_pending or size * 4
+        self.connectors = queue.Queue()
+        for _ in range(size):
+            self.connectors.put(OpenSIPSMI(conn, **kwargs))
+        self.pending = BoundedSemaphore(self.max_pending)
+        self.executor = ThreadPoolExecutor(max_workers=size,
+                                           thread_name_prefix="opensips-mi")
+
+    @contextmanager
+    def connector(self, timeout=None):
+        """ Checks out a connector for exclusive use """
+        try:
+            mi = self.connectors.get(timeout=timeout)
+        except queue.Empty as e:
+            raise OpenSIPSMIException("No MI connector available") from e
+        try:
+            yield mi
+        finally:
+            self.connectors.put(mi)
+
+    def execute(self, cmd, params=None):
+        """ Executes a command on the first available connector """
+        with self.connector() as mi:
+            return mi.execute(cmd, params)
+
+    def submit(self, cmd, params=None):
+        """ Schedules a command and returns its Future; blocks while there
+            are already max_pending commands waiting to complete """
+        self.pending.acquire()
+        try:
+            future = self.executor.submit(self.execute, cmd, params)
+        except BaseException:
+            self.pending.release()
+            raise
+        future.add_done_callback(lambda _: self.pending.release())
+        return future
+
+    def map(self, cmd, params_list):
+        """ Executes a command for each of the parameters in params_list;
+            yields the results in order, keeping at most max_pending
+            commands in flight """
+        futures = deque()
+        try:
+            for params in params_list:
+                if len(futures) >= self.max_pending:
+                    yield futures.popleft().result()
+                futures.append(self.executor.submit(self.execute,
+                                                    cmd, params))
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        """ Waits for the running commands and closes the connectors """
+        self.executor.shutdown(wait=True)
+        while not self.connectors.empty():
+            self.connectors.get().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
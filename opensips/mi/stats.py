@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+
+""" Periodic polling of OpenSIPS statistics """
+
+import math
+import time
+import threading
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class StatsPoller():
+
+    """ Fetches a set of statistics at a fixed interval and keeps the last
+        history samples of every counter in a ring buffer, to compute
+        deltas and rates """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, mi, statistics=None, interval=1.0, history=300,
+                 on_sample=None):
+        if interval <= 0 or history < 2:
+            raise ValueError("Invalid interval or history")
+        self.mi = mi
+        self.statistics = list(statistics) if statistics else ["all"]
+        self.interval = interval
+        self.history = history
+        self.on_sample = on_sample
+        self.lock = threading.Lock()
+        # one row of values per sample, one column per counter
+        self.names = []
+        self.columns = {}
+        self.data = array("d")
+        self.times = array("d", [math.nan]) * history
+        self.head = 0
+        self.count = 0
+        self.missed = 0
+        self.errors = 0
+        self.last_error = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def add_columns(self, names):
+        """ Widens the rows to hold new counters """
+        old_width = len(self.names)
+        self.names.extend(names)
+        for name in names:
+            self.columns[name] = len(self.columns)
+        width = len(self.names)
+        data = array("d", [math.nan]) * (self.history * width)
+        for row in range(self.history):
+            data[row * width:row * width + old_width] = \
+                self.data[row * old_width:(row + 1) * old_width]
+        self.data = data
+
+    def store(self, stats: dict, timestamp: float):
+        """ Adds a sample to the ring buffer """
+        with self.lock:
+            new = [name for name in stats if name not in self.columns]
+            if new:
+                self.add_columns(new)
+            width = len(self.names)
+            row = array("d", [math.nan]) * width
+            for name, value in stats.items():
+                try:
+                    row[self.columns[name]] = float(value)
+                except (TypeError, ValueError):
+                    pass
+            start = self.head * width
+            self.data[start:start + width] = row
+            self.times[self.head] = timestamp
+            self.head = (self.head + 1) % self.history
+            self.count = min(self.count + 1, self.history)
+
+    def poll(self) -> dict:
+        """ Fetches the statistics once and stores them """
+        stats = self.mi.execute("get_statistics",
+                                {"statistics": self.statistics})
+        self.store(stats, time.monotonic())
+        return stats
+
+    def row(self, age: int):
+        """ Returns the timestamp and the values of the sample taken age
+            samples ago """
+        idx = (self.head - 1 - age) % self.history
+        width = len(self.names)
+        return self.times[idx], self.data[idx * width:(idx + 1) * width]
+
+    def latest(self) -> dict:
+        """ Returns the last value of each counter """
+        with self.lock:
+            if not self.count:
+                return {}
+            _, values = self.row(0)
+            return dict(zip(self.names, values))
+
+    def deltas(self, window: int = 1) -> dict:
+        """ Returns the change of each counter over the last window
+            intervals """
+        return self.compute(window, False)
+
+    def rates(self, window: int = 1) -> dict:
+        """ Returns the per second rate of each counter over the last
+            window intervals """
+        return self.compute(window, True)
+
+    def compute(self, window: int, per_second: bool) -> dict:
+        """ Computes deltas (or rates) for all the counters at once """
+        with self.lock:
+            window = min(window, self.count - 1)
+            if window < 1:
+                return {}
+            now, current = self.row(0)
+            then, previous = self.row(window)
+            elapsed = now - then if per_second else 1.0
+            if numpy is not None:
+                values = (numpy.frombuffer(current) -
+                          numpy.frombuffer(previous)) / elapsed
+                return dict(zip(self.names, values.tolist()))
+            return {name: (cur - prev) / elapsed for name, cur, prev in
+                    zip(self.names, current, previous)}
+
+    def series(self, name: str) -> list:
+        """ Returns the (timestamp, value) samples of a counter,
+            oldest first """
+        with self.lock:
+            column = self.columns.get(name)
+            if column is None:
+                return []
+            width = len(self.names)
+            samples = []
+            for age in range(self.count - 1, -1, -1):
+                idx = (self.head - 1 - age) % self.history
+                samples.append((self.times[idx],
+                                self.data[idx * width + column]))
+            return samples
+
+    def run(self):
+        """ Polls the statistics at fixed times, regardless of how long
+            each poll takes; the ticks that could not be served are
+            skipped """
+        next_poll = time.monotonic()
+        while not self.stop_event.wait(max(next_poll - time.monotonic(), 0)):
+            try:
+                self.poll()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self.errors += 1
+                self.last_error = e
+            else:
+                if self.on_sample:
+                    self.on_sample(self)
+            next_poll += self.interval
+            late = time.monotonic() - next_poll
+            if late >= 0:
+                skipped = int(late // self.interval) + 1
+                self.missed += skipped
+                next_poll += skipped * self.interval
+
+    def start(self):
+        """ Starts polling in a background thread """
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       name="opensips-stats")
+        self.thread.start()
+
+    def stop(self):
+        """ Stops polling """
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -52,5 +52,5 @@ setup(
             "opensips-event = opensips.event.__main__:main",
         ]
     },
-    python_requires=">=3.6",
+    python_requires=">=3.7",
 )
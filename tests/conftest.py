@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Fixtures shared by the tests """
+
+import pytest
+from opensips.mi import OpenSIPSMI
+from fake_opensips import FakeOpenSIPS
+
+
+@pytest.fixture
+def opensips():
+    """ A fake OpenSIPS, whose servers are stopped after the test """
+    fake = FakeOpenSIPS()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def mi(opensips):
+    """ An MI connector talking to the fake OpenSIPS, used to subscribe
+        for events """
+    conn = OpenSIPSMI('http', url=opensips.http())
+    yield conn
+    conn.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
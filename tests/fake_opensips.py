@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Fake OpenSIPS MI servers (HTTP, datagram and FIFO) used by the tests """
+
+import os
+import json
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class MIError(Exception):
+    """ Raised by a handler to return a JSON-RPC error """
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """ HTTP server with a thread per connection """
+    daemon_threads = True
+
+
+class FakeOpenSIPS():
+
+    """ Answers MI commands using the handlers registered for each method;
+        commands without a handler have their method and params echoed """
+
+    def __init__(self):
+        self.handlers = {"event_subscribe": lambda params: "OK"}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.closers = []
+        self.http_peers = set()
+        # close HTTP connections after each reply, without telling the
+        # client (as a server dropping idle connections does)
+        self.http_drop = False
+
+    def answer(self, request):
+        """ Builds the reply of a request (or batch) """
+        if isinstance(request, list):
+            return [self.answer(r) for r in request]
+        method = request.get("method")
+        params = request.get("params")
+        with self.lock:
+            self.requests.append((method, params))
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        handler = self.handlers.get(method)
+        try:
+            if handler:
+                reply["result"] = handler(params)
+            else:
+                reply["result"] = {"method": method, "params": params}
+        except MIError as e:
+            reply["error"] = {"code": e.code, "message": e.message}
+        return reply
+
+    def reply_bytes(self, data: bytes) -> bytes:
+        """ Returns the serialized reply of a serialized request """
+        return json.dumps(self.answer(json.loads(data))).encode()
+
+    def methods(self) -> list:
+        """ Returns the methods received so far """
+        with self.lock:
+            return [method for method, _ in self.requests]
+
+    def http(self) -> str:
+        """ Starts an HTTP server and returns its URL """
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """ MI over HTTP """
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """ Answers an MI request """
+                fake.http_peers.add(self.client_address)
+                length = int(self.headers.get("Content-Length", 0))
+                body = fake.reply_bytes(self.rfile.read(length))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                if fake.http_drop:
+                    self.close_connection = True
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, args=(0.05,),
+                         daemon=True).start()
+        self.closers.append(server.shutdown)
+        self.closers.append(server.server_close)
+        return f"http://127.0.0.1:{server.server_address[1]}/mi"
+
+    def datagram(self, path: str = None):
+        """ Starts a datagram server (UNIX if path is given, UDP otherwise)
+            and returns its address; each request is answered by its own
+            thread, so replies can be sent out of order """
+        if path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(path)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(("127.0.0.1", 0))
+        address = sock.getsockname()
+
+        def reply(data, peer):
+            try:
+                sock.sendto(self.reply_bytes(data), peer)
+            except OSError:
+                pass
+
+        def serve():
+            while True:
+                try:
+                    data, peer = sock.recvfrom(65535)
+                except OSError:
+                    return
+                threading.Thread(target=reply, args=(data, peer),
+                                 daemon=True).start()
+
+        threading.Thread(target=serve, daemon=True).start()
+        self.closers.append(sock.close)
+        return address
+
+    def fifo(self, directory: str) -> dict:
+        """ Starts a FIFO server in directory and returns the arguments
+            of the FIFO connector """
+        fifo_file = os.path.join(directory, "opensips_fifo")
+        os.mkfifo(fifo_file)
+        stop = threading.Event()
+        # opened right away, so that the FIFO has a reader when returned
+        fd = os.open(fifo_file, os.O_RDWR)
+
+        def serve():
+            decoder = json.JSONDecoder()
+            buf = ""
+            while not stop.is_set():
+                data = os.read(fd, 65536).decode()
+                buf += data
+                while True:
+                    buf = buf.lstrip()
+                    if not buf.startswith(":"):
+                        buf = ""
+                        break
+                    name, sep, rest = buf[1:].partition(":")
+                    if not sep:
+                        break
+                    try:
+                        request, end = decoder.raw_decode(rest)
+                    except ValueError:
+                        break
+                    buf = rest[end:]
+                    if not name:
+                        continue
+                    reply = self.reply_bytes(json.dumps(request).encode())
+                    path = os.path.join(directory, name)
+                    try:
+                        reply_fd = os.open(path, os.O_WRONLY)
+                    except OSError:
+                        continue
+                    os.write(reply_fd, reply + b"\n")
+                    os.close(reply_fd)
+            os.close(fd)
+
+        def close():
+            stop.set()
+            # wake up the reader
+            fd = os.open(fifo_file, os.O_WRONLY | os.O_NONBLOCK)
+            os.write(fd, b"\n")
+            os.close(fd)
+
+        threading.Thread(target=serve, daemon=True).start()
+        self.closers.append(close)
+        return {"fifo_file": fifo_file, "fifo_file_fallback": fifo_file,
+                "fifo_reply_dir": directory}
+
+    def connector(self, transport: str, directory: str) -> tuple:
+        """ Starts a server and returns the type and the arguments of an
+            MI connector talking to it """
+        if transport == "http":
+            return "http", {"url": self.http()}
+        if transport == "datagram":
+            address = self.datagram()
+            return "datagram", {"datagram_ip": address[0],
+                                "datagram_port": address[1]}
+        if transport == "unix":
+            path = os.path.join(directory, "opensips_mi")
+            return "datagram", {"datagram_unix_socket": self.datagram(path)}
+        return "fifo", self.fifo(directory)
+
+    def stop(self):
+        """ Stops all the servers """
+        for close in reversed(self.closers):
+            close()
+
+
+def send_events(address, events, transport="datagram"):
+    """ Sends event notifications (dicts or raw bytes) to a socket """
+    payloads = [e if isinstance(e, bytes) else json.dumps(e).encode()
+                for e in events]
+    if transport == "datagram":
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        for payload in payloads:
+            sock.sendto(payload, address)
+    else:
+        sock = socket.create_connection(address)
+        sock.sendall(b"".join(payloads))
+    sock.close()
+
+
+def notification(method, **params) -> dict:
+    """ Builds an event notification """
+    return {"jsonrpc": "2.0", "method": method, "params": params}
+
+
+def wait_for(condition, timeout=5.0):
+    """ Waits until condition() is true; returns its last value """
+    deadline = time.monotonic() + timeout
+    while True:
+        value = condition()
+        if value or time.monotonic() > deadline:
+            return value
+        time.sleep(0.01)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
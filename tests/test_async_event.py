@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the asyncio event subscriptions """
+
+import time
+import asyncio
+from opensips.event import OpenSIPSEventHandler
+from fake_opensips import send_events, notification, wait_for
+
+
+async def tick(ticks):
+    """ Records the time of each loop iteration """
+    while True:
+        await asyncio.sleep(0.01)
+        ticks.append(time.monotonic())
+
+
+def test_subscribe(opensips, mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+
+    async def main():
+        received = []
+        event = handler.async_subscribe('E_A', received.append)
+        await asyncio.sleep(0.1)
+        send_events((event.socket.ip, event.socket.port),
+                    [notification('E_A', seq=i) for i in range(3)])
+        for _ in range(100):
+            if len(received) == 3:
+                break
+            await asyncio.sleep(0.01)
+        await handler.unsubscribe('E_A')
+        return received
+    received = asyncio.run(main())
+    assert [e['params']['seq'] for e in received] == [0, 1, 2]
+    assert handler.events == {}
+    assert [params[2] for method, params in opensips.requests
+            if method == 'event_subscribe'] == [3600, 0]
+
+
+def test_unsubscribe_off_loop(opensips, mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+
+    def slow(params):
+        time.sleep(0.3)
+        return "OK"
+
+    async def main():
+        ticks = []
+        event = handler.async_subscribe('E_A', lambda event: None)
+        await asyncio.sleep(0.05)
+        opensips.handlers['event_subscribe'] = slow
+        ticker = asyncio.create_task(tick(ticks))
+        start = time.monotonic()
+        task = event.unsubscribe()
+        # the event is only dropped once OpenSIPS replied
+        assert 'E_A' in handler.events
+        await task
+        ticker.cancel()
+        return [t for t in ticks if t > start]
+    ticks = asyncio.run(main())
+    # the loop kept running while the MI command was executed
+    assert len(ticks) >= 10
+    assert wait_for(lambda: handler.events == {})
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
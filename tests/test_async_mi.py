@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the asyncio MI connector """
+
+import os
+import time
+import asyncio
+import threading
+import pytest
+from opensips.mi import AsyncOpenSIPSMI, OpenSIPSMIException
+from fake_opensips import MIError
+
+TRANSPORTS = ['http', 'datagram', 'unix', 'fifo']
+
+
+def run(coro):
+    """ Runs a coroutine in a new loop """
+    return asyncio.run(coro)
+
+
+@pytest.mark.parametrize('transport', TRANSPORTS)
+def test_execute(opensips, tmp_path, transport):
+    conn, kwargs = opensips.connector(transport, str(tmp_path))
+
+    async def main():
+        mi = AsyncOpenSIPSMI(conn, **kwargs)
+        try:
+            return await mi.execute('uptime', ['x'])
+        finally:
+            await mi.close()
+    assert run(main()) == {'method': 'uptime', 'params': ['x']}
+
+
+@pytest.mark.parametrize('transport', TRANSPORTS)
+def test_concurrent_commands(opensips, tmp_path, transport):
+    conn, kwargs = opensips.connector(transport, str(tmp_path))
+
+    async def main():
+        mi = AsyncOpenSIPSMI(conn, **kwargs)
+        try:
+            return await asyncio.gather(*[mi.execute('echo', [i])
+                                          for i in range(20)])
+        finally:
+            await mi.close()
+    results = run(main())
+    # every reply is matched to its own command
+    assert [r['params'] for r in results] == [[i] for i in range(20)]
+
+
+@pytest.mark.parametrize('transport', TRANSPORTS)
+def test_error(opensips, tmp_path, transport):
+    def fail(params):
+        raise MIError(-32601, 'Method not found')
+    opensips.handlers['fail'] = fail
+    conn, kwargs = opensips.connector(transport, str(tmp_path))
+
+    async def main():
+        mi = AsyncOpenSIPSMI(conn, **kwargs)
+        try:
+            with pytest.raises(OpenSIPSMIException, match='Method not found'):
+                await mi.execute('fail')
+        finally:
+            await mi.close()
+    run(main())
+
+
+@pytest.mark.parametrize('transport', TRANSPORTS)
+def test_batch(opensips, tmp_path, transport):
+    def fail(params):
+        raise MIError(-32601, 'Method not found')
+    opensips.handlers['fail'] = fail
+    conn, kwargs = opensips.connector(transport, str(tmp_path))
+
+    async def main():
+        mi = AsyncOpenSIPSMI(conn, **kwargs)
+        try:
+            return await mi.execute_batch([('a', [1]), ('fail',), ('b', [2])])
+        finally:
+            await mi.close()
+    first, failed, last = run(main())
+    assert first['params'] == [1]
+    assert isinstance(failed, OpenSIPSMIException)
+    assert last['params'] == [2]
+
+
+def test_datagram_timeout():
+    async def main():
+        mi = AsyncOpenSIPSMI('datagram', datagram_ip='127.0.0.1',
+                             datagram_port=9, datagram_timeout=0.1)
+        try:
+            with pytest.raises(OpenSIPSMIException):
+                await mi.execute('uptime')
+        finally:
+            await mi.close()
+    run(main())
+
+
+def test_fifo_without_reader(tmp_path):
+    fifo_file = str(tmp_path / "opensips_fifo")
+    os.mkfifo(fifo_file)
+    ticks = []
+
+    async def tick():
+        while True:
+            await asyncio.sleep(0.01)
+            ticks.append(time.monotonic())
+
+    async def main():
+        ticker = asyncio.create_task(tick())
+        mi = AsyncOpenSIPSMI('fifo', fifo_file=fifo_file,
+                             fifo_file_fallback=fifo_file,
+                             fifo_reply_dir=str(tmp_path), fifo_timeout=0.5)
+        try:
+            await asyncio.sleep(0.05)
+            start = time.monotonic()
+            with pytest.raises(OpenSIPSMIException):
+                await mi.execute('uptime')
+            assert time.monotonic() - start < 0.1
+            await asyncio.sleep(0.05)
+        finally:
+            await mi.close()
+            ticker.cancel()
+    # a blocked loop would never return, so run it aside
+    thread = threading.Thread(target=run, args=(main(),), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(ticks) >= 5
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the JSON-RPC batch support """
+
+import json
+import pytest
+from opensips.mi import OpenSIPSMI, OpenSIPSMIException
+from opensips.mi import jsonrpc_helper
+from opensips.mi.jsonrpc_helper import JSONRPCError
+from fake_opensips import MIError
+
+TRANSPORTS = ['http', 'datagram', 'unix', 'fifo']
+
+
+def fail(params):
+    """ Handler of a failing command """
+    raise MIError(404, f"not found: {params[0]}")
+
+
+@pytest.mark.parametrize('transport', TRANSPORTS)
+def test_execute_batch(opensips, tmp_path, transport):
+    opensips.handlers['fail'] = fail
+    conn, kwargs = opensips.connector(transport, str(tmp_path))
+    mi = OpenSIPSMI(conn, **kwargs)
+    try:
+        results = mi.execute_batch([('echo', [1]), ('fail', ['x']),
+                                    ('echo',)])
+    finally:
+        mi.close()
+    assert results[0] == {'method': 'echo', 'params': [1]}
+    assert isinstance(results[1], OpenSIPSMIException)
+    assert 'not found: x' in str(results[1])
+    assert results[2] == {'method': 'echo', 'params': {}}
+
+
+def test_datagram_batch_split(opensips, tmp_path):
+    conn, kwargs = opensips.connector('datagram', str(tmp_path))
+    mi = OpenSIPSMI(conn, datagram_batch_size=200, **kwargs)
+    try:
+        results = mi.execute_batch([('echo', [i]) for i in range(20)])
+    finally:
+        mi.close()
+    assert results == [{'method': 'echo', 'params': [i]} for i in range(20)]
+    assert opensips.methods() == ['echo'] * 20
+
+
+def test_batch_commands_split():
+    commands = [('echo', [i]) for i in range(10)]
+    batches = list(jsonrpc_helper.get_batch_commands(commands, 150))
+    assert len(batches) > 1
+    ids = []
+    for batch_ids, payload in batches:
+        assert len(payload) <= 150
+        decoded = json.loads(payload)
+        assert [c['id'] for c in decoded] == batch_ids
+        ids.extend(batch_ids)
+    assert len(set(ids)) == 10
+
+
+def test_batch_commands_oversized():
+    # a command larger than the limit is still sent, on its own
+    commands = [('echo', ['x' * 100]), ('echo', [1])]
+    batches = list(jsonrpc_helper.get_batch_commands(commands, 50))
+    assert len(batches) == 2
+
+
+def test_batch_results_by_id():
+    reply = [{'id': '2', 'result': 'b'},
+             {'id': '1', 'result': 'a'},
+             {'id': '3', 'error': {'code': 500, 'message': 'failed'}}]
+    results = jsonrpc_helper.get_batch_results(['1', '2', '3', '4'], reply)
+    assert results[:2] == ['a', 'b']
+    assert isinstance(results[2], JSONRPCError)
+    assert results[2].code == 500
+    assert isinstance(results[3], JSONRPCError)
+
+
+def test_batch_rejected():
+    reply = {'id': None, 'error': {'code': -32600, 'message': 'Invalid'}}
+    with pytest.raises(JSONRPCError):
+        jsonrpc_helper.get_batch_results(['1'], reply)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
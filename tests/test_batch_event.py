@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the batched delivery of events """
+
+import time
+import pytest
+from opensips.event import OpenSIPSEventHandler
+from fake_opensips import send_events, notification, wait_for
+
+
+def subscribe(mi, reactor, **kwargs):
+    """ Subscribes for E_A in batches; returns the event and the list of
+        batches received """
+    handler = OpenSIPSEventHandler(mi, 'datagram', reactor=reactor,
+                                   ip='127.0.0.1')
+    batches = []
+    event = handler.subscribe_batch('E_A', batches.append, **kwargs)
+    return event, batches
+
+
+def seqs(batches):
+    """ Returns the sequence numbers of the events received """
+    return [e['params']['seq'] for batch in batches for e in batch]
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_full_batches(mi, reactor):
+    event, batches = subscribe(mi, reactor, max_batch=10,
+                               max_latency_ms=5000)
+    try:
+        send_events((event.socket.ip, event.socket.port),
+                    [notification('E_A', seq=i) for i in range(30)])
+        assert wait_for(lambda: len(batches) == 3)
+        assert [len(batch) for batch in batches] == [10, 10, 10]
+        assert seqs(batches) == list(range(30))
+    finally:
+        event.unsubscribe()
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_latency_flush(mi, reactor):
+    event, batches = subscribe(mi, reactor, max_batch=100,
+                               max_latency_ms=100)
+    try:
+        start = time.monotonic()
+        send_events((event.socket.ip, event.socket.port),
+                    [notification('E_A', seq=i) for i in range(5)])
+        assert wait_for(lambda: batches)
+        assert 0.09 <= time.monotonic() - start < 0.15
+        assert wait_for(lambda: seqs(batches) == list(range(5)))
+    finally:
+        event.unsubscribe()
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_short_latency(mi, reactor):
+    event, batches = subscribe(mi, reactor, max_batch=100, max_latency_ms=5)
+    try:
+        # the first delivery may wait for the socket to be read
+        send_events((event.socket.ip, event.socket.port),
+                    [notification('E_A', seq=0)])
+        assert wait_for(lambda: batches)
+        start = time.monotonic()
+        send_events((event.socket.ip, event.socket.port),
+                    [notification('E_A', seq=i) for i in range(1, 4)])
+        assert wait_for(lambda: seqs(batches) == list(range(4)))
+        assert time.monotonic() - start < 0.05
+    finally:
+        event.unsubscribe()
+
+
+def test_read_many(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    sock = handler.__new_socket__()
+    sock.create()
+    try:
+        send_events((sock.ip, sock.port), [b'{}'] * 3)
+        time.sleep(0.05)
+        start = time.monotonic()
+        assert sock.read_many(10) == [b'{}'] * 3
+        assert sock.read_many(10) == []
+        assert time.monotonic() - start < 0.05
+        # the timeout of the blocking reads is kept
+        assert sock.sock.gettimeout() == 0.1
+    finally:
+        sock.destroy()
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_flush_on_unsubscribe(mi, reactor):
+    event, batches = subscribe(mi, reactor, max_batch=100,
+                               max_latency_ms=10000)
+    send_events((event.socket.ip, event.socket.port),
+                [notification('E_A', seq=i) for i in range(3)])
+    time.sleep(0.2)
+    assert batches == []
+    event.unsubscribe()
+    assert seqs(batches) == [0, 1, 2]
+
+
+def test_invalid_batch(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    with pytest.raises(ValueError):
+        handler.subscribe_batch('E_A', print, max_batch=0)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the MI load generator """
+
+import sys
+import math
+import subprocess
+from urllib.parse import urlparse
+import pytest
+from opensips.mi import MIPool, MIBench
+from fake_opensips import MIError
+
+
+@pytest.fixture
+def pool(opensips):
+    """ A pool of connectors to the fake OpenSIPS """
+    with MIPool('http', size=4, url=opensips.http()) as mi_pool:
+        yield mi_pool
+
+
+def test_closed_loop(pool):
+    report = MIBench(pool, 'uptime').run(0.2, concurrency=2)
+    assert report["command"] == "uptime"
+    assert report["target_rate"] is None
+    assert report["completed"] == report["sent"] > 0
+    assert report["errors"] == {}
+    assert report["throughput"] > 0
+    latency = report["latency_ms"]
+    assert 0 < latency["min"] <= latency["p50"] <= latency["p99"] <= \
+        latency["max"]
+
+
+def test_open_loop(pool):
+    report = MIBench(pool, 'uptime').run(0.5, rate=100)
+    assert report["target_rate"] == 100
+    assert report["sent"] == 50
+    assert report["completed"] == 50
+    assert report["duration"] >= 0.49
+
+
+@pytest.mark.parametrize('rate', [None, 100])
+def test_errors(opensips, pool, rate):
+    def fail(params):
+        raise MIError(500, "failed")
+    opensips.handlers['fail'] = fail
+    report = MIBench(pool, 'fail').run(0.2, concurrency=2, rate=rate)
+    assert report["completed"] == 0
+    assert report["errors"] == {"JSONRPCError": report["sent"]}
+    assert math.isnan(report["latency_ms"]["p50"])
+
+
+def test_command_line(opensips):
+    url = urlparse(opensips.http())
+    proc = subprocess.run(
+        [sys.executable, "-m", "opensips.mi", "-t", "http", "-i",
+         url.hostname, "-p", str(url.port), "--duration", "0.2",
+         "--concurrency", "2", "bench", "uptime"],
+        capture_output=True, text=True, check=False)
+    assert proc.returncode == 0, proc.stderr
+    assert "command:      uptime" in proc.stdout
+    assert "p99" in proc.stdout
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
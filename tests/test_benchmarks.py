@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the benchmark suite helpers and runner """
+
+import os
+import sys
+import json
+import subprocess
+import pytest
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+# pylint: disable=wrong-import-position
+from common import BENCHMARKS, benchmark, measure  # noqa: E402
+from run import compare  # noqa: E402
+import bench_codec  # noqa: E402
+from opensips import codec  # noqa: E402
+
+
+def run(*args):
+    """ Runs the benchmarks runner """
+    return subprocess.run([sys.executable, os.path.join(BENCHMARKS_DIR,
+                                                        "run.py")] +
+                          list(args), capture_output=True, text=True,
+                          check=False)
+
+
+def test_registry():
+    @benchmark("test/noop")
+    def noop(duration):
+        return measure(lambda: None, duration)
+    try:
+        assert BENCHMARKS["test/noop"] is noop
+    finally:
+        del BENCHMARKS["test/noop"]
+
+
+def test_measure():
+    calls = []
+    result = measure(lambda: calls.append(1), 0.05, warmup=3)
+    assert result["calls"] == len(calls) - 3
+    assert result["calls_per_sec"] > 0
+    assert 0 < result["p50_us"] <= result["p99_us"]
+
+
+@pytest.mark.parametrize('value,regressed', [
+    ({"calls_per_sec": 900, "p99_us": 10}, False),
+    ({"calls_per_sec": 700, "p99_us": 10}, True),
+    ({"calls_per_sec": 1000, "p99_us": 13}, True),
+    ({"calls_per_sec": 2000, "p99_us": 5, "calls": 1}, False),
+])
+def test_compare(value, regressed):
+    baseline = {"bench": {"calls_per_sec": 1000, "p99_us": 10,
+                          "calls": 1000}}
+    assert bool(compare({"bench": value}, baseline, 20)) == regressed
+    assert compare({"other": value}, baseline, 20) == []
+
+
+def test_codec():
+    names = [name for name in BENCHMARKS if name.startswith("codec/")]
+    assert "codec/dlg_list-2MB/json" in names
+    assert "codec/dlg_list-2MB/json-ordered" in names
+    assert len(names) == len(codec.BACKENDS) + 1
+    previous = (codec.BACKEND, codec.ORDERED)
+    result = bench_codec.decode("json", True, 0.01)
+    assert result["calls"] > 0 and result["mb_per_sec"] > 0
+    assert (codec.BACKEND, codec.ORDERED) == previous
+
+
+def test_runner(tmp_path):
+    listed = run("-l", "-k", "parse/event")
+    assert listed.stdout.split() == ["parse/event-small", "parse/event-large"]
+
+    saved = tmp_path / "baseline.json"
+    args = ["-k", "mi/http/uptime", "-k", "parse/event-small", "-d", "0.05"]
+    result = run(*args, "--save", str(saved))
+    assert result.returncode == 0, result.stderr
+    stored = json.loads(saved.read_text())
+    assert sorted(stored["results"]) == ["mi/http/uptime",
+                                         "parse/event-small"]
+    assert "python" in stored["machine"]
+
+    result = run(*args, "--compare", str(saved), "--threshold", "1000")
+    assert result.returncode == 0, result.stdout
+    assert "No regressions" in result.stdout
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
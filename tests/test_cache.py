@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the MI result cache """
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from opensips.mi import OpenSIPSMI, MICache
+
+
+class Fetcher():
+    """ Counts the commands that reach OpenSIPS """
+
+    def __init__(self, delay=0):
+        self.calls = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, cmd, params):
+        with self.lock:
+            self.calls.append((cmd, params))
+        time.sleep(self.delay)
+        return {"cmd": cmd, "calls": len(self.calls)}
+
+
+def test_cached():
+    cache = MICache()
+    fetch = Fetcher()
+    first = cache.execute("ds_list", None, fetch)
+    assert cache.execute("ds_list", None, fetch) == first
+    assert len(fetch.calls) == 1
+    # each set of parameters is cached apart
+    cache.execute("ds_list", {"full": 1}, fetch)
+    assert len(fetch.calls) == 2
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 2,
+                             "coalesced": 0}
+
+
+def test_copies():
+    cache = MICache()
+    result = cache.execute("version", None, Fetcher())
+    result["cmd"] = "changed"
+    assert cache.execute("version", None, Fetcher())["cmd"] == "version"
+
+
+def test_not_cached():
+    cache = MICache()
+    fetch = Fetcher()
+    cache.execute("dlg_list", None, fetch)
+    cache.execute("dlg_list", None, fetch)
+    assert len(fetch.calls) == 2
+
+
+def test_ttl():
+    cache = MICache(ttls={"ds_list": 0.1})
+    fetch = Fetcher()
+    cache.execute("ds_list", None, fetch)
+    time.sleep(0.15)
+    cache.execute("ds_list", None, fetch)
+    assert len(fetch.calls) == 2
+
+
+def test_default_ttl():
+    cache = MICache(default_ttl=10)
+    fetch = Fetcher()
+    cache.execute("dlg_list", None, fetch)
+    cache.execute("dlg_list", None, fetch)
+    assert len(fetch.calls) == 1
+
+
+@pytest.mark.parametrize('cmd', ['dr_gw_status', 'dr_carrier_status'])
+@pytest.mark.parametrize('read,write', [
+    (None, {"gw_id": "gw1", "status": 0}),
+    ({"gw_id": "gw1"}, {"gw_id": "gw1", "status": 0}),
+    (["gw1"], ["gw1", 0]),
+    (None, ["gw1", 0]),
+    (["gw1"], ("gw1", 1)),
+])
+def test_status_change(cmd, read, write):
+    cache = MICache()
+    fetch = Fetcher()
+    cache.execute(cmd, read, fetch)
+    cache.execute(cmd, read, fetch)
+    assert len(fetch.calls) == 1
+    # setting a status is always sent, and drops the cached reads
+    cache.execute(cmd, write, fetch)
+    cache.execute(cmd, write, fetch)
+    assert len(fetch.calls) == 3
+    cache.execute(cmd, read, fetch)
+    assert len(fetch.calls) == 4
+    assert cache.ttl(cmd, write) is None
+
+
+def test_module_invalidation():
+    cache = MICache()
+    fetch = Fetcher()
+    cache.execute("ds_list", None, fetch)
+    cache.execute("dr_gw_status", None, fetch)
+    cache.execute("ds_reload", None, fetch)
+    cache.execute("ds_list", None, fetch)
+    cache.execute("dr_gw_status", None, fetch)
+    assert [cmd for cmd, _ in fetch.calls] == \
+        ["ds_list", "dr_gw_status", "ds_reload", "ds_list"]
+
+
+def test_invalidate():
+    cache = MICache()
+    fetch = Fetcher()
+    cache.execute("ds_list", None, fetch)
+    cache.execute("version", None, fetch)
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_max_size():
+    cache = MICache(max_size=2, default_ttl=10)
+    fetch = Fetcher()
+    for cmd in ("a", "b", "a", "c", "a", "b"):
+        cache.execute(cmd, None, fetch)
+    # b was the least recently used one when c was added
+    assert [cmd for cmd, _ in fetch.calls] == ["a", "b", "c", "b"]
+
+
+def test_coalesced():
+    cache = MICache()
+    fetch = Fetcher(delay=0.2)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: cache.execute("ds_list", None,
+                                                        fetch), range(8)))
+    assert len(fetch.calls) == 1
+    assert all(result == results[0] for result in results)
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_invalidated_while_fetching():
+    cache = MICache()
+    fetch = Fetcher(delay=0.2)
+    thread = threading.Thread(target=cache.execute,
+                              args=("ds_list", None, fetch))
+    thread.start()
+    time.sleep(0.05)
+    cache.invalidate("ds_")
+    thread.join()
+    cache.execute("ds_list", None, fetch)
+    assert len(fetch.calls) == 2
+
+
+def test_connector(opensips):
+    mi = OpenSIPSMI('http', url=opensips.http(), cache=True)
+    try:
+        mi.execute('dr_gw_status', ['gw1'])
+        mi.execute('dr_gw_status', ['gw1'])
+        mi.execute('dr_gw_status', ['gw1', 0])
+        mi.execute('dr_gw_status', ['gw1', 0])
+        mi.execute('dr_gw_status', ['gw1'])
+        mi.execute_batch([('dr_reload',)])
+        mi.execute('dr_gw_status', ['gw1'])
+    finally:
+        mi.close()
+    assert [params for _, params in opensips.requests] == \
+        [['gw1'], ['gw1', 0], ['gw1', 0], ['gw1'], {}, ['gw1']]
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
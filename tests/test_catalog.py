@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the on-disk catalog used by the completion """
+
+import os
+import pytest
+from opensips import catalog
+
+DEFAULTS = {
+    'type': 'fifo',
+    'ip': '127.0.0.1',
+    'port': 8080,
+    'fifo_file': '/var/run/opensips/opensips_fifo',
+}
+
+
+@pytest.fixture(autouse=True)
+def catalog_dir(tmp_path, monkeypatch):
+    """ Stores the catalogs in a temporary directory """
+    monkeypatch.setenv("OPENSIPS_CATALOG_DIR", str(tmp_path / "catalogs"))
+    for env in catalog.NODE_ENV.values():
+        monkeypatch.delenv(env, raising=False)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "catalogs"
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    """ Records the background refreshes, instead of running them """
+    calls = []
+    monkeypatch.setattr(catalog, "refresh",
+                        lambda module, argv: calls.append((module, argv)))
+    return calls
+
+
+def test_node_key():
+    assert catalog.node_key([], DEFAULTS) == \
+        "fifo-_var_run_opensips_opensips_fifo"
+    assert catalog.node_key(["-t", "http", "--port=8888"], DEFAULTS) == \
+        "http-127.0.0.1_8888"
+    assert catalog.node_key(["-t", "datagram", "-ds", "/tmp/mi.sock"],
+                            DEFAULTS) == "datagram-_tmp_mi.sock"
+
+
+def test_node_key_env(monkeypatch):
+    monkeypatch.setenv("OPENSIPS_MI_TYPE", "http")
+    monkeypatch.setenv("OPENSIPS_MI_IP", "10.0.0.1")
+    assert catalog.node_key([], DEFAULTS) == "http-10.0.0.1_8080"
+
+
+def test_read_write():
+    assert catalog.read("node", "commands") == (None, None)
+    catalog.write("node", "commands", ["uptime", "which"], "OpenSIPS 3.5")
+    names, age = catalog.read("node", "commands")
+    assert names == ["uptime", "which"]
+    assert 0 <= age < 5
+
+
+def test_new_version():
+    catalog.write("node", "commands", ["uptime"], "OpenSIPS 3.4")
+    catalog.write("node", "events", ["E_A"], "OpenSIPS 3.4")
+    catalog.write("node", "commands", ["uptime", "new"], "OpenSIPS 3.5")
+    assert catalog.read("node", "commands")[0] == ["uptime", "new"]
+    # fetched from the previous version, so it is no longer used
+    assert catalog.read("node", "events") == (None, None)
+    catalog.write("node", "events", ["E_A", "E_B"], "OpenSIPS 3.5")
+    assert catalog.read("node", "events")[0] == ["E_A", "E_B"]
+
+
+def test_complete(capsys, refreshed):
+    argv = ["-bc", "commands"]
+    assert not catalog.complete("opensips.mi", "commands", DEFAULTS, argv)
+    key = catalog.node_key(argv, DEFAULTS)
+    catalog.write(key, "commands", ["uptime", "which"], "OpenSIPS 3.5")
+    assert catalog.complete("opensips.mi", "commands", DEFAULTS, argv)
+    assert capsys.readouterr().out == "uptime which\n"
+    assert refreshed == []
+    # only the completion of the catalog is served
+    assert not catalog.complete("opensips.mi", "commands", DEFAULTS,
+                                ["-bc", "params"])
+    assert not catalog.complete("opensips.mi", "commands", DEFAULTS,
+                                ["uptime"])
+
+
+def test_complete_refresh(capsys, refreshed, monkeypatch):
+    argv = ["-bc", "commands"]
+    catalog.write(catalog.node_key(argv, DEFAULTS), "commands", ["uptime"])
+    monkeypatch.setenv("OPENSIPS_CATALOG_TTL", "0")
+    assert catalog.complete("opensips.mi", "commands", DEFAULTS, argv)
+    assert capsys.readouterr().out == "uptime\n"
+    assert refreshed == [("opensips.mi", argv)]
+
+
+def test_complete_env_file(tmp_path, capsys, refreshed, monkeypatch):
+    # restored after the test, once overwritten by the env file
+    monkeypatch.setenv("OPENSIPS_MI_TYPE", "fifo")
+    env_file = tmp_path / "node.env"
+    env_file.write_text("# node\nOPENSIPS_MI_TYPE=http\n")
+    argv = ["--env-file", str(env_file), "-bc", "commands"]
+    catalog.write("http-127.0.0.1_8080", "commands", ["uptime"])
+    assert catalog.complete("opensips.mi", "commands", DEFAULTS, argv)
+    assert capsys.readouterr().out == "uptime\n"
+    assert os.environ["OPENSIPS_MI_TYPE"] == "http"
+
+
+def test_complete_during_refresh(monkeypatch):
+    monkeypatch.setenv("OPENSIPS_CATALOG_REFRESH", "1")
+    argv = ["-bc", "commands"]
+    catalog.write(catalog.node_key(argv, DEFAULTS), "commands", ["uptime"])
+    assert not catalog.complete("opensips.mi", "commands", DEFAULTS, argv)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
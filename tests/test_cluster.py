@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the MI cluster client """
+
+import time
+import threading
+import pytest
+from opensips.mi import OpenSIPSMI, OpenSIPSMICluster, OpenSIPSMIException
+from fake_opensips import FakeOpenSIPS, wait_for
+
+
+@pytest.fixture
+def slow_opensips():
+    """ A fake OpenSIPS whose "stats" command blocks until released """
+    fake = FakeOpenSIPS()
+    fake.release = threading.Event()
+
+    def stats(params):
+        fake.release.wait(10)
+        return {"calls": 5}
+    fake.handlers['stats'] = stats
+    yield fake
+    fake.release.set()
+    fake.stop()
+
+
+def test_execute(opensips):
+    opensips.handlers['stats'] = lambda params: {"calls": 2, "name": "x"}
+    cluster = OpenSIPSMICluster({
+        'a': {'conn': 'http', 'url': opensips.http()},
+        'b': OpenSIPSMI('http', url=opensips.http()),
+    })
+    try:
+        assert cluster.execute('stats') == {'a': {"calls": 2, "name": "x"},
+                                            'b': {"calls": 2, "name": "x"}}
+        assert cluster.execute('stats', merge='sum') == \
+            {"calls": 4, "name": "x"}
+        assert cluster.execute('stats', merge=len) == 2
+    finally:
+        cluster.close()
+
+
+def test_node_names(opensips):
+    url = opensips.http()
+    cluster = OpenSIPSMICluster([{'conn': 'http', 'url': url, 'name': 'x'},
+                                 {'conn': 'http', 'url': url}])
+    try:
+        assert list(cluster.execute('echo')) == ['x', 'node1']
+    finally:
+        cluster.close()
+    with pytest.raises(ValueError):
+        OpenSIPSMICluster([{'conn': 'http', 'url': url, 'name': 'x'},
+                           {'conn': 'http', 'url': url, 'name': 'x'}])
+    with pytest.raises(ValueError):
+        OpenSIPSMICluster([])
+
+
+def test_failed_node(opensips, tmp_path):
+    cluster = OpenSIPSMICluster({
+        'up': {'conn': 'http', 'url': opensips.http()},
+        'down': {'conn': 'datagram', 'datagram_unix_socket':
+                 str(tmp_path / "missing")},
+    })
+    try:
+        results = cluster.execute('echo')
+    finally:
+        cluster.close()
+    assert results['up'] == {'method': 'echo', 'params': {}}
+    assert isinstance(results['down'], OpenSIPSMIException)
+
+
+def test_hung_node(opensips, slow_opensips):
+    opensips.handlers['stats'] = lambda params: {"calls": 1}
+    cluster = OpenSIPSMICluster({
+        'fast': {'conn': 'http', 'url': opensips.http()},
+        'hung': {'conn': 'http', 'url': slow_opensips.http()},
+    }, timeout=0.2)
+    try:
+        results = cluster.execute('stats')
+        assert results['fast'] == {"calls": 1}
+        assert isinstance(results['hung'], OpenSIPSMIException)
+
+        # the hung node is skipped, instead of delaying the others
+        start = time.monotonic()
+        results = cluster.execute('stats', timeout=5)
+        assert time.monotonic() - start < 1
+        assert results['fast'] == {"calls": 1}
+        assert isinstance(results['hung'], OpenSIPSMIException)
+        assert list(results) == ['fast', 'hung']
+
+        slow_opensips.release.set()
+        assert wait_for(lambda: not cluster.busy)
+        assert cluster.execute('stats', timeout=5) == \
+            {'fast': {"calls": 1}, 'hung': {"calls": 5}}
+    finally:
+        slow_opensips.release.set()
+        cluster.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
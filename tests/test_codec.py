@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the JSON codec """
+
+import os
+import math
+import sys
+import subprocess
+from collections import OrderedDict
+import pytest
+from opensips import codec
+
+
+@pytest.fixture
+def restore():
+    """ Restores the codec settings changed by a test """
+    backend = codec.BACKEND
+    ordered = codec.ORDERED
+    yield
+    codec.set_backend(backend)
+    codec.set_ordered(ordered)
+
+
+@pytest.mark.parametrize('backend', sorted(codec.BACKENDS))
+def test_loads(restore, backend):
+    codec.set_backend(backend)
+    assert codec.BACKEND == backend
+    assert codec.loads(b'{"b": 1, "a": [true, null]}') == \
+        {"b": 1, "a": [True, None]}
+    assert codec.loads('{"x": "y"}') == {"x": "y"}
+    # accepted by json, even if the faster decoders refuse it
+    assert math.isnan(codec.loads('{"value": NaN}')["value"])
+    with pytest.raises(ValueError):
+        codec.loads(b'{"a": ')
+
+
+def test_unknown_backend(restore):
+    with pytest.raises(ValueError):
+        codec.set_backend("simplejson2")
+
+
+def test_ordered(restore):
+    codec.set_ordered()
+    value = codec.loads('{"b": {"c": 1}, "a": 2}')
+    assert isinstance(value, OrderedDict)
+    assert isinstance(value["b"], OrderedDict)
+    assert list(value) == ["b", "a"]
+    assert isinstance(codec.raw_decode('{"a": 1} x')[0], OrderedDict)
+
+
+def test_raw_decode():
+    assert codec.raw_decode('xx{"a": 1} [2]', 2) == ({"a": 1}, 10)
+
+
+def import_codec(backend):
+    """ Imports the codec in a new interpreter, with the backend set in
+        the environment; returns the process """
+    env = dict(os.environ, OPENSIPS_JSON_BACKEND=backend)
+    return subprocess.run(
+        [sys.executable, "-c",
+         "from opensips import codec; print(codec.BACKEND)"],
+        env=env, capture_output=True, text=True, check=False,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_env_backend():
+    proc = import_codec("json")
+    assert proc.returncode == 0
+    assert proc.stdout.strip() == "json"
+
+
+def test_env_unknown_backend():
+    proc = import_codec("nosuchjson")
+    assert proc.returncode == 0
+    assert proc.stdout.strip() in codec.BACKENDS
+    assert "nosuchjson" in proc.stderr
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
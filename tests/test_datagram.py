@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the datagram MI connector """
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from opensips.mi import OpenSIPSMI
+
+TRANSPORTS = ['datagram', 'unix']
+
+
+def connect(opensips, tmp_path, transport, **extra):
+    """ Returns an MI connector talking to the fake OpenSIPS """
+    conn, kwargs = opensips.connector(transport, str(tmp_path))
+    kwargs.update(extra)
+    return OpenSIPSMI(conn, **kwargs)
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+@pytest.mark.parametrize('transport', TRANSPORTS)
+def test_execute(opensips, tmp_path, transport, persistent):
+    mi = connect(opensips, tmp_path, transport,
+                 datagram_persistent=persistent)
+    try:
+        assert mi.execute('uptime', ['x']) == \
+            {'method': 'uptime', 'params': ['x']}
+        assert mi.execute('uptime')['method'] == 'uptime'
+    finally:
+        mi.close()
+
+
+@pytest.mark.parametrize('transport', TRANSPORTS)
+def test_out_of_order_replies(opensips, tmp_path, transport):
+    def slow(params):
+        time.sleep(params[0])
+        return params
+    opensips.handlers['slow'] = slow
+    mi = connect(opensips, tmp_path, transport, datagram_persistent=True,
+                 datagram_timeout=1)
+    try:
+        delays = [0.2, 0.1, 0.0, 0.15, 0.05]
+        with ThreadPoolExecutor(len(delays)) as pool:
+            results = list(pool.map(lambda d: mi.execute('slow', [d]),
+                                    delays))
+        assert results == [[d] for d in delays]
+    finally:
+        mi.close()
+
+
+def test_unix_reply_socket_removed(opensips, tmp_path):
+    mi = connect(opensips, tmp_path, 'unix', datagram_persistent=True)
+    mi.execute('uptime')
+    path = mi.conn.recv_sock
+    assert os.path.exists(path)
+    mi.close()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_fork(opensips, tmp_path, persistent):
+    mi = connect(opensips, tmp_path, 'unix', datagram_persistent=persistent)
+    try:
+        assert mi.execute('echo', ['parent']) == \
+            {'method': 'echo', 'params': ['parent']}
+        parent_sock = mi.conn.reply_path()
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                for i in range(5):
+                    reply = mi.execute('echo', ['child', i])
+                    assert reply['params'] == ['child', i]
+                assert mi.conn.reply_path() != parent_sock
+                mi.close()
+                status = 0
+            finally:
+                os.write(wfd, b"go")
+                os._exit(status)  # pylint: disable=protected-access
+        os.close(wfd)
+        assert os.read(rfd, 2) == b"go"
+        os.close(rfd)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        if persistent:
+            assert os.path.exists(parent_sock)
+        assert mi.execute('echo', ['parent', 2]) == \
+            {'method': 'echo', 'params': ['parent', 2]}
+    finally:
+        mi.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
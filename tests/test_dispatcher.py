@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the event dispatcher """
+
+import os
+import threading
+import pytest
+from opensips.event import OpenSIPSEventHandler, EventDispatcher
+from fake_opensips import send_events, notification, wait_for
+
+
+def touch(event):
+    """ Creates the file named in an event, from a worker process """
+    if event is not None:
+        with open(event['params']['path'], 'w', encoding='utf-8') as f:
+            f.write(str(os.getpid()))
+
+
+def blocked_dispatcher(overflow, queue_size=2):
+    """ Returns a dispatcher whose single worker is blocked until the
+        returned event is set, and the list of events processed """
+    dispatcher = EventDispatcher(queue_size=queue_size, overflow=overflow)
+    release = threading.Event()
+    processed = []
+
+    def callback(event):
+        release.wait(5)
+        processed.append(event)
+    wrapped = dispatcher.wrap(callback)
+    wrapped(0)
+    # wait for the worker to pick up the first event
+    assert wait_for(lambda: dispatcher.stats()["pending"] == 0)
+    return dispatcher, wrapped, release, processed
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        EventDispatcher(overflow="drop")
+    with pytest.raises(ValueError):
+        EventDispatcher(executor="fiber")
+    with pytest.raises(ValueError):
+        EventDispatcher(workers=0)
+
+
+def test_dispatch():
+    dispatcher = EventDispatcher(workers=4)
+    processed = []
+    lock = threading.Lock()
+
+    def callback(event):
+        if event == 3:
+            raise RuntimeError("callback failed")
+        with lock:
+            processed.append(event)
+    wrapped = dispatcher.wrap(callback)
+    for i in range(10):
+        wrapped(i)
+    dispatcher.close()
+    assert sorted(processed) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert dispatcher.stats() == {"queued": 10, "dropped": 0,
+                                  "processed": 10, "failed": 1,
+                                  "pending": 0}
+
+
+def test_drop_newest():
+    dispatcher, wrapped, release, processed = \
+        blocked_dispatcher("drop-newest")
+    for i in range(1, 5):
+        wrapped(i)
+    release.set()
+    dispatcher.close()
+    assert processed == [0, 1, 2]
+    assert dispatcher.stats()["dropped"] == 2
+
+
+def test_drop_oldest():
+    dispatcher, wrapped, release, processed = \
+        blocked_dispatcher("drop-oldest")
+    for i in range(1, 5):
+        wrapped(i)
+    release.set()
+    dispatcher.close()
+    assert processed == [0, 3, 4]
+    assert dispatcher.stats()["dropped"] == 2
+
+
+def test_end_marker_kept():
+    dispatcher, wrapped, release, processed = \
+        blocked_dispatcher("drop-oldest")
+    wrapped(1)
+    wrapped(None)
+    wrapped(2)
+    wrapped(3)
+    release.set()
+    dispatcher.close()
+    assert processed == [0, None, 3]
+
+
+def test_block():
+    dispatcher, wrapped, release, processed = \
+        blocked_dispatcher("block", queue_size=1)
+    wrapped(1)
+    done = threading.Event()
+
+    def producer():
+        wrapped(2)
+        done.set()
+    threading.Thread(target=producer, daemon=True).start()
+    assert not done.wait(0.1)
+    release.set()
+    assert done.wait(5)
+    dispatcher.close()
+    assert processed == [0, 1, 2]
+
+
+def test_block_refused_for_shared_readers(mi):
+    dispatcher = EventDispatcher(overflow="block")
+    handler = OpenSIPSEventHandler(mi, 'datagram', reactor=True,
+                                   ip='127.0.0.1')
+    with pytest.raises(ValueError):
+        handler.subscribe('E_A', print, dispatcher=dispatcher)
+    with pytest.raises(ValueError):
+        handler.async_subscribe('E_A', print, dispatcher=dispatcher)
+    shared = OpenSIPSEventHandler(mi, 'datagram', reactor=True, shared=True,
+                                  ip='127.0.0.1')
+    with pytest.raises(ValueError):
+        shared.subscribe('E_A', print, dispatcher=dispatcher)
+    dispatcher.close()
+
+
+def test_subscription(mi):
+    dispatcher = EventDispatcher(workers=2, overflow="drop-newest")
+    handler = OpenSIPSEventHandler(mi, 'datagram', reactor=True,
+                                   ip='127.0.0.1')
+    received = []
+    event = handler.subscribe('E_A', received.append, dispatcher=dispatcher)
+    try:
+        send_events((event.socket.ip, event.socket.port),
+                    [notification('E_A', seq=i) for i in range(10)])
+        assert wait_for(lambda: len(received) == 10)
+    finally:
+        handler.unsubscribe('E_A')
+        dispatcher.close()
+
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_process_with_metrics(mi, tmp_path, shared):
+    dispatcher = EventDispatcher(workers=2, overflow="drop-newest",
+                                 executor="process")
+    handler = OpenSIPSEventHandler(mi, 'datagram', reactor=True,
+                                   metrics=True, shared=shared,
+                                   ip='127.0.0.1')
+    event = handler.subscribe('E_A', touch, dispatcher=dispatcher)
+    paths = [str(tmp_path / str(i)) for i in range(5)]
+    try:
+        send_events((event.socket.ip, event.socket.port),
+                    [notification('E_A', path=path) for path in paths])
+        assert wait_for(lambda: dispatcher.stats()['processed'] == 5)
+        assert dispatcher.stats()['failed'] == 0
+        assert all(os.path.exists(path) for path in paths)
+        with open(paths[0], encoding='utf-8') as f:
+            assert int(f.read()) != os.getpid()
+        metrics = handler.metrics()['total']
+        assert metrics['events'] == 5
+        assert metrics['callback_us']['count'] == 5
+    finally:
+        handler.unsubscribe('E_A')
+        dispatcher.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
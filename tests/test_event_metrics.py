@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the event notification metrics """
+
+import time
+import socket
+import pytest
+from opensips.event import OpenSIPSEventHandler
+from opensips.event.metrics import EventMetrics, queue_depth
+from fake_opensips import send_events, notification, wait_for
+
+
+def datagram_pair(family, tmp_path):
+    """ Returns a bound datagram socket, its address and a sender """
+    recv = socket.socket(family, socket.SOCK_DGRAM)
+    if family == socket.AF_UNIX:
+        recv.bind(str(tmp_path / "events"))
+    else:
+        recv.bind(("127.0.0.1", 0))
+    return recv, recv.getsockname(), socket.socket(family, socket.SOCK_DGRAM)
+
+
+@pytest.mark.parametrize('family', [socket.AF_INET, socket.AF_UNIX])
+def test_queue_depth_datagram(tmp_path, family):
+    recv, address, send = datagram_pair(family, tmp_path)
+    try:
+        assert queue_depth([recv]) == 0
+        for _ in range(3):
+            send.sendto(b"x" * 100, address)
+        # UNIX sockets only report the next datagram
+        assert wait_for(lambda: queue_depth([recv]) >= 100)
+        for _ in range(3):
+            recv.recv(100)
+        assert queue_depth([recv]) == 0
+    finally:
+        recv.close()
+        send.close()
+
+
+def test_queue_depth_inet_total(tmp_path):
+    recv, address, send = datagram_pair(socket.AF_INET, tmp_path)
+    try:
+        for _ in range(3):
+            send.sendto(b"x" * 100, address)
+        # includes the kernel's overhead for each datagram
+        assert wait_for(lambda: queue_depth([recv]) >= 300)
+    finally:
+        recv.close()
+        send.close()
+
+
+def test_queue_depth_unix_stream():
+    recv, send = socket.socketpair()
+    try:
+        send.sendall(b"x" * 300)
+        assert wait_for(lambda: queue_depth([recv]) == 300)
+    finally:
+        recv.close()
+        send.close()
+
+
+def test_queue_depth_unknown():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.close()
+    assert queue_depth([]) is None
+    assert queue_depth([sock]) is None
+
+
+def test_counters():
+    metrics = EventMetrics(lag_field="ts")
+    events = [{"params": {"ts": time.time() - 0.5}}, {"params": {}}]
+    metrics.parsed(100, events, 2000, 1)
+    metrics.parsed(10, [], 1000, 0)
+    metrics.buffer_reset()
+    metrics.wrap(lambda event: None)(events[0])
+    snapshot = metrics.snapshot()
+    assert snapshot["reads"] == 2
+    assert snapshot["bytes"] == 110
+    assert snapshot["events"] == 2
+    assert snapshot["parse_failures"] == 1
+    assert snapshot["resets"] == 1
+    assert snapshot["parse_us"]["count"] == 2
+    assert snapshot["callback_us"]["count"] == 1
+    assert snapshot["lag_ms"]["count"] == 1
+    assert 400 <= snapshot["lag_ms"]["max"] < 5000
+    assert snapshot["queue_bytes"] is None
+    metrics.reset()
+    assert metrics.snapshot()["events"] == 0
+
+
+def test_handler_metrics(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', metrics=True,
+                                   lag_field='ts', ip='127.0.0.1')
+    received = []
+    events = [handler.subscribe(name, received.append)
+              for name in ('E_A', 'E_B')]
+    try:
+        for event in events:
+            send_events((event.socket.ip, event.socket.port),
+                        [notification('E', ts=time.time()) for _ in range(5)])
+        assert wait_for(lambda: len(received) == 10)
+        metrics = handler.metrics()
+        assert set(metrics["events"]) == {'E_A', 'E_B'}
+        for name in ('E_A', 'E_B'):
+            assert metrics["events"][name]["events"] == 5
+            assert metrics["events"][name]["queue_bytes"] == 0
+        total = metrics["total"]
+        assert total["events"] == 10
+        assert total["lag_ms"]["count"] == 10
+        assert total["callback_us"]["count"] == 10
+        assert total["queue_bytes"] == 0
+    finally:
+        for event in events:
+            event.unsubscribe()
+
+
+def test_handler_metrics_unix(mi, tmp_path):
+    path = str(tmp_path / "events")
+    handler = OpenSIPSEventHandler(mi, 'datagram', metrics=True,
+                                   unix_path=path)
+    received = []
+    event = handler.subscribe('E_A', received.append)
+    try:
+        send_events(path, [notification('E_A') for _ in range(5)])
+        assert wait_for(lambda: len(received) == 5)
+        metrics = handler.metrics()["events"]["E_A"]
+        assert metrics["events"] == 5
+        assert metrics["queue_bytes"] == 0
+    finally:
+        event.unsubscribe()
+
+
+def test_handler_metrics_disabled(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    event = handler.subscribe('E_A', lambda event: None)
+    try:
+        assert event.metrics is None
+        assert handler.metrics() == {}
+    finally:
+        event.unsubscribe()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the asynchronous iterator over events """
+
+import time
+import asyncio
+import pytest
+from opensips.event import OpenSIPSEventHandler
+from opensips.mi import OpenSIPSMIException
+from fake_opensips import MIError, send_events, notification
+
+
+def address(stream):
+    """ Returns the address events are received on """
+    return (stream.socket.ip, stream.socket.port)
+
+
+def test_iterate(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    # created outside of the loop it is used in
+    stream = handler.events_stream('E_A')
+
+    async def main():
+        received = []
+        async with stream:
+            send_events(address(stream),
+                        [notification('E_A', seq=i) for i in range(5)])
+            async for event in stream:
+                received.append(event['params']['seq'])
+                if len(received) == 5:
+                    break
+        return received
+    assert asyncio.run(main()) == list(range(5))
+    assert 'E_A' not in handler.events
+
+
+def test_loop_not_blocked(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    stream = handler.events_stream('E_A')
+
+    async def tick(gaps):
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+
+    async def main():
+        gaps = []
+        received = []
+        async with stream:
+            ticker = asyncio.create_task(tick(gaps))
+            for i in range(10):
+                send_events(address(stream), [notification('E_A', seq=i)])
+                received.append((await stream.__anext__())['params']['seq'])
+                await asyncio.sleep(0.01)
+            ticker.cancel()
+        return received, gaps
+    received, gaps = asyncio.run(main())
+    assert received == list(range(10))
+    # reading the socket never waits for more data
+    assert max(gaps) < 0.05
+
+
+def test_bounded_queue(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    stream = handler.events_stream('E_A', queue_size=3)
+
+    async def main():
+        await stream.start()
+        send_events(address(stream),
+                    [notification('E_A', seq=i) for i in range(20)])
+        await asyncio.sleep(0.1)
+        # the socket is not read while the queue is full
+        assert stream.queue.qsize() == 3
+        assert not stream.reading
+        received = []
+        async for event in stream:
+            received.append(event['params']['seq'])
+            if len(received) == 20:
+                break
+        await stream.aclose()
+        return received
+    assert asyncio.run(main()) == list(range(20))
+
+
+def test_expire(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    stream = handler.events_stream('E_A', expire=0.1)
+
+    async def main():
+        return [event async for event in stream]
+    assert asyncio.run(main()) == []
+
+
+def test_subscribe_error(opensips, mi):
+    def fail(params):
+        raise MIError(500, "subscription failed")
+    opensips.handlers['event_subscribe'] = fail
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    stream = handler.events_stream('E_A')
+
+    async def main():
+        async for _ in stream:
+            pass
+    with pytest.raises(OpenSIPSMIException):
+        asyncio.run(main())
+    assert stream.closed
+    assert stream.socket.sock is None
+
+
+def test_close_before_start(opensips, mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', ip='127.0.0.1')
+    stream = handler.events_stream('E_A')
+
+    async def main():
+        await stream.aclose()
+        return [event async for event in stream]
+    assert asyncio.run(main()) == []
+    assert 'event_subscribe' not in opensips.methods()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the FIFO MI connector """
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from opensips.mi import OpenSIPSMI, OpenSIPSMIException
+
+
+def reply_fifos(directory):
+    """ Returns the reply FIFOs found in directory """
+    return sorted(f for f in os.listdir(directory)
+                  if f.startswith("opensips_fifo_reply_"))
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_execute(opensips, tmp_path, persistent):
+    mi = OpenSIPSMI('fifo', fifo_persistent=persistent,
+                    **opensips.fifo(str(tmp_path)))
+    try:
+        for i in range(3):
+            assert mi.execute('echo', [i]) == \
+                {'method': 'echo', 'params': [i]}
+    finally:
+        mi.close()
+    assert reply_fifos(tmp_path) == []
+
+
+def test_reply_fifo_reused(opensips, tmp_path):
+    mi = OpenSIPSMI('fifo', fifo_persistent=True,
+                    **opensips.fifo(str(tmp_path)))
+    try:
+        mi.execute('echo', [1])
+        fifos = reply_fifos(tmp_path)
+        assert len(fifos) == 1
+        mi.execute('echo', [2])
+        assert reply_fifos(tmp_path) == fifos
+    finally:
+        mi.close()
+    assert reply_fifos(tmp_path) == []
+
+
+def test_reply_fifo_per_thread(opensips, tmp_path):
+    mi = OpenSIPSMI('fifo', fifo_persistent=True,
+                    **opensips.fifo(str(tmp_path)))
+    barrier = threading.Barrier(4)
+
+    def run(i):
+        barrier.wait()
+        return [mi.execute('echo', [i, j]) for j in range(5)]
+    try:
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(run, range(4)))
+        assert len(reply_fifos(tmp_path)) == 4
+    finally:
+        mi.close()
+    for i, replies in enumerate(results):
+        assert [r['params'] for r in replies] == [[i, j] for j in range(5)]
+    assert reply_fifos(tmp_path) == []
+
+
+def test_late_reply_skipped(opensips, tmp_path):
+    def slow(params):
+        time.sleep(0.3)
+        return params
+    opensips.handlers['slow'] = slow
+    mi = OpenSIPSMI('fifo', fifo_persistent=True, fifo_timeout=0.1,
+                    **opensips.fifo(str(tmp_path)))
+    try:
+        with pytest.raises(OpenSIPSMIException):
+            mi.execute('slow', ['late'])
+        # the late reply of the first command arrives first
+        mi.conn.timeout = 1
+        assert mi.execute('echo', ['next']) == \
+            {'method': 'echo', 'params': ['next']}
+    finally:
+        mi.close()
+
+
+def test_missing_fifo(tmp_path):
+    fifo_file = str(tmp_path / "missing")
+    mi = OpenSIPSMI('fifo', fifo_persistent=True, fifo_file=fifo_file,
+                    fifo_file_fallback=fifo_file,
+                    fifo_reply_dir=str(tmp_path))
+    with pytest.raises(OpenSIPSMIException):
+        mi.execute('echo')
+    mi.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
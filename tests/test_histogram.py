@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the latency histogram """
+
+import math
+import random
+import pytest
+from opensips.histogram import Histogram
+
+
+def test_small_values_exact():
+    hist = Histogram(precision=4)
+    for value in range(16):
+        hist.record(value)
+    assert hist.percentiles([0, 50, 100]) == [0, 7, 15]
+    assert hist.mean() == 7.5
+
+
+@pytest.mark.parametrize('precision', [4, 8, 10])
+def test_relative_error(precision):
+    hist = Histogram(precision)
+    bound = 2 ** (1 - precision)
+    rnd = random.Random(precision)
+    for _ in range(200):
+        value = rnd.randrange(1, 10 ** 12)
+        hist.reset()
+        hist.record(value)
+        hist.record(10 ** 13)
+        hist.record(0)
+        assert abs(hist.percentile(50) - value) <= value * bound
+
+
+def test_percentiles():
+    hist = Histogram()
+    values = list(range(1, 100001))
+    random.Random(1).shuffle(values)
+    for value in values:
+        hist.record(value * 1000)
+    p50, p99, p100 = hist.percentiles([50, 99, 100])
+    assert abs(p50 - 50000000) / 50000000 < 0.01
+    assert abs(p99 - 99000000) / 99000000 < 0.01
+    assert p100 == hist.max == 100000000
+    assert hist.min == 1000
+    assert 1000 <= hist.percentile(0) <= 1000 * (1 + 2 ** -7)
+    assert hist.count == 100000
+
+
+def test_record_count():
+    hist = Histogram()
+    hist.record(10, count=5)
+    assert hist.count == 5
+    assert hist.total == 50
+
+
+def test_merge():
+    first, second, both = Histogram(), Histogram(), Histogram()
+    for value in range(0, 100000, 7):
+        first.record(value)
+        both.record(value)
+    for value in range(5, 10000000, 999):
+        second.record(value)
+        both.record(value)
+    first.merge(second)
+    assert first.count == both.count
+    assert first.min == both.min and first.max == both.max
+    assert first.percentiles([10, 50, 90]) == both.percentiles([10, 50, 90])
+    with pytest.raises(ValueError):
+        first.merge(Histogram(precision=4))
+
+
+def test_empty():
+    hist = Histogram()
+    assert math.isnan(hist.mean())
+    assert math.isnan(hist.percentile(50))
+    assert hist.summary() == {}
+    hist.merge(Histogram())
+    assert hist.count == 0
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        Histogram(precision=1)
+    with pytest.raises(ValueError):
+        Histogram().record(-1)
+
+
+def test_summary():
+    hist = Histogram()
+    for value in (1000, 2000, 3000, 4000):
+        hist.record(value)
+    summary = hist.summary(scale=1000)
+    assert summary["count"] == 4
+    assert summary["mean"] == 2.5
+    assert summary["max"] == 4
+    assert summary["p50"] <= summary["p90"] <= summary["p99"] <= 4
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the HTTP MI connector and its connection pool """
+
+import threading
+import pytest
+from opensips.mi import OpenSIPSMI, OpenSIPSMIException
+from fake_opensips import MIError
+
+
+def test_connection_reused(opensips):
+    mi = OpenSIPSMI('http', url=opensips.http())
+    for _ in range(5):
+        assert mi.execute('uptime')['method'] == 'uptime'
+    assert len(opensips.http_peers) == 1
+    mi.close()
+
+
+def test_idle_timeout(opensips):
+    mi = OpenSIPSMI('http', url=opensips.http(), http_idle_timeout=0.000001)
+    for _ in range(3):
+        mi.execute('uptime')
+    assert len(opensips.http_peers) == 3
+    mi.close()
+
+
+def test_stale_connection_retried(opensips):
+    mi = OpenSIPSMI('http', url=opensips.http())
+    opensips.http_drop = True
+    for _ in range(3):
+        assert mi.execute('uptime')['method'] == 'uptime'
+    assert len(opensips.http_peers) == 3
+    mi.close()
+
+
+def test_pool_size_bounds_connections(opensips):
+    mi = OpenSIPSMI('http', url=opensips.http(), http_pool_size=2)
+    threads = [threading.Thread(target=lambda: [mi.execute('uptime')
+                                                for _ in range(10)])
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(opensips.http_peers) <= 2
+    mi.close()
+
+
+def test_error_reply(opensips):
+    def fail(params):
+        raise MIError(-32601, 'Method not found')
+    opensips.handlers['fail'] = fail
+    mi = OpenSIPSMI('http', url=opensips.http())
+    with pytest.raises(OpenSIPSMIException, match='Method not found'):
+        mi.execute('fail')
+    # the connection is still usable
+    assert mi.execute('uptime')['method'] == 'uptime'
+    mi.close()
+
+
+def test_connection_refused():
+    mi = OpenSIPSMI('http', url='http://127.0.0.1:1/mi')
+    with pytest.raises(OpenSIPSMIException):
+        mi.execute('uptime')
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the generators over the large lists of OpenSIPS """
+
+import threading
+import pytest
+from opensips.mi import OpenSIPSMI, OpenSIPSMIException, iter_dialogs, \
+    iter_contacts
+from opensips.mi.iterators import prefetched
+from fake_opensips import MIError
+
+DIALOGS = [{"ID": str(i)} for i in range(25)]
+
+
+@pytest.fixture
+def mi(opensips):
+    """ An MI connector to a fake OpenSIPS with dialogs and contacts """
+    def dlg_list(params):
+        index, counter = params["index"], params["counter"]
+        return {"Dialogs": DIALOGS[index:index + counter]}
+
+    def ul_dump(params):
+        return {"Domains": [
+            {"name": "location", "AORs": [
+                {"AOR": "alice", "Contacts": [{"Contact": "a1"},
+                                              {"Contact": "a2"}]},
+                {"AOR": "bob", "Contacts": []},
+                {"AOR": "carol", "Contacts": [{"Contact": "c1"}]},
+            ]}]}
+    opensips.handlers['dlg_list'] = dlg_list
+    opensips.handlers['ul_dump'] = ul_dump
+    conn = OpenSIPSMI('http', url=opensips.http())
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+@pytest.mark.parametrize('page_size', [1, 10, 25, 100])
+def test_iter_dialogs(opensips, mi, page_size, prefetch):
+    assert list(iter_dialogs(mi, page_size, prefetch)) == DIALOGS
+    pages = len(DIALOGS) // page_size + 1
+    assert opensips.methods().count('dlg_list') == pages
+
+
+def test_iter_dialogs_invalid(mi):
+    with pytest.raises(ValueError):
+        list(iter_dialogs(mi, 0))
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_iter_contacts(mi, prefetch):
+    assert list(iter_contacts(mi, prefetch)) == [
+        ("alice", {"Contact": "a1"}), ("alice", {"Contact": "a2"}),
+        ("carol", {"Contact": "c1"})]
+
+
+def test_iter_error(opensips, mi):
+    def fail(params):
+        raise MIError(500, "failed")
+    opensips.handlers['dlg_list'] = fail
+    with pytest.raises(OpenSIPSMIException):
+        list(iter_dialogs(mi))
+
+
+def test_prefetched_stops_producer():
+    produced = []
+    done = threading.Event()
+
+    def numbers():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            done.set()
+    values = prefetched(numbers(), 2)
+    assert [next(values) for _ in range(3)] == [0, 1, 2]
+    values.close()
+    # the producer is stopped and closes its iterable
+    assert done.wait(5)
+    assert len(produced) < 10
+
+
+def test_prefetched_error():
+    def failing():
+        yield 1
+        raise RuntimeError("failed")
+    values = prefetched(failing())
+    assert next(values) == 1
+    with pytest.raises(RuntimeError):
+        next(values)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
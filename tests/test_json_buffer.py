@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the incremental JSON parsing of events """
+
+import pytest
+from opensips.event.json_helper import JsonBuffer, JsonSplitter, \
+    JsonBufferMaxAttempts
+
+
+def split(*chunks):
+    """ Feeds the chunks to a splitter; returns the values completed """
+    splitter = JsonSplitter()
+    values = []
+    for chunk in chunks:
+        values.extend(splitter.feed(chunk))
+    return values, splitter
+
+
+def test_split_values():
+    values, splitter = split(b'{"a": 1}{"b": [1, {"c": 2}]} [3]')
+    assert values == [b'{"a": 1}', b'{"b": [1, {"c": 2}]}', b'[3]']
+    assert splitter.idle()
+
+
+def test_split_across_chunks():
+    data = b'{"a": "x}y", "b": {"c": [1, 2]}}{"d": 3}'
+    for size in (1, 2, 3, 7):
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        values, _ = split(*chunks)
+        assert values == [b'{"a": "x}y", "b": {"c": [1, 2]}}', b'{"d": 3}']
+
+
+def test_split_strings():
+    values, _ = split(b'{"a": "{[\\"\\\\"}', b'{"b": "\\', b'"}"}')
+    assert values == [b'{"a": "{[\\"\\\\"}', b'{"b": "\\"}"}']
+
+
+def test_split_garbage():
+    values, splitter = split(b'garbage "x" } ]{"a": 1} trailing')
+    assert values == [b'{"a": 1}']
+    assert splitter.idle()
+    assert splitter.buf == bytearray()
+
+
+def test_split_partial():
+    values, splitter = split(b'x{"a": [1')
+    assert values == []
+    assert not splitter.idle()
+    assert splitter.feed(b']}') == [b'{"a": [1]}']
+    assert splitter.idle()
+
+
+def test_buffer_push_pop():
+    buf = JsonBuffer()
+    buf.push(b'{"a": 1}')
+    buf.push(b'{"b": 2}{"c":')
+    buf.push(b' 3}')
+    assert [buf.pop(), buf.pop(), buf.pop(), buf.pop()] == \
+        [{"a": 1}, {"b": 2}, {"c": 3}, None]
+
+
+def test_buffer_invalid_value():
+    buf = JsonBuffer()
+    buf.push(b'{"a": nope}{"b": 2}')
+    assert buf.pop() == {"b": 2}
+    assert buf.failures == 1
+
+
+def test_buffer_max_retries():
+    buf = JsonBuffer(max_retries=2)
+    buf.push(b'{"a": ')
+    buf.push(b'[')
+    with pytest.raises(JsonBufferMaxAttempts):
+        buf.push(b'1,')
+
+
+def test_buffer_retries_reset():
+    buf = JsonBuffer(max_retries=2)
+    for _ in range(5):
+        buf.push(b'{"a": ')
+        buf.push(b'1}')
+        assert buf.pop() == {"a": 1}
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
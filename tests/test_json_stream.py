@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the incremental parsing of MI replies """
+
+import json
+import time
+import pytest
+from opensips.mi import OpenSIPSMI, OpenSIPSMIException
+from opensips.mi.json_stream import JsonPathParser
+from opensips.mi.jsonrpc_helper import JSONRPCError, JSONRPCException
+from fake_opensips import MIError
+
+RESULT = {
+    "Domains": [
+        {"name": "a.com", "AORs": [{"AOR": "alice"}, {"AOR": "b\\\"ob"}]},
+        {"name": "b.com", "AORs": []},
+        {"name": "c.com", "AORs": [{"AOR": "carol", "n": [1, 2.5, None]}]},
+    ],
+    "Count": 3,
+    "Text": "line {with} [brackets] and é",
+}
+
+
+def reply(result=None, **extra):
+    """ Returns a serialized JSONRPC reply """
+    value = {"jsonrpc": "2.0", "id": "1"}
+    if result is not None:
+        value["result"] = result
+    value.update(extra)
+    return json.dumps(value, ensure_ascii=False).encode()
+
+
+def parse(data, path=None, size=None):
+    """ Feeds data to a parser in chunks of size bytes """
+    parser = JsonPathParser(path)
+    size = size or len(data)
+    values = []
+    for pos in range(0, len(data), size):
+        values.extend(parser.feed(data[pos:pos + size]))
+    parser.close()
+    return values
+
+
+@pytest.mark.parametrize('size', [None, 1, 2, 5, 13])
+@pytest.mark.parametrize('path,expected', [
+    (None, [RESULT]),
+    ("Count", [3]),
+    ("Text", [RESULT["Text"]]),
+    ("Domains.item.name", ["a.com", "b.com", "c.com"]),
+    ("Domains.item.AORs.item", [{"AOR": "alice"}, {"AOR": "b\\\"ob"},
+                                {"AOR": "carol", "n": [1, 2.5, None]}]),
+    ("Missing.item", []),
+])
+def test_paths(path, expected, size):
+    assert parse(reply(RESULT), path, size) == expected
+
+
+def test_error_reply():
+    data = reply(error={"code": 404, "message": "Not found"})
+    with pytest.raises(JSONRPCError) as e:
+        parse(data, "Domains.item", 3)
+    assert e.value.code == 404
+
+
+def test_incomplete_reply():
+    with pytest.raises(JSONRPCException):
+        parse(reply(RESULT)[:-10], "Domains.item")
+
+
+def test_invalid_reply():
+    with pytest.raises(JSONRPCException):
+        parse(b'{"result": [1 2]}', "item")
+
+
+def test_large_split_value():
+    # a value split over many chunks must not be copied for each of them
+    big = {"blob": "x" * 4000000, "escaped": "\\\""}
+    data = reply({"Big": [big]})
+    start = time.monotonic()
+    assert parse(data, "Big.item", 1000) == [big]
+    assert parse(data, "Other", 1000) == []
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.parametrize('transport', ['http', 'datagram', 'fifo'])
+def test_execute_stream(opensips, tmp_path, transport):
+    opensips.handlers['domains'] = lambda params: RESULT
+    conn, kwargs = opensips.connector(transport, str(tmp_path))
+    mi = OpenSIPSMI(conn, **kwargs)
+    try:
+        assert list(mi.execute_stream('domains',
+                                      path='Domains.item.name')) == \
+            ["a.com", "b.com", "c.com"]
+        assert list(mi.execute_stream('domains')) == [RESULT]
+    finally:
+        mi.close()
+
+
+def test_execute_stream_error(opensips):
+    mi = OpenSIPSMI('http', url=opensips.http())
+    def fail(params):
+        raise MIError(500, "failed")
+    opensips.handlers['domains'] = fail
+    try:
+        with pytest.raises(OpenSIPSMIException):
+            list(mi.execute_stream('domains', path='Domains.item'))
+    finally:
+        mi.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the lazy exports of the packages """
+
+import sys
+import subprocess
+import importlib
+import pytest
+
+PACKAGES = ['opensips', 'opensips.mi', 'opensips.event']
+
+
+@pytest.mark.parametrize('package', PACKAGES)
+def test_exports(package):
+    module = importlib.import_module(package)
+    for name in module.__all__:
+        assert getattr(module, name) is not None
+        assert name in dir(module)
+    with pytest.raises(AttributeError):
+        getattr(module, 'missing')
+
+
+def test_not_loaded_on_import():
+    code = ("import sys, opensips.mi.__main__; "
+            "print(' '.join(sorted(sys.modules)))")
+    modules = subprocess.run([sys.executable, '-c', code], check=True,
+                             capture_output=True, text=True).stdout.split()
+    assert 'opensips.mi' in modules
+    assert 'opensips.mi.connector' not in modules
+    assert 'opensips.event.handler' not in modules
+    assert 'asyncio' not in modules
+    assert 'typing' not in modules
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the MI command metrics """
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from opensips.mi import OpenSIPSMI, OpenSIPSMIException, MIMetrics
+from opensips.mi.metrics import PHASES
+from fake_opensips import MIError
+
+CONNECTORS = [
+    ('http', {}),
+    ('datagram', {}),
+    ('datagram', {'datagram_persistent': True}),
+    ('unix', {'datagram_persistent': True}),
+    ('fifo', {}),
+    ('fifo', {'fifo_persistent': True}),
+]
+
+
+class Recorder():
+    """ Keeps the arguments of each record() call """
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, method, phases, total, size, error):
+        """ Stores a record """
+        # pylint: disable=too-many-arguments
+        self.records.append((method, phases, total, size, error))
+
+
+def connect(opensips, tmp_path, transport, extra, **kwargs):
+    """ Returns an MI connector talking to the fake OpenSIPS """
+    conn, args = opensips.connector(transport, str(tmp_path))
+    args.update(extra, **kwargs)
+    return OpenSIPSMI(conn, **args)
+
+
+def padding(params):
+    """ Handler returning a reply of the requested size """
+    return {"padding": "x" * params[0]}
+
+
+def reply_size(size):
+    """ Returns the size of the reply of padding() """
+    return len(json.dumps({"jsonrpc": "2.0", "id": "1",
+                           "result": {"padding": "x" * size}}))
+
+
+@pytest.mark.parametrize('transport,extra', CONNECTORS)
+def test_record(opensips, tmp_path, transport, extra):
+    opensips.handlers['padding'] = padding
+    recorder = Recorder()
+    mi = connect(opensips, tmp_path, transport, extra, recorder=recorder)
+    try:
+        mi.execute('padding', [100])
+    finally:
+        mi.close()
+    [(method, phases, total, size, error)] = recorder.records
+    assert method == 'padding'
+    assert set(phases) == set(PHASES)
+    assert all(elapsed >= 0 for elapsed in phases.values())
+    assert sum(phases.values()) <= total
+    # the ids of the commands differ in length
+    assert abs(size - reply_size(100)) < 10
+    assert error is None
+
+
+@pytest.mark.parametrize('transport,extra', CONNECTORS[:4])
+def test_concurrent_sizes(opensips, tmp_path, transport, extra):
+    opensips.handlers['padding'] = padding
+    recorder = Recorder()
+    mi = connect(opensips, tmp_path, transport, extra, recorder=recorder,
+                 datagram_timeout=2)
+    sizes = [10, 1000, 5000] * 10
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda size: mi.execute('padding', [size]), sizes))
+    finally:
+        mi.close()
+    assert len(recorder.records) == len(sizes)
+    recorded = sorted(record[3] for record in recorder.records)
+    expected = sorted(reply_size(size) for size in sizes)
+    assert all(abs(a - b) < 10 for a, b in zip(recorded, expected))
+
+
+def test_error(opensips):
+    def fail(params):
+        raise MIError(404, "not found")
+    opensips.handlers['fail'] = fail
+    recorder = Recorder()
+    mi = OpenSIPSMI('http', url=opensips.http(), recorder=recorder)
+    try:
+        with pytest.raises(OpenSIPSMIException):
+            mi.execute('fail')
+    finally:
+        mi.close()
+    [(_, phases, _, size, error)] = recorder.records
+    assert type(error).__name__ == 'JSONRPCError'
+    assert size is not None
+    assert set(phases) == set(PHASES)
+
+
+def test_transport_error(tmp_path):
+    recorder = Recorder()
+    mi = OpenSIPSMI('datagram', datagram_unix_socket=str(tmp_path / "x"),
+                    recorder=recorder)
+    with pytest.raises(OpenSIPSMIException):
+        mi.execute('uptime')
+    mi.close()
+    [(_, phases, _, size, error)] = recorder.records
+    assert type(error).__name__ == 'JSONRPCException'
+    assert size is None
+    assert "get_reply" not in phases
+
+
+def test_set_recorder(opensips):
+    recorder = Recorder()
+    mi = OpenSIPSMI('http', url=opensips.http())
+    try:
+        mi.execute('uptime')
+        mi.set_recorder(recorder)
+        mi.execute('uptime')
+        mi.set_recorder(None)
+        mi.execute('uptime')
+    finally:
+        mi.close()
+    assert len(recorder.records) == 1
+
+
+def test_mi_metrics(opensips):
+    def fail(params):
+        raise MIError(500, "failed")
+    opensips.handlers['fail'] = fail
+    metrics = MIMetrics()
+    mi = OpenSIPSMI('http', url=opensips.http(), recorder=metrics)
+    try:
+        for _ in range(5):
+            mi.execute('uptime')
+        with pytest.raises(OpenSIPSMIException):
+            mi.execute('fail')
+    finally:
+        mi.close()
+    snapshot = metrics.snapshot()
+    assert snapshot['uptime']['calls'] == 5
+    assert snapshot['uptime']['errors'] == {}
+    assert snapshot['uptime']['latency_us']['count'] == 5
+    assert set(snapshot['uptime']['phases_us']) == set(PHASES)
+    assert snapshot['uptime']['reply_size']['count'] == 5
+    assert snapshot['fail']['errors'] == {'JSONRPCError': 1}
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
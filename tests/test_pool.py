@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the MI connector pool """
+
+import time
+import threading
+import pytest
+from opensips.mi import MIPool, OpenSIPSMIException
+from fake_opensips import MIError
+
+
+def test_execute(opensips):
+    with MIPool('http', size=2, url=opensips.http()) as pool:
+        assert pool.execute('echo', [1]) == {'method': 'echo', 'params': [1]}
+
+
+def test_invalid_size(opensips):
+    with pytest.raises(ValueError):
+        MIPool('http', size=0, url=opensips.http())
+
+
+def test_connector_exclusive(opensips):
+    with MIPool('http', size=1, url=opensips.http()) as pool:
+        with pool.connector():
+            with pytest.raises(OpenSIPSMIException):
+                with pool.connector(timeout=0.05):
+                    pass
+        with pool.connector(timeout=0.05) as mi:
+            assert mi.execute('echo')['method'] == 'echo'
+
+
+def test_submit(opensips):
+    with MIPool('http', size=4, url=opensips.http()) as pool:
+        futures = [pool.submit('echo', [i]) for i in range(20)]
+        assert [f.result()['params'] for f in futures] == \
+            [[i] for i in range(20)]
+
+
+def test_submit_bounded(opensips):
+    release = threading.Event()
+    running = []
+
+    def slow(params):
+        running.append(params)
+        release.wait(5)
+        return params
+    opensips.handlers['slow'] = slow
+    with MIPool('http', size=1, max_pending=2, url=opensips.http()) as pool:
+        futures = [pool.submit('slow', [i]) for i in range(2)]
+        submitted = threading.Event()
+
+        def submit():
+            futures.append(pool.submit('slow', [2]))
+            submitted.set()
+        threading.Thread(target=submit, daemon=True).start()
+        # max_pending commands are already in flight
+        assert not submitted.wait(0.2)
+        release.set()
+        assert submitted.wait(5)
+        assert [f.result() for f in futures] == [[0], [1], [2]]
+
+
+def test_map_in_order(opensips):
+    def delayed(params):
+        time.sleep(params[1])
+        return params[0]
+    opensips.handlers['delayed'] = delayed
+    params = [[i, 0.05 * (i % 3)] for i in range(12)]
+    with MIPool('http', size=4, url=opensips.http()) as pool:
+        assert list(pool.map('delayed', params)) == list(range(12))
+
+
+def test_map_error(opensips):
+    def fail(params):
+        raise MIError(500, "failed")
+    opensips.handlers['fail'] = fail
+    with MIPool('http', size=2, url=opensips.http()) as pool:
+        results = pool.map('fail', [[1], [2]])
+        with pytest.raises(OpenSIPSMIException):
+            next(results)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
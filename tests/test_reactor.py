@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the event reactor """
+
+import time
+import socket
+import threading
+from opensips.event import OpenSIPSEventHandler, EventReactor
+from fake_opensips import send_events, notification, wait_for
+
+
+def test_reader():
+    reactor = EventReactor()
+    recv, send = socket.socketpair()
+    received = []
+
+    def on_readable():
+        received.append(recv.recv(100))
+    reactor.add_reader(recv, on_readable)
+    send.send(b"hello")
+    assert wait_for(lambda: received == [b"hello"])
+    reactor.remove_reader(recv)
+    # nothing left to watch, so the reactor thread exits
+    assert wait_for(lambda: reactor.thread is None)
+    recv.close()
+    send.close()
+
+
+def test_timers():
+    reactor = EventReactor()
+    fired = []
+    reactor.call_later(0.1, lambda: fired.append(2))
+    reactor.call_later(0.05, lambda: fired.append(1))
+    cancelled = reactor.call_later(0.07, lambda: fired.append(3))
+    reactor.cancel(cancelled)
+    assert wait_for(lambda: reactor.thread is None)
+    assert fired == [1, 2]
+
+
+def test_callback_error():
+    reactor = EventReactor()
+    fired = threading.Event()
+
+    def fail():
+        raise RuntimeError("callback failed")
+    reactor.call_later(0, fail)
+    reactor.call_later(0.01, fired.set)
+    assert fired.wait(5)
+
+
+def test_subscriptions(opensips, mi):
+    reactor = EventReactor()
+    handlers = [OpenSIPSEventHandler(mi, 'datagram', reactor=reactor,
+                                     ip='127.0.0.1') for _ in range(2)]
+    received = {'E_A': [], 'E_B': []}
+    events = [handlers[0].subscribe('E_A', received['E_A'].append),
+              handlers[1].subscribe('E_B', received['E_B'].append)]
+    try:
+        assert all(event.thread is None for event in events)
+        assert reactor.thread is not None
+        for event in events:
+            address = (event.socket.ip, event.socket.port)
+            send_events(address, [notification(event.name, seq=i)
+                                  for i in range(10)])
+        assert wait_for(lambda: len(received['E_A']) == 10 and
+                        len(received['E_B']) == 10)
+        assert [e['params']['seq'] for e in received['E_A']] == \
+            list(range(10))
+    finally:
+        handlers[0].unsubscribe('E_A')
+        handlers[1].unsubscribe('E_B')
+    assert wait_for(lambda: reactor.thread is None)
+    assert opensips.methods().count('event_subscribe') == 4
+
+
+def test_expire(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', reactor=True,
+                                   ip='127.0.0.1')
+    received = []
+    event = handler.subscribe('E_A', received.append, expire=0.1)
+    start = time.monotonic()
+    assert wait_for(lambda: received == [None])
+    assert time.monotonic() - start >= 0.1
+    event.stop()
+    assert wait_for(lambda: handler.reactor.thread is None)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
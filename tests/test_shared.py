@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the events sharing a single socket """
+
+import time
+import pytest
+from opensips.mi import OpenSIPSMIException
+from opensips.event import OpenSIPSEventHandler, EventDispatcher
+from fake_opensips import MIError, send_events, notification, wait_for
+
+
+def shared_handler(mi, reactor=False):
+    """ Returns a handler receiving all the events on a single socket """
+    return OpenSIPSEventHandler(mi, 'datagram', reactor=reactor, shared=True,
+                                ip='127.0.0.1')
+
+
+def address(handler):
+    """ Returns the address of the shared socket of a handler """
+    sock = handler.shared_socket.socket
+    return (sock.ip, sock.port)
+
+
+def subscriptions(opensips):
+    """ Returns the (event, expire) of the subscription commands """
+    return [(params[0], params[2]) for method, params in opensips.requests
+            if method == 'event_subscribe']
+
+
+def closed(handler, shared):
+    """ Checks if the shared socket was closed """
+    return handler.shared_socket is None and shared.socket.sock is None \
+        and (shared.thread is None or not shared.thread.is_alive())
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_routing(opensips, mi, reactor):
+    handler = shared_handler(mi, reactor)
+    received = {'E_A': [], 'E_B': []}
+    events = [handler.subscribe(name, received[name].append)
+              for name in received]
+    try:
+        assert events[0].socket is events[1].socket
+        send_events(address(handler), [
+            notification('E_A', seq=1), notification('E_C', seq=2),
+            notification('E_B', seq=3), notification('E_A', seq=4)])
+        assert wait_for(lambda: len(received['E_A']) == 2 and
+                        len(received['E_B']) == 1)
+        assert [e['params']['seq'] for e in received['E_A']] == [1, 4]
+        assert [e['params']['seq'] for e in received['E_B']] == [3]
+        assert [name for name, _ in subscriptions(opensips)] == \
+            ['E_A', 'E_B']
+    finally:
+        for event in events:
+            event.unsubscribe()
+
+
+def test_many_callbacks(opensips, mi):
+    handler = shared_handler(mi)
+    first, second = [], []
+    event = handler.subscribe('E_A', first.append)
+    try:
+        assert handler.subscribe('E_A', second.append) is event
+        assert len(subscriptions(opensips)) == 1
+        send_events(address(handler), [notification('E_A', seq=1)])
+        assert wait_for(lambda: first and second)
+        assert first == second
+    finally:
+        event.unsubscribe()
+
+
+def test_remove(opensips, mi):
+    handler = shared_handler(mi)
+    first, second = [], []
+    event = handler.subscribe('E_A', first.append)
+    handler.subscribe('E_A', second.append)
+    shared = handler.shared_socket
+    event.remove(first.append)
+    send_events(address(handler), [notification('E_A', seq=1)])
+    assert wait_for(lambda: second)
+    time.sleep(0.1)
+    assert not first
+    assert len(subscriptions(opensips)) == 1
+    # removing the last callback unsubscribes the event
+    event.remove(second.append)
+    assert subscriptions(opensips)[-1] == ('E_A', 0)
+    assert 'E_A' not in handler.events
+    assert closed(handler, shared)
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_unsubscribe(opensips, mi, reactor):
+    handler = shared_handler(mi, reactor)
+    received = []
+    handler.subscribe('E_A', received.append)
+    handler.subscribe('E_A', received.append)
+    handler.subscribe('E_B', received.append)
+    shared = handler.shared_socket
+    handler.unsubscribe('E_A')
+    assert set(handler.events) == {'E_B'}
+    send_events(address(handler), [notification('E_A'), notification('E_B')])
+    assert wait_for(lambda: received)
+    time.sleep(0.1)
+    assert [e['method'] for e in received] == ['E_B']
+    assert not closed(handler, shared)
+    handler.unsubscribe('E_B')
+    assert handler.events == {}
+    assert closed(handler, shared)
+    assert subscriptions(opensips)[-2:] == [('E_A', 0), ('E_B', 0)]
+    # a new subscription gets a new socket
+    event = handler.subscribe('E_A', received.append)
+    try:
+        assert handler.shared_socket is not shared
+    finally:
+        event.unsubscribe()
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_route_before_subscription(opensips, mi, reactor):
+    handler = shared_handler(mi, reactor)
+
+    def subscribe(params):
+        # OpenSIPS may notify before the subscription command returns
+        _, host, port = params[1].split(':')
+        send_events((host, int(port)), [notification(params[0], seq=1)])
+        return "OK"
+    opensips.handlers['event_subscribe'] = subscribe
+    received = []
+    event = handler.subscribe('E_A', received.append)
+    try:
+        assert wait_for(lambda: received)
+    finally:
+        opensips.handlers['event_subscribe'] = lambda params: "OK"
+        event.unsubscribe()
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_failed_first_subscription(opensips, mi, reactor):
+    handler = shared_handler(mi, reactor)
+
+    def fail(params):
+        raise MIError(500, "failed")
+    opensips.handlers['event_subscribe'] = fail
+    with pytest.raises(OpenSIPSMIException):
+        handler.subscribe('E_A', lambda event: None)
+    assert handler.shared_socket is None
+    assert handler.events == {}
+    if reactor:
+        assert wait_for(lambda: handler.reactor.thread is None)
+    opensips.handlers['event_subscribe'] = lambda params: "OK"
+    received = []
+    event = handler.subscribe('E_A', received.append)
+    try:
+        send_events(address(handler), [notification('E_A')])
+        assert wait_for(lambda: received)
+    finally:
+        event.unsubscribe()
+
+
+def test_failed_subscription_keeps_socket(opensips, mi):
+    handler = shared_handler(mi)
+    received = []
+    event = handler.subscribe('E_A', received.append)
+    shared = handler.shared_socket
+
+    def fail(params):
+        raise MIError(500, "failed")
+    opensips.handlers['event_subscribe'] = fail
+    try:
+        with pytest.raises(OpenSIPSMIException):
+            handler.subscribe('E_B', received.append)
+        assert handler.shared_socket is shared
+        assert 'E_B' not in shared.routes
+        assert set(handler.events) == {'E_A'}
+        send_events(address(handler), [notification('E_A')])
+        assert wait_for(lambda: received)
+    finally:
+        opensips.handlers['event_subscribe'] = lambda params: "OK"
+        event.unsubscribe()
+
+
+def test_blocking_dispatcher(opensips, mi):
+    handler = shared_handler(mi, reactor=True)
+    dispatcher = EventDispatcher(overflow='block')
+    try:
+        with pytest.raises(ValueError):
+            handler.subscribe('E_A', lambda event: None,
+                              dispatcher=dispatcher)
+    finally:
+        dispatcher.close()
+    assert handler.shared_socket is None
+    assert wait_for(lambda: handler.reactor.thread is None)
+    assert subscriptions(opensips) == []
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_bad_data(mi, reactor):
+    handler = shared_handler(mi, reactor)
+    received = []
+    event = handler.subscribe('E_A', received.append)
+    shared = handler.shared_socket
+    try:
+        # enough garbage to make the buffer give up
+        send_events(address(handler), [b'garbage'] * 20)
+        send_events(address(handler), [notification('E_A', seq=1)])
+        assert wait_for(lambda: received)
+        assert received[0]['params'] == {'seq': 1}
+        assert handler.shared_socket is shared
+        assert not closed(handler, shared)
+    finally:
+        event.unsubscribe()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
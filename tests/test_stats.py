@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the statistics poller """
+
+import math
+import pytest
+from opensips.mi import StatsPoller, OpenSIPSMI, OpenSIPSMIException
+from opensips.mi import stats as stats_module
+from fake_opensips import MIError, wait_for
+
+
+class Counters():
+    """ MI connector stand-in returning growing counters """
+
+    def __init__(self):
+        self.polls = 0
+        self.fail = False
+
+    def execute(self, cmd, params):
+        """ Returns the statistics of the next poll """
+        assert cmd == "get_statistics"
+        if self.fail:
+            raise RuntimeError("OpenSIPS is down")
+        self.polls += 1
+        return {"core:rcv_requests": self.polls * 10,
+                "shmem:used_size": 1000}
+
+
+def poller(history=5):
+    """ Returns a poller whose samples are stored by the test """
+    return StatsPoller(Counters(), history=history)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        StatsPoller(Counters(), interval=0)
+    with pytest.raises(ValueError):
+        StatsPoller(Counters(), history=1)
+
+
+@pytest.mark.parametrize('with_numpy', [True, False])
+def test_deltas_and_rates(monkeypatch, with_numpy):
+    if not with_numpy:
+        monkeypatch.setattr(stats_module, "numpy", None)
+    stats = poller()
+    assert stats.deltas() == {}
+    for second in range(4):
+        stats.store(stats.mi.execute("get_statistics", None), second * 2.0)
+    assert stats.latest() == {"core:rcv_requests": 40.0,
+                              "shmem:used_size": 1000.0}
+    assert stats.deltas() == {"core:rcv_requests": 10.0,
+                              "shmem:used_size": 0.0}
+    assert stats.deltas(3) == {"core:rcv_requests": 30.0,
+                               "shmem:used_size": 0.0}
+    # windows larger than the history use the oldest sample
+    assert stats.deltas(10) == stats.deltas(3)
+    assert stats.rates() == {"core:rcv_requests": 5.0,
+                             "shmem:used_size": 0.0}
+
+
+def test_ring_buffer():
+    stats = poller(history=3)
+    for second in range(5):
+        stats.store({"a": second}, float(second))
+    assert stats.series("a") == [(2.0, 2.0), (3.0, 3.0), (4.0, 4.0)]
+    assert stats.series("missing") == []
+
+
+def test_new_counters():
+    stats = poller()
+    stats.store({"a": 1}, 0.0)
+    stats.store({"a": 2, "b": 5, "c": "n/a"}, 1.0)
+    assert stats.latest()["b"] == 5.0
+    assert math.isnan(stats.latest()["c"])
+    assert stats.series("a") == [(0.0, 1.0), (1.0, 2.0)]
+    assert math.isnan(stats.series("b")[0][1])
+
+
+def test_background_polling():
+    samples = []
+    stats = StatsPoller(Counters(), interval=0.02,
+                        on_sample=lambda p: samples.append(p.latest()))
+    stats.start()
+    try:
+        assert wait_for(lambda: len(samples) >= 3)
+    finally:
+        stats.stop()
+    assert stats.thread is None
+    assert stats.deltas()["core:rcv_requests"] == 10.0
+
+
+def test_poll_errors():
+    stats = StatsPoller(Counters(), interval=0.02)
+    stats.mi.fail = True
+    stats.start()
+    try:
+        assert wait_for(lambda: stats.errors >= 2)
+    finally:
+        stats.stop()
+    assert isinstance(stats.last_error, RuntimeError)
+    assert stats.latest() == {}
+
+
+def fail(params):
+    """ Handler of a failing command """
+    raise MIError(500, "failed")
+
+
+def test_poll(opensips):
+    opensips.handlers['get_statistics'] = \
+        lambda params: {"core:" + s: 1 for s in params["statistics"]}
+    mi = OpenSIPSMI('http', url=opensips.http())
+    try:
+        stats = StatsPoller(mi, ["a", "b"])
+        assert stats.poll() == {"core:a": 1, "core:b": 1}
+        opensips.handlers['get_statistics'] = fail
+        with pytest.raises(OpenSIPSMIException):
+            stats.poll()
+    finally:
+        mi.close()
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the stream (TCP) event socket """
+
+import json
+import socket
+import pytest
+from opensips.event import OpenSIPSEventHandler
+from opensips.event.stream import Stream
+from fake_opensips import send_events, notification, wait_for
+
+
+@pytest.fixture
+def stream():
+    """ A listening stream socket """
+    sock = Stream(ip='127.0.0.1')
+    sock.create()
+    yield sock
+    sock.destroy()
+
+
+def read_all(sock, count):
+    """ Reads until count events are received """
+    events = []
+
+    def read():
+        data = sock.read()
+        if data:
+            events.extend(data.replace(b"}{", b"}\n{").split(b"\n"))
+        return len(events) >= count
+    assert wait_for(read)
+    return [json.loads(e) for e in events]
+
+
+def test_persistent_connections(stream):
+    conns = [socket.create_connection((stream.ip, stream.port))
+             for _ in range(2)]
+    try:
+        first = json.dumps({"conn": 0}).encode()
+        second = json.dumps({"conn": 1}).encode()
+        # the events of each connection are framed separately
+        conns[0].sendall(first[:5])
+        conns[1].sendall(second[:3])
+        assert stream.read() is None
+        conns[1].sendall(second[3:])
+        conns[0].sendall(first[5:] + first)
+        events = read_all(stream, 3)
+        assert sorted(e["conn"] for e in events) == [0, 0, 1]
+        assert len(stream.sockets()) == 3
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+def test_closed_connection(stream):
+    conn = socket.create_connection((stream.ip, stream.port))
+    conn.sendall(b'{"a": 1}{"b":')
+    conn.close()
+    assert read_all(stream, 1) == [{"a": 1}]
+    assert wait_for(lambda: stream.read() is None and
+                    len(stream.sockets()) == 1)
+
+
+@pytest.mark.parametrize('reactor', [False, True])
+def test_subscription(mi, reactor):
+    handler = OpenSIPSEventHandler(mi, 'stream', reactor=reactor,
+                                   ip='127.0.0.1')
+    received = []
+    event = handler.subscribe('E_A', received.append)
+    try:
+        address = (event.socket.ip, event.socket.port)
+        for i in range(3):
+            send_events(address, [notification('E_A', conn=i, seq=j)
+                                  for j in range(5)], transport='stream')
+        assert wait_for(lambda: len(received) == 15)
+        for i in range(3):
+            assert [e['params']['seq'] for e in received
+                    if e['params']['conn'] == i] == list(range(5))
+    finally:
+        handler.unsubscribe('E_A')
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#
+# This file is part of the OpenSIPS Python Package
+# (see https://github.com/OpenSIPS/python-opensips).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+""" Tests of the events handled by worker processes """
+
+import os
+import queue
+import multiprocessing
+import pytest
+from opensips.event import OpenSIPSEventHandler, OpenSIPSEventException
+from fake_opensips import send_events, notification
+
+
+def collect(results, count):
+    """ Returns count (pid, seq) results reported by the workers """
+    received = []
+    for _ in range(count):
+        received.append(results.get(timeout=5))
+    with pytest.raises(queue.Empty):
+        results.get(timeout=0.1)
+    return received
+
+
+@pytest.mark.parametrize('reuse_port', [False, True])
+def test_workers(mi, reuse_port):
+    results = multiprocessing.get_context("fork").Queue()
+
+    def callback(event):
+        results.put((os.getpid(), event['params']['seq']))
+    handler = OpenSIPSEventHandler(mi, 'datagram', workers=2,
+                                   ip='127.0.0.1', reuse_port=reuse_port)
+    event = handler.subscribe('E_A', callback)
+    try:
+        assert len(event.processes) == 2
+        workers = {proc.pid for proc in event.processes}
+        send_events((event.socket.ip, event.socket.port),
+                    [notification('E_A', seq=i) for i in range(50)])
+        received = collect(results, 50)
+    finally:
+        handler.unsubscribe('E_A')
+    assert sorted(seq for _, seq in received) == list(range(50))
+    assert {pid for pid, _ in received} <= workers
+    assert 'E_A' not in handler.events
+
+
+def test_invalid_data(mi):
+    results = multiprocessing.get_context("fork").Queue()
+    handler = OpenSIPSEventHandler(mi, 'datagram', workers=1,
+                                   ip='127.0.0.1')
+    event = handler.subscribe('E_A', lambda e: results.put(e['params']))
+    try:
+        address = (event.socket.ip, event.socket.port)
+        send_events(address, [b'{nope}'] * 20)
+        send_events(address, [notification('E_A', seq=1)])
+        assert results.get(timeout=5) == {'seq': 1}
+    finally:
+        handler.unsubscribe('E_A')
+
+
+def test_stop(mi):
+    handler = OpenSIPSEventHandler(mi, 'datagram', workers=2,
+                                   ip='127.0.0.1')
+    event = handler.subscribe('E_A', print)
+    processes = list(event.processes)
+    handler.unsubscribe('E_A')
+    assert not any(proc.is_alive() for proc in processes)
+
+
+def test_invalid_arguments(mi):
+    handler = OpenSIPSEventHandler(mi, 'stream', workers=2, ip='127.0.0.1')
+    with pytest.raises(OpenSIPSEventException):
+        handler.subscribe('E_A', print)
+    handler = OpenSIPSEventHandler(mi, 'datagram', workers=2,
+                                   ip='127.0.0.1')
+    with pytest.raises(OpenSIPSEventException):
+        handler.subscribe('E_A', print, dispatcher=object())
+    with pytest.raises(ValueError):
+        OpenSIPSEventHandler(mi, 'datagram', workers=2, reactor=True)
+
+# vim: tabstop=8 expandtab shiftwidth=4 softtabstop=4